@@ -0,0 +1,593 @@
+import serial
+import asyncio
+import logging
+from motor_stage_ui import logger
+from motor_stage_ui.pi_stages_interface import (
+    SettleState,
+    StageConversion,
+    decode_status,
+    get_serial_interface,
+)
+
+"""
+
+asyncio driver of the motor stages. The serial port is read from the event loop, no thread per command is needed.
+
+"""
+
+
+class AsyncSerialInterface:
+    """Non-blocking serial transport. Answers are read when the event loop reports the port readable.
+    The interface must be used from one event loop only.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        baud_rate: int = 9600,
+        parity: str = "N",
+        terminator: str = "\r",
+        timeout: float = 2,
+        stopbits: float = 2,
+    ):
+        self._serial = serial.Serial(
+            port=port,
+            baudrate=baud_rate,
+            parity=parity,
+            timeout=0,
+            stopbits=stopbits,
+        )
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.port = port
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self._terminator = terminator
+        self._buffer = bytearray()
+        self._lock = asyncio.Lock()
+        # set after a failed read, stale answers are discarded before the next command
+        self._resync = False
+
+    def close(self):
+        """Close the serial port."""
+        self._serial.close()
+
+    # Serial helper functions
+
+    async def _write(self, command: str):
+        """Write command to serial port
+
+        Args:
+            command (str): Command for the port
+        """
+        await self._write_many([command])
+
+    async def _write_many(self, commands: list[str]):
+        """Write several commands to the serial port with one bulk write.
+
+        Args:
+            commands (list[str]): Commands for the port
+        """
+        if self._resync:
+            self._serial.reset_input_buffer()
+            self._buffer.clear()
+            self._resync = False
+        msg = "".join(command + self._terminator for command in commands).encode()
+        self.log.debug(msg)
+        self._serial.write(msg)
+
+    async def _read(self, timeout: float = None):
+        """Read message from serial port without blocking the event loop. Incomplete answers are discarded.
+
+        Args:
+            timeout (float, optional): Read timeout in seconds. Defaults to the timeout of the interface.
+
+        Returns:
+            str: message
+        """
+        terminator = self._terminator.encode()
+        loop = asyncio.get_running_loop()
+        fd = self._serial.fileno()
+        deadline = loop.time() + (self.timeout if timeout is None else timeout)
+        try:
+            while terminator not in self._buffer:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                readable = loop.create_future()
+
+                def ready():
+                    # the reader fires until it is removed, the future is resolved only once
+                    loop.remove_reader(fd)
+                    if not readable.done():
+                        readable.set_result(None)
+
+                loop.add_reader(fd, ready)
+                try:
+                    await asyncio.wait_for(readable, remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    loop.remove_reader(fd)
+                self._buffer += self._serial.read(self._serial.in_waiting or 1)
+        except BaseException:
+            # cancelled read, e.g. by asyncio.wait_for: the answer may still arrive
+            # and must not be taken for the answer of the next command
+            self._buffer.clear()
+            self._resync = True
+            loop.remove_reader(fd)
+            raise
+        if terminator not in self._buffer:
+            # the rest of the answer may still arrive, it must not be taken for the next answer
+            if self._buffer:
+                self.log.error(
+                    "Incomplete answer %r from serial interface." % bytes(self._buffer)
+                )
+            else:
+                self.log.error("No responds from serial interface.")
+            self._buffer.clear()
+            self._resync = True
+            raise ValueError
+        raw, _, rest = bytes(self._buffer).partition(terminator)
+        self._buffer = bytearray(rest)
+        msg = raw.decode().strip(self._terminator)
+        if msg == "":
+            self.log.error("No responds from serial interface.")
+            raise ValueError
+        return msg
+
+    async def transaction(self, command: str, timeout: float = None) -> str:
+        """Write command to serial port and read back the answer.
+        The bus is locked for the whole exchange, no other command can be sent in between.
+
+        Args:
+            command (str): Command for the port
+            timeout (float, optional): Read timeout in seconds. Defaults to the timeout of the interface.
+
+        Returns:
+            str: Answer message
+        """
+        async with self._lock:
+            await self._write(command)
+            return await self._read(timeout)
+
+    async def transactions(
+        self, commands: list[str], timeout: float = None
+    ) -> list[str]:
+        """Pipelined transactions: all commands are written at once, then all answers are read back in order.
+        The bus is locked for the whole exchange.
+
+        Args:
+            commands (list[str]): Commands for the port
+            timeout (float, optional): Read timeout in seconds per answer. Defaults to the timeout of the interface.
+
+        Returns:
+            list[str]: Answer messages in the order of the commands
+        """
+        async with self._lock:
+            await self._write_many(commands)
+            return [await self._read(timeout) for _ in commands]
+
+
+class AsyncPIStagesInterface(StageConversion):
+    """Coroutine version of PIStagesInterface, for asyncio based data acquisition.
+    Commands and arguments are the same, all commands talking to the stages are coroutines.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        baud_rate: int = 9600,
+        parity: str = "N",
+        terminator: str = "\r",
+        timeout: float = 2,
+        stopbits: float = 2,
+        interface: type[AsyncSerialInterface] = AsyncSerialInterface,
+    ):
+        """
+        Args:
+            port (str): Serial port
+            baud_rate (int, optional): Baud rate of the port. Defaults to 9600.
+            parity (str, optional): Parity of the port. Defaults to "N".
+            terminator (str, optional): Message terminator. Defaults to carriage return.
+            timeout (float, optional): Read timeout in seconds. Defaults to 2.
+            stopbits (float, optional): Number of stop bits. Defaults to 2.
+            interface (type[AsyncSerialInterface], optional): Serial interface class. Defaults to AsyncSerialInterface.
+        """
+        self.serial_interface = get_serial_interface(
+            port=port,
+            baud_rate=baud_rate,
+            parity=parity,
+            terminator=terminator,
+            timeout=timeout,
+            stopbits=stopbits,
+            interface=interface,
+        )
+
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self._unit_factors = {}
+
+    async def _write_command(self, command: str, address: int = None) -> None:
+        """Encodes the command for the PI motor stages.
+        This includes a header '01' and an address to select the specific stage and deselect the others and the command.
+
+        Args:
+            command (str): Command for the stage
+            address (int, optional): Address of the specific motor stage. Defaults to None.
+        """
+        if address:
+            command = ("\x01%X" % (address - 1)) + command
+            async with self.serial_interface._lock:
+                await self.serial_interface._write(command)
+        else:
+            self.log.error("Commands needs motor address")
+
+    async def _write_read(
+        self, command: str, address: int = None, timeout: float = None
+    ) -> str:
+        """Write command to port and read back answer as one transaction.
+
+        Args:
+            command (str): Command for port
+            address (int, optional): Address of specific motor stage. Defaults to None.
+            timeout (float, optional): Read timeout in seconds. Defaults to the timeout of the port.
+
+        Returns:
+            str: Answer message
+        """
+        if not address:
+            self.log.error("Commands needs motor address")
+            raise ValueError
+        return await self.serial_interface.transaction(
+            ("\x01%X" % (address - 1)) + command, timeout=timeout
+        )
+
+    # Motor stage commands
+
+    async def init_motor(self, address: int, logic: str = None) -> None:
+        """Initialize motor stage. Powering and resetting the motor.
+
+        Args:
+            address (int): Address of the motor stage
+            logic (str, optional): Specify logic can be 'low' or 'high'. Defaults to None.
+        """
+        await self.motor_on(address=address)
+        await asyncio.sleep(0.1)
+        await self._write_command("RT", address=address)
+        await asyncio.sleep(0.1)
+
+        if logic == "low":
+            await self._write_command("LL", address=address)  # set logic
+            await asyncio.sleep(0.1)
+        elif logic == "high":
+            await self._write_command("HL", address=address)  # set logic
+            await asyncio.sleep(0.1)
+
+        # set motor stage velocity
+        self.velocity = 200000  # allegedly in steps per second
+        await self.set_velocity(address, self.velocity)
+        await asyncio.sleep(0.1)
+
+        self.log.info("Initialized motorstage with address: %i" % address)
+
+    async def motor_on(self, address=None) -> None:
+        await self._write_command("MN", address)
+
+    async def motor_off(self, address=None) -> None:
+        await self._write_command("MF", address)
+
+    async def set_velocity(self, address: int, velocity: int) -> None:
+        """Set motorstage velocity.
+
+        Args:
+            address (int): Address of the motorstage
+            velocity (int): Motorstage velocity is set allegedly as steps per second
+        """
+        await self._write_command("SV" + str(velocity), address=address)
+
+    async def set_home(self, address: int) -> None:
+        """Set the current position of the motorstage as new 0.
+
+        Args:
+            address (int): Address of the motorstage
+        """
+        await self._write_command("DH", address)
+        self.log.info("Set Home for motorstage with address: %i" % (address))
+
+    async def go_home(self, address: int) -> None:
+        """Moves the motorstage to the absolute zero position.
+
+        Args:
+            address (int): Address of the motorstage
+        """
+        await self._write_command("GH", address)
+        self.log.info("Go Home for motorstage with address: %i" % (address))
+
+    async def get_stat(self, address: int) -> str:
+        """Status of the motor stage. This also resets status register.
+
+        Args:
+            address (int): Address of the motorstage
+
+        Returns:
+            str: Answer of the status command
+        """
+        err_msg = await self._write_read("TS", address)
+        self.log.debug("Status of motor stage with address %i: %s" % (address, err_msg))
+        return err_msg
+
+    async def abort(self, address: int) -> None:
+        """Stops all movement of the motorstage.
+
+        Args:
+            address (int): Address of the motorstage
+        """
+        await self._write_command("AB", address)
+        self.log.info("Stop all movement motorstage with address: %i" % (address))
+
+    async def move_to_position(
+        self, address: int, amount: str, unit: str, stage: str, step_size: float
+    ) -> None:
+        """Moves the motor stage absolute position.
+        Accepts string inputs with units (4cm, -2mm...). If no unit is given, the motor moves the default unit amount.
+
+        Args:
+            address (int): Address of the motorstage
+            amount (str): absolute position
+            unit (str): input unit
+            stage (int): stage type either 'rotation' or translation
+            step_size (float): step size of the motorstage given in deg or um respectively
+        """
+        if amount == "" or stage not in ["translation", "rotation"]:
+            self.log.warning("Invalid stage type or amount input")
+            raise ValueError
+        pos = self._calculate_value(amount, unit, stage, step_size)
+        await self._move_to_position(address, int(pos))
+
+    async def move_relative(
+        self, address: int, amount: str, unit: str, stage: str, step_size: float
+    ) -> None:
+        """Moves the motor stage relative amount, positive values for ahead, negatives for back.
+        Accepts string inputs with units (4cm, -2mm...). If no unit is given, the motor moves the default unit amount.
+
+        Args:
+            address (int): Address of the motorstage
+            amount (str): relative move amount
+            unit (str): input unit
+            stage (int): stage type either 'rotation' or translation
+            step_size (float): step size of the motorstage given in deg or um respectively
+        """
+        if amount == "" or stage not in ["translation", "rotation"]:
+            self.log.warning("Invalid stage type or amount input")
+            raise ValueError
+        pos = self._calculate_value(amount, unit, stage, step_size)
+        await self._move_relative(address, int(pos))
+
+    async def move_and_wait(
+        self,
+        address: int,
+        amount: str,
+        unit: str,
+        stage: str,
+        step_size: float,
+        relative: bool = False,
+        timeout: float = 60,
+        poll_interval: float = 0.05,
+    ) -> str:
+        """Moves the motor stage and waits until it settled.
+
+        Args:
+            address (int): Address of the motorstage
+            amount (str): absolute position or relative move amount
+            unit (str): input and output unit
+            stage (int): stage type either 'rotation' or translation
+            step_size (float): step size of the motorstage given in deg or um respectively
+            relative (bool, optional): Move relative instead of absolute. Defaults to False.
+            timeout (float, optional): Maximum time to wait for the move in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls in seconds. Defaults to 0.05.
+
+        Returns:
+            str: final position of the motorstage in unit 3 digits precision
+        """
+        value = self._move_steps(amount, unit, stage, step_size)
+        if relative:
+            target = await self._get_position(address) + value
+            await self._move_relative(address, value)
+        else:
+            target = value
+            await self._move_to_position(address, value)
+        position = await self.wait_until_idle(
+            address, timeout=timeout, poll_interval=poll_interval, target=target
+        )
+        return self._format_position(position, unit, stage, float(step_size))
+
+    async def move_many(
+        self,
+        targets: dict,
+        stages: dict,
+        timeout: float = 60,
+        poll_interval: float = 0.05,
+    ) -> dict:
+        """Moves several motorstages of the daisy chain to absolute positions at the same time and waits until all settled.
+
+        Args:
+            targets (dict): Absolute target positions by motorstage name
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml
+            timeout (float, optional): Maximum time to wait for the moves in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls in seconds. Defaults to 0.05.
+
+        Returns:
+            dict: final position of each motorstage in its unit with 3 digits precision
+        """
+        steps = self._target_steps(targets, stages, self.serial_interface.port)
+        commands = self._move_commands(steps)
+        async with self.serial_interface._lock:
+            await self.serial_interface._write_many(commands)
+        self.log.info("Move to positions %s" % steps)
+        positions = await self._wait_until_idle(
+            list(steps), targets=steps, timeout=timeout, poll_interval=poll_interval
+        )
+        return self._format_positions(positions, targets, stages)
+
+    async def wait_until_idle(
+        self,
+        address: int,
+        timeout: float = 60,
+        poll_interval: float = 0.05,
+        target: int = None,
+    ) -> int:
+        """Waits until the motorstage stopped moving, see PIStagesInterface.wait_until_idle.
+
+        Args:
+            address (int): Address of the motorstage
+            timeout (float, optional): Maximum waiting time in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls in seconds. Defaults to 0.05.
+            target (int, optional): Target position in motor steps. Defaults to None.
+
+        Returns:
+            int: final position of the motorstage in integer step sizes
+        """
+        positions = await self._wait_until_idle(
+            [address],
+            targets={address: target},
+            timeout=timeout,
+            poll_interval=poll_interval,
+        )
+        return positions[address]
+
+    async def _wait_until_idle(
+        self,
+        addresses: list[int],
+        targets: dict = None,
+        timeout: float = 60,
+        poll_interval: float = 0.05,
+        settle_polls: int = 2,
+    ) -> dict:
+        """Waits until all given motorstages of the daisy chain settled, the positions of all moving stages are polled together.
+
+        Args:
+            addresses (list[int]): Addresses of the motorstages
+            targets (dict, optional): Target positions in motor steps by address. Defaults to None.
+            timeout (float, optional): Maximum waiting time in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls in seconds. Defaults to 0.05.
+            settle_polls (int, optional): Number of consecutive polls with unchanged position to count as settled. Defaults to 2.
+
+        Returns:
+            dict: final positions in integer step sizes by address
+        """
+        state = SettleState(addresses, targets, timeout, settle_polls, self.log)
+        while True:
+            pending = state.pending
+            positions = await self._get_positions(pending)
+            for address, position in zip(pending, positions):
+                if state.update(
+                    address, position
+                ) and not await self._trajectory_running(address):
+                    state.settle(address)
+            if state.done(poll_interval):
+                return state.settled
+            await asyncio.sleep(poll_interval)
+
+    async def _trajectory_running(self, address: int) -> bool:
+        """Checks the status register for a running trajectory.
+
+        Args:
+            address (int): Address of the motorstage
+
+        Returns:
+            bool: True if the status reports an unfinished trajectory of a powered motor
+        """
+        flags = decode_status(await self.get_stat(address))
+        return (
+            bool(flags) and not flags["trajectory_complete"] and not flags["motor_off"]
+        )
+
+    async def get_position(
+        self, address: int, unit: str, stage: str, step_size: float
+    ) -> str:
+        """Get current position of the motorstage in units
+
+        Args:
+            address (int): Address of the motorstage
+            unit (str): output unit
+            stage (int): stage type either 'rotation' or translation
+            step_size (float): step size of the motorstage given in deg or um
+
+        Returns:
+            str: current position of motorstage in unit 3 digits precision respectively
+        """
+        if stage not in ["translation", "rotation"]:
+            self.log.warning("Invalid stage type")
+            raise ValueError
+        return self._format_position(
+            await self._get_position(address), unit, stage, step_size
+        )
+
+    async def get_positions(self, stages: dict) -> dict:
+        """Get current positions of several motorstages of the daisy chain with pipelined queries.
+
+        Args:
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml
+
+        Returns:
+            dict: current position of each motorstage in its unit with 3 digits precision
+        """
+        for name, conf in stages.items():
+            if conf["stage_type"] not in ["translation", "rotation"]:
+                self.log.warning("Invalid stage type of motorstage %s" % name)
+                raise ValueError
+        steps = await self._get_positions([conf["address"] for conf in stages.values()])
+        return {
+            name: self._format_position(
+                value, conf["unit"], conf["stage_type"], float(conf["step_size"])
+            )
+            for value, (name, conf) in zip(steps, stages.items())
+        }
+
+    async def _move_to_position(self, address: int, value: int) -> None:
+        """Helper function for pyserial
+
+        Args:
+            address (int): Address of the motorstage
+            value (int): move amount
+        """
+        await self._write_command("MA%d" % value, address)
+        self.log.info(
+            "Move to position %i motorstage with address: %i" % (value, address)
+        )
+
+    async def _move_relative(self, address: int, value: int = 1000000) -> None:
+        """Helper function for pyserial
+
+        Args:
+            address (int): Address of the motorstage
+            value (int): move amount
+        """
+        await self._write_command("MR%d" % value, address)
+        self.log.info(
+            "Moved motorstage relative %i with address: %i" % (value, address)
+        )
+
+    async def _get_position(self, address: int) -> int:
+        """Helper function for pyserial
+
+        Args:
+            address (int): Address of the motorstage
+
+        Returns:
+            int: current position of motorstage in integer step sizes
+        """
+        return self._parse_position(await self._write_read("TP", address))
+
+    async def _get_positions(self, addresses: list[int]) -> list[int]:
+        """Pipelined position query of several motorstages on the daisy chain.
+
+        Args:
+            addresses (list[int]): Addresses of the motorstages
+
+        Returns:
+            list[int]: current positions of the motorstages in integer step sizes
+        """
+        answers = await self.serial_interface.transactions(
+            [("\x01%X" % (address - 1)) + "TP" for address in addresses]
+        )
+        return [self._parse_position(msg) for msg in answers]
@@ -0,0 +1,314 @@
+from motor_stage_ui.pi_stages_interface import (
+    PIStagesInterface,
+    SerialInterface,
+    close_serial_interface,
+)
+from motor_stage_ui.test.utils import PtySerialDevice, SerialInterfaceMock
+
+from pathlib import Path
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import click
+import yaml
+
+"""
+
+Performance benchmarks of command latency, unit conversion, start up and poll throughput.
+
+"""
+
+CONFIG_FILE = Path(__file__).parent / "test" / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+X_AXIS = TESTCONFIG["x_axis"]
+
+
+def _per_call(func, duration: float) -> float:
+    """Mean time per call of func, called repeatedly for about the given duration.
+
+    Args:
+        func (callable): Function without arguments
+        duration (float): Measurement time in seconds
+
+    Returns:
+        float: Time per call in seconds
+    """
+    func()
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while True:
+        for _ in range(10):
+            func()
+        calls += 10
+        now = time.perf_counter()
+        if now >= deadline:
+            return (now - start) / calls
+
+
+def _stages(interface, port: str = X_AXIS["port"]) -> PIStagesInterface:
+    return PIStagesInterface(
+        port=port, baud_rate=X_AXIS["baud_rate"], interface=interface
+    )
+
+
+def bench_write_command(duration: float) -> tuple[float, str]:
+    """Write only command (abort) through PIStagesInterface with the mock."""
+    motor = _stages(SerialInterfaceMock)
+    return _per_call(lambda: motor.abort(X_AXIS["address"]), duration), "s"
+
+
+def bench_query_command(duration: float) -> tuple[float, str]:
+    """Query command (status) through PIStagesInterface with the mock."""
+    motor = _stages(SerialInterfaceMock)
+    return _per_call(lambda: motor.get_stat(X_AXIS["address"]), duration), "s"
+
+
+def bench_calculate_value(duration: float) -> tuple[float, str]:
+    """Unit conversion of an amount with a tabulated unit."""
+    motor = _stages(SerialInterfaceMock)
+    return (
+        _per_call(
+            lambda: motor._calculate_value(
+                "1.5cm", X_AXIS["unit"], X_AXIS["stage_type"], X_AXIS["step_size"]
+            ),
+            duration,
+        ),
+        "s",
+    )
+
+
+def bench_calculate_value_pint(duration: float) -> tuple[float, str]:
+    """Unit conversion of an expression which needs pint."""
+    motor = _stages(SerialInterfaceMock)
+    return (
+        _per_call(
+            lambda: motor._calculate_value(
+                "1/2 inch", X_AXIS["unit"], X_AXIS["stage_type"], X_AXIS["step_size"]
+            ),
+            duration,
+        ),
+        "s",
+    )
+
+
+def bench_get_position(duration: float) -> tuple[float, str]:
+    """Position query including the conversion into the unit of the stage, with the mock."""
+    motor = _stages(SerialInterfaceMock)
+    return (
+        _per_call(
+            lambda: motor.get_position(
+                X_AXIS["address"],
+                X_AXIS["unit"],
+                X_AXIS["stage_type"],
+                float(X_AXIS["step_size"]),
+            ),
+            duration,
+        ),
+        "s",
+    )
+
+
+def bench_cli_cold_start(duration: float) -> tuple[float, str]:
+    """Cold start of 'motor pos' in a fresh interpreter, with the mock."""
+    script = (
+        "from motor_stage_ui.motor_stage_terminal import motor; "
+        "motor(['pos', 'x_axis'], standalone_mode=False)"
+    )
+    times = []
+    deadline = time.perf_counter() + duration
+    while not times or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", script],
+            env=dict(os.environ, TEST="True"),
+            capture_output=True,
+            check=True,
+        )
+        times.append(time.perf_counter() - start)
+    return min(times), "s"
+
+
+def bench_gui_construction(duration: float, n_stages: int = 16) -> tuple[float, str]:
+    """Construction of the main window with 16 stages on one port, with the mock."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from motor_stage_ui.motor_stage_gui import MainWindow
+
+    app = QApplication.instance() or QApplication([])
+    conf = {"stage_%i" % i: dict(X_AXIS, address=i % 16 + 1) for i in range(n_stages)}
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = os.path.join(directory, "configuration.yaml")
+        with open(config_path, "w") as file:
+            yaml.safe_dump(conf, file)
+
+        def construct():
+            window = MainWindow(config_path, interface=SerialInterfaceMock)
+            window.deleteLater()
+
+        per_call = _per_call(construct, duration)
+    app.processEvents()
+    return per_call, "s"
+
+
+def bench_position_reads(duration: float) -> tuple[float, str]:
+    """Sustained single position reads per second with the mock."""
+    motor = _stages(SerialInterfaceMock)
+    return (
+        1 / _per_call(lambda: motor._get_position(X_AXIS["address"]), duration),
+        "1/s",
+    )
+
+
+def bench_position_reads_pty(duration: float) -> tuple[float, str]:
+    """Sustained single position reads per second through pyserial and a pseudo terminal."""
+    device = PtySerialDevice()
+    motor = _stages(SerialInterface, port=device.port)
+    try:
+        return (
+            1 / _per_call(lambda: motor._get_position(X_AXIS["address"]), duration),
+            "1/s",
+        )
+    finally:
+        close_serial_interface(motor.serial_interface)
+        device.close()
+
+
+def bench_pipelined_reads_pty(duration: float) -> tuple[float, str]:
+    """Sustained position reads per second of 4 stages with pipelined queries, through a pseudo terminal."""
+    device = PtySerialDevice()
+    motor = _stages(SerialInterface, port=device.port)
+    try:
+        addresses = [1, 2, 3, 4]
+        return (
+            len(addresses)
+            / _per_call(lambda: motor._get_positions(addresses), duration),
+            "1/s",
+        )
+    finally:
+        close_serial_interface(motor.serial_interface)
+        device.close()
+
+
+# Benchmarks by name. Results in 's' are better when lower, results in '1/s' when higher.
+BENCHMARKS = {
+    "write_command": bench_write_command,
+    "query_command": bench_query_command,
+    "calculate_value": bench_calculate_value,
+    "calculate_value_pint": bench_calculate_value_pint,
+    "get_position": bench_get_position,
+    "cli_cold_start": bench_cli_cold_start,
+    "gui_construction": bench_gui_construction,
+    "position_reads": bench_position_reads,
+    "position_reads_pty": bench_position_reads_pty,
+    "pipelined_reads_pty": bench_pipelined_reads_pty,
+}
+
+
+def run_benchmarks(names: list[str] = None, duration: float = 1.0) -> dict:
+    """Runs the benchmarks.
+
+    Args:
+        names (list[str], optional): Names of the benchmarks to run. Defaults to all.
+        duration (float, optional): Measurement time per benchmark in seconds. Defaults to 1.
+
+    Returns:
+        dict: Machine information and the result of every benchmark with value and unit
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        value, unit = BENCHMARKS[name](duration)
+        results[name] = {"value": value, "unit": unit}
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """Compares benchmark results with a baseline.
+
+    Args:
+        results (dict): Results of run_benchmarks
+        baseline (dict): Earlier results of run_benchmarks
+        tolerance (float, optional): Allowed relative slow down. Defaults to 0.2.
+
+    Returns:
+        list[str]: Description of every regression
+    """
+    regressions = []
+    for name, result in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        old = baseline["results"][name]["value"]
+        new = result["value"]
+        if result["unit"] == "1/s":
+            slower = new < old * (1 - tolerance)
+        else:
+            slower = new > old * (1 + tolerance)
+        if slower:
+            regressions.append(
+                "%s: %.6g %s -> %.6g %s"
+                % (name, old, result["unit"], new, result["unit"])
+            )
+    return regressions
+
+
+@click.command()
+@click.argument("names", nargs=-1)
+@click.option(
+    "-o", "--output", type=click.Path(dir_okay=False), help="write results as JSON"
+)
+@click.option(
+    "-c",
+    "--compare",
+    "baseline",
+    type=click.File("r"),
+    help="JSON results to compare with",
+)
+@click.option(
+    "-d", "--duration", default=1.0, show_default=True, help="seconds per benchmark"
+)
+@click.option(
+    "-t",
+    "--tolerance",
+    default=0.2,
+    show_default=True,
+    help="allowed relative slow down",
+)
+def main(names: tuple, output: str, baseline, duration: float, tolerance: float):
+    """Runs the performance benchmarks (all if no NAMES are given), e.g.
+    python -m motor_stage_ui.benchmark -o results.json -c baseline.json
+    Exits with code 1 if a benchmark regressed against the baseline.
+    """
+    for name in names:
+        if name not in BENCHMARKS:
+            raise click.BadParameter("Unknown benchmark %s" % name)
+    results = run_benchmarks(list(names), duration=duration)
+    for name, result in results["results"].items():
+        click.echo("%-22s %12.6g %s" % (name, result["value"], result["unit"]))
+    if output:
+        with open(output, "w") as file:
+            json.dump(results, file, indent=2)
+    if baseline is not None:
+        regressions = compare(results, json.load(baseline), tolerance=tolerance)
+        for regression in regressions:
+            click.echo("Regression " + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
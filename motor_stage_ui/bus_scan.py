@@ -0,0 +1,152 @@
+from motor_stage_ui.pi_stages_interface import (
+    SerialInterface,
+    decode_status,
+    status_byte,
+)
+from motor_stage_ui import logger
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import serial
+
+"""
+
+Discovery of the C-863 controllers of daisy chains by probing all addresses of the serial ports.
+
+"""
+
+# Addresses which can be set on a C-863 controller
+ADDRESSES = range(1, 17)
+
+# Baud rates which can be set on a C-863 controller
+BAUD_RATES = [9600, 19200, 38400, 57600, 115200]
+
+
+def probe_port(
+    port: str,
+    baud_rate: int = 9600,
+    addresses=ADDRESSES,
+    timeout: float = None,
+    interface: type[SerialInterface] = SerialInterface,
+) -> dict:
+    """Sends a status query to every address of a serial port.
+
+    Args:
+        port (str): Serial port
+        baud_rate (int, optional): Baud rate of the port. Defaults to 9600.
+        addresses (iterable, optional): Probed addresses. Defaults to 1 to 16.
+        timeout (float, optional): Read timeout per address in seconds.
+            Defaults to the deadline of the status answer at the baud rate.
+        interface (type[SerialInterface], optional): Serial interface class. Defaults to SerialInterface.
+
+    Returns:
+        dict: Status answer by address of every controller which answered
+    """
+    # a dedicated interface, the probed addresses must not go offline for the shared interface of the port
+    serial_interface = interface(port=port, baud_rate=baud_rate)
+    answers = {}
+    try:
+        for address in addresses:
+            try:
+                answers[address] = serial_interface.transaction(
+                    "\x01%XTS" % (address - 1), timeout
+                )
+            except ValueError:
+                pass
+    finally:
+        serial_interface.close()
+    return answers
+
+
+def scan_port(
+    port: str,
+    baud_rates: list[int] = None,
+    addresses=ADDRESSES,
+    timeout: float = None,
+    interface: type[SerialInterface] = SerialInterface,
+) -> tuple[int | None, dict]:
+    """Probes a serial port with one baud rate after the other until controllers answer.
+
+    Args:
+        port (str): Serial port
+        baud_rates (list[int], optional): Baud rates to try. Defaults to all baud rates of the C-863.
+        addresses (iterable, optional): Probed addresses. Defaults to 1 to 16.
+        timeout (float, optional): Read timeout per address in seconds. Defaults to the deadline of the status answer.
+        interface (type[SerialInterface], optional): Serial interface class. Defaults to SerialInterface.
+
+    Returns:
+        tuple[int | None, dict]: Baud rate of the controllers, None if none answered, and their status answers by address
+    """
+    for baud_rate in baud_rates or BAUD_RATES:
+        try:
+            answers = probe_port(port, baud_rate, addresses, timeout, interface)
+        except (serial.SerialException, OSError) as error:
+            logger.setup_main_logger("BusScan", logging.WARNING).warning(
+                "Can not open port %s: %s" % (port, error)
+            )
+            return None, {}
+        if answers:
+            return baud_rate, answers
+    return None, {}
+
+
+def scan_bus(
+    ports: list[str],
+    baud_rates: list[int] = None,
+    addresses=ADDRESSES,
+    timeout: float = None,
+    interface: type[SerialInterface] = SerialInterface,
+) -> dict:
+    """Probes several serial ports in parallel, see scan_port.
+
+    Args:
+        ports (list[str]): Serial ports
+        baud_rates (list[int], optional): Baud rates to try. Defaults to all baud rates of the C-863.
+        addresses (iterable, optional): Probed addresses. Defaults to 1 to 16.
+        timeout (float, optional): Read timeout per address in seconds. Defaults to the deadline of the status answer.
+        interface (type[SerialInterface], optional): Serial interface class. Defaults to SerialInterface.
+
+    Returns:
+        dict: Baud rate and status answers by address of every port, in the order of the ports
+    """
+    if not ports:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+        results = pool.map(
+            lambda port: scan_port(port, baud_rates, addresses, timeout, interface),
+            ports,
+        )
+        return dict(zip(ports, results))
+
+
+def config_stub(results: dict) -> dict:
+    """Configuration of every controller found, in the format of the configuration yaml.
+    Stage type, step size and unit can not be probed and are placeholders.
+
+    Args:
+        results (dict): Result of scan_bus
+
+    Returns:
+        dict: Stage configurations by motorstage name
+    """
+    conf = {}
+    for port, (baud_rate, answers) in results.items():
+        for address in answers:
+            conf["%s_%i" % (os.path.basename(port), address)] = {
+                "stage_type": "translation",
+                "address": address,
+                "step_size": 1,
+                "unit": "mm",
+                "port": port,
+                "baud_rate": baud_rate,
+            }
+    return conf
+
+
+def describe(answer: str) -> str:
+    """Short description of a status answer, e.g. 'S:84 00 00 00 00 00 (trajectory_complete, motor_off)'."""
+    if status_byte(answer) is None:
+        return "%r (status not decoded)" % answer
+    flags = [flag for flag, value in decode_status(answer).items() if value]
+    return "%s (%s)" % (answer, ", ".join(flags) or "ok")
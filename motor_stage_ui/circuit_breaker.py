@@ -0,0 +1,93 @@
+from motor_stage_ui import logger
+
+from threading import Lock
+import logging
+import time
+
+"""
+
+Circuit breaker which takes non-responding controllers of a daisy chain offline.
+
+"""
+
+
+class CircuitBreaker:
+    """Tracks failed queries by controller address. After threshold failures in a row the address is offline
+    and not queried until its backoff elapsed. Then one query probes the controller: if it answers the address
+    is online again, else the backoff doubles up to max_backoff.
+    """
+
+    def __init__(
+        self, threshold: int = 2, backoff: float = 0.5, max_backoff: float = 30.0
+    ):
+        """
+        Args:
+            threshold (int, optional): Failures in a row which take an address offline. Defaults to 2.
+            backoff (float, optional): First backoff in seconds. Defaults to 0.5.
+            max_backoff (float, optional): Longest backoff in seconds. Defaults to 30.
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.threshold = threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # failures in a row, current backoff and monotonic time until which the address is offline
+        self._state = {}
+        self._lock = Lock()
+
+    def allow(self, address: int) -> bool:
+        """Whether the address may be queried: it is online or its backoff elapsed.
+
+        Args:
+            address (int): Address of the motorstage
+
+        Returns:
+            bool: True if the address may be queried
+        """
+        state = self._state.get(address)
+        return state is None or time.monotonic() >= state[2]
+
+    def offline(self) -> list[int]:
+        """Addresses which are offline at the moment.
+
+        Returns:
+            list[int]: Addresses in their backoff
+        """
+        now = time.monotonic()
+        with self._lock:
+            return sorted(
+                address for address, state in self._state.items() if now < state[2]
+            )
+
+    def success(self, address: int) -> None:
+        """Records an answer of the address.
+
+        Args:
+            address (int): Address of the motorstage
+        """
+        if address not in self._state:
+            return
+        with self._lock:
+            failures, backoff, _ = self._state.pop(address, (0, 0, 0))
+        if failures >= self.threshold:
+            self.log.warning("Motorstage with address %i is online again" % address)
+
+    def failure(self, address: int) -> None:
+        """Records a missing or broken answer of the address.
+
+        Args:
+            address (int): Address of the motorstage
+        """
+        with self._lock:
+            failures, backoff, offline_until = self._state.get(address, (0, 0.0, 0.0))
+            failures += 1
+            if failures >= self.threshold:
+                backoff = (
+                    self.backoff if not backoff else min(backoff * 2, self.max_backoff)
+                )
+                offline_until = time.monotonic() + backoff
+            self._state[address] = (failures, backoff, offline_until)
+        if failures >= self.threshold:
+            self.log.warning(
+                "Motorstage with address %i does not respond, offline for %.1f s"
+                % (address, backoff)
+            )
@@ -0,0 +1,127 @@
+from motor_stage_ui import logger
+
+from concurrent.futures import Future
+from threading import Lock, Thread
+import logging
+import queue
+
+"""
+
+Asynchronous command queue of a serial port.
+
+"""
+
+
+class CommandQueue:
+    """Queue of commands for one serial port. A single writer thread takes all queued commands
+    and writes them to the port with one bulk write. Every submitted command gets a future
+    which is resolved as soon as the command is written.
+    """
+
+    def __init__(self, serial_interface, max_batch: int = 64):
+        """
+        Args:
+            serial_interface (SerialInterface): Serial interface of the port
+            max_batch (int, optional): Maximum number of commands per bulk write. Defaults to 64.
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.serial_interface = serial_interface
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = Thread(
+            target=self._run,
+            name="CommandQueue %s" % serial_interface.port,
+            daemon=True,
+        )
+        self._thread.start()
+
+    def submit(self, command: str) -> Future:
+        """Queues a command for the port.
+
+        Args:
+            command (str): Command for the port
+
+        Returns:
+            Future: Resolved when the command is written
+        """
+        future = Future()
+        self._queue.put((command, future))
+        return future
+
+    def flush(self) -> None:
+        """Blocks until all queued commands are written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Writes all queued commands and stops the writer thread."""
+        self._queue.put((None, None))
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch and batch[-1][0] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            commands = [command for command, _ in batch if command is not None]
+            try:
+                if commands:
+                    self.serial_interface._write_many(commands)
+            except Exception as e:
+                self.log.error("Could not write commands: %s" % e)
+                for command, future in batch:
+                    if future is not None:
+                        future.set_exception(e)
+            else:
+                for command, future in batch:
+                    if future is not None:
+                        future.set_result(None)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1][0] is None:
+                return
+
+
+# Process wide registry of command queues, one per serial interface.
+_command_queues = {}
+_command_queues_lock = Lock()
+
+
+def get_command_queue(serial_interface) -> CommandQueue:
+    """Returns the command queue of a serial interface, the queue is created with the first request.
+
+    Args:
+        serial_interface (SerialInterface): Serial interface of the port
+
+    Returns:
+        CommandQueue: Command queue of the port
+    """
+    with _command_queues_lock:
+        command_queue = _command_queues.get(id(serial_interface))
+        if command_queue is None:
+            command_queue = CommandQueue(serial_interface)
+            _command_queues[id(serial_interface)] = command_queue
+    return command_queue
+
+
+def close_command_queues() -> None:
+    """Writes all queued commands and stops all writer threads."""
+    with _command_queues_lock:
+        for command_queue in _command_queues.values():
+            command_queue.close()
+        _command_queues.clear()
+
+
+def close_command_queue(serial_interface) -> None:
+    """Writes all queued commands of a serial interface and stops its writer thread, if it has a queue.
+
+    Args:
+        serial_interface (SerialInterface): Serial interface of the port
+    """
+    with _command_queues_lock:
+        command_queue = _command_queues.pop(id(serial_interface), None)
+    if command_queue is not None:
+        command_queue.close()
@@ -1,35 +1,38 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
 import coloredlogs
 
 FORMAT = "%(asctime)s [%(name)-18s] - %(levelname)-7s %(message)s"
 
+# Logging is configured once per process: one colored terminal handler and the log files on the root logger,
+# the loggers of the classes only set their level and propagate to the root logger.
+_configured = False
+_configure_lock = threading.Lock()
+# Handlers doing the terminal and file output
+_handlers = []
+# Background thread writing the records of the queue sink, None if records are written directly
+_listener = None
+
 
 def setup_main_logger(name="AidaTLU", level=logging.INFO):
-    _reset_all_loggers()
+    _configure()
 
     logger = logging.getLogger(name)
-    logger.setLevel(level)
+    # setting the level clears the level caches of all loggers, only done if it changes
+    if logger.level != level:
+        logger.setLevel(level)
 
-    _setup_coloredlogs(logger)
     _add_success_level(logger)
     _add_notice_level(logger)
 
-    _add_logfiles_to(logger)
-
     return logger
 
 
 def setup_derived_logger(name, level=logging.INFO):
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-
-    _setup_coloredlogs(logger)
-    _add_success_level(logger)
-    _add_notice_level(logger)
-
-    _add_logfiles_to(logger)
-
-    return logger
+    return setup_main_logger(name, level)
 
 
 def setup_logfile(filename, level=logging.INFO):
@@ -41,33 +44,81 @@ def setup_logfile(filename, level=logging.INFO):
 
 
 def add_logfile_to_loggers(fh):
-    # Add filehandler to all active loggers
-    for lg in logging.Logger.manager.loggerDict.values():
-        if isinstance(lg, logging.Logger):
-            lg.addHandler(fh)
-
-
-def _add_logfiles_to(logger):
-    fhs = []
-    for lg in logging.Logger.manager.loggerDict.values():
-        if isinstance(lg, logging.Logger):
-            for handler in lg.handlers[:]:
-                if isinstance(handler, logging.FileHandler):
-                    fhs.append(handler)
-
-    for fh in fhs:
-        logger.addHandler(fh)
+    # All loggers propagate to the root logger, the file handler is only added there
+    _configure()
+    with _configure_lock:
+        _handlers.append(fh)
+        if _listener is None:
+            logging.root.addHandler(fh)
 
 
 def close_logfile(fh):
-    # Remove filehandler from all active loggers
+    with _configure_lock:
+        if fh in _handlers:
+            _handlers.remove(fh)
+        logging.root.removeHandler(fh)
+    # Remove filehandler from loggers it was added to directly
     for lg in logging.Logger.manager.loggerDict.values():
         if isinstance(lg, logging.Logger):
             lg.removeHandler(fh)
 
 
-def _setup_coloredlogs(logger):
-    loglevel = logger.getEffectiveLevel()
+def setup_queue_logging():
+    """Moves the terminal and file output into a background thread. Log calls only put the record
+    into a queue and never block on terminal or file I/O. The queue is written at exit of the process.
+    """
+    global _listener
+    _configure()
+    with _configure_lock:
+        if _listener is not None:
+            return
+        records = queue.SimpleQueue()
+        for handler in _handlers:
+            logging.root.removeHandler(handler)
+        logging.root.addHandler(logging.handlers.QueueHandler(records))
+        _listener = logging.handlers.QueueListener(records, _ForwardHandler())
+        _listener.start()
+    atexit.register(stop_queue_logging)
+
+
+def stop_queue_logging():
+    """Writes all queued records and switches back to direct terminal and file output."""
+    global _listener
+    with _configure_lock:
+        if _listener is None:
+            return
+        for handler in logging.root.handlers[:]:
+            if isinstance(handler, logging.handlers.QueueHandler):
+                logging.root.removeHandler(handler)
+        _listener.stop()
+        _listener = None
+        for handler in _handlers:
+            logging.root.addHandler(handler)
+
+
+class _ForwardHandler(logging.Handler):
+    """Passes the records of the queue to the current terminal and file handlers."""
+
+    def emit(self, record):
+        for handler in list(_handlers):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def _configure():
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        logging.root.handlers = []
+        _setup_coloredlogs()
+        _handlers.extend(logging.root.handlers)
+        _configured = True
+
+
+def _setup_coloredlogs():
     coloredlogs.DEFAULT_FIELD_STYLES = {
         "asctime": {},
         "hostname": {},
@@ -84,26 +135,27 @@ def _setup_coloredlogs(logger):
         "notice": {"color": "blue"},
         "warning": {"color": "yellow"},
     }
-    coloredlogs.DEFAULT_LOG_LEVEL = loglevel
+    # The levels of the loggers decide which records are shown
+    coloredlogs.DEFAULT_LOG_LEVEL = logging.DEBUG
 
-    coloredlogs.install(fmt=FORMAT, milliseconds=True, loglevel=loglevel)
+    coloredlogs.install(fmt=FORMAT, milliseconds=True, loglevel=logging.DEBUG)
+    # Loggers of other packages only show warnings
+    logging.root.setLevel(logging.WARNING)
 
 
 def _add_success_level(logger):
     logging.SUCCESS = 35
     logging.addLevelName(logging.SUCCESS, "SUCCESS")
-    logger.success = lambda msg, *args, **kwargs: logger.log(
-        logging.SUCCESS, msg, *args, **kwargs
-    )
+    if not hasattr(logger, "success"):
+        logger.success = lambda msg, *args, **kwargs: logger.log(
+            logging.SUCCESS, msg, *args, **kwargs
+        )
 
 
 def _add_notice_level(logger):
     logging.NOTICE = 25
     logging.addLevelName(logging.NOTICE, "NOTICE")
-    logger.notice = lambda msg, *args, **kwargs: logger.log(
-        logging.NOTICE, msg, *args, **kwargs
-    )
-
-
-def _reset_all_loggers():
-    logging.root.handlers = []
+    if not hasattr(logger, "notice"):
+        logger.notice = lambda msg, *args, **kwargs: logger.log(
+            logging.NOTICE, msg, *args, **kwargs
+        )
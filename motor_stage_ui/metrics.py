@@ -0,0 +1,309 @@
+from motor_stage_ui.pi_stages_interface import (
+    PIStagesInterface,
+    SerialInterface,
+    set_tracing,
+)
+from motor_stage_ui import logger
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+import logging
+import serial
+import time
+
+"""
+
+Prometheus metrics of the motor stages and the serial bus, served over HTTP.
+
+"""
+
+# Commands which start a motion of the stage
+MOVE_COMMANDS = ("MA", "MR", "GH")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class StageMonitor:
+    """Polls position and status of all motorstages in a background thread and renders them
+    with the counters of the serial traces in the Prometheus text format.
+    Every poll is one pipelined query per serial port. Tracing of the serial traffic is enabled,
+    the move, error and timeout counters are taken from the traces.
+    """
+
+    def __init__(
+        self,
+        stages: dict,
+        interface: type[SerialInterface] = SerialInterface,
+        interval: float = 1.0,
+    ):
+        """
+        Args:
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml
+            interface (type[SerialInterface], optional): Serial interface class. Defaults to SerialInterface.
+            interval (float, optional): Poll interval in seconds. Defaults to 1.
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.stages = stages
+        self.interval = interval
+        set_tracing(True)
+        self._motors = {}
+        self._ports = {}
+        for name, conf in stages.items():
+            if conf["port"] not in self._motors:
+                self._motors[conf["port"]] = PIStagesInterface(
+                    port=conf["port"], baud_rate=conf["baud_rate"], interface=interface
+                )
+            self._ports.setdefault(conf["port"], []).append(name)
+        # last poll result by motorstage name: position in steps and status byte, None if unknown
+        self._state = {name: (None, None) for name in stages}
+        # by port: time of the last successful poll, number of failed polls, lag of the last poll
+        self._last_poll = {port: None for port in self._ports}
+        self._failures = {port: 0 for port in self._ports}
+        self._lag = {port: 0.0 for port in self._ports}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+    def poll(self, scheduled: float = None) -> None:
+        """Queries position and status of all stages once.
+
+        Args:
+            scheduled (float, optional): Monotonic time at which the poll was due, for the lag. Defaults to now.
+        """
+        if scheduled is None:
+            scheduled = time.monotonic()
+        for port, names in self._ports.items():
+            try:
+                telemetry = self._motors[port]._get_telemetry(
+                    [self.stages[name]["address"] for name in names]
+                )
+            # a disconnected adapter must not end the polling, it is counted as failed poll
+            except (ValueError, serial.SerialException, OSError) as e:
+                self.log.warning("Poll of port %s failed: %r" % (port, e))
+                with self._lock:
+                    self._failures[port] += 1
+                    for name in names:
+                        self._state[name] = (None, None)
+                continue
+            with self._lock:
+                self._lag[port] = time.monotonic() - scheduled
+                self._last_poll[port] = time.time()
+                for name, state in zip(names, telemetry):
+                    self._state[name] = state
+
+    def run(self) -> None:
+        """Polls at the interval until stopped. Polls which can not be done in time are skipped."""
+        scheduled = time.monotonic()
+        while not self._stop.is_set():
+            self.poll(scheduled)
+            scheduled += self.interval
+            delay = scheduled - time.monotonic()
+            if delay < 0:
+                skipped = int(-delay / self.interval) + 1
+                scheduled += skipped * self.interval
+                delay += skipped * self.interval
+            self._stop.wait(delay)
+
+    def start(self) -> None:
+        """Starts polling in a background thread."""
+        self._stop.clear()
+        self._thread = Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops polling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def render(self) -> str:
+        """Current metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics, one sample per line
+        """
+        lines = []
+
+        def metric(name: str, kind: str, text: str, samples: list) -> None:
+            lines.append("# HELP %s %s" % (name, text))
+            lines.append("# TYPE %s %s" % (name, kind))
+            for labels, value in samples:
+                lines.append(
+                    "%s{%s} %s"
+                    % (
+                        name,
+                        ",".join('%s="%s"' % item for item in labels.items()),
+                        _format_value(value),
+                    )
+                )
+
+        with self._lock:
+            state = dict(self._state)
+            last_poll = dict(self._last_poll)
+            failures = dict(self._failures)
+            lag = dict(self._lag)
+
+        stage_labels = {
+            name: {
+                "stage": name,
+                "port": conf["port"],
+                "address": conf["address"],
+            }
+            for name, conf in self.stages.items()
+        }
+        metric(
+            "motor_stage_up",
+            "gauge",
+            "1 if the last poll of the stage succeeded",
+            [
+                (stage_labels[name], int(position is not None))
+                for name, (position, _) in state.items()
+            ],
+        )
+        metric(
+            "motor_stage_position_steps",
+            "gauge",
+            "Position of the stage in motor steps",
+            [(stage_labels[name], position) for name, (position, _) in state.items()],
+        )
+        positions = []
+        for name, (position, _) in state.items():
+            conf = self.stages[name]
+            if position is not None:
+                position = float(
+                    self._motors[conf["port"]]._format_position(
+                        position,
+                        conf["unit"],
+                        conf["stage_type"],
+                        float(conf["step_size"]),
+                    )
+                )
+            positions.append((dict(stage_labels[name], unit=conf["unit"]), position))
+        metric(
+            "motor_stage_position",
+            "gauge",
+            "Position of the stage in the unit of the stage",
+            positions,
+        )
+        metric(
+            "motor_stage_status",
+            "gauge",
+            "Status register of the stage, see STATUS_FLAGS",
+            [(stage_labels[name], status) for name, (_, status) in state.items()],
+        )
+
+        traces = {
+            port: motor.serial_interface.trace.summary()
+            for port, motor in self._motors.items()
+            if motor.serial_interface.trace is not None
+        }
+        counters = {"moves": [], "timeouts": [], "errors": []}
+        for name, conf in self.stages.items():
+            summary = traces.get(conf["port"], {})
+            commands = {
+                key.split(":")[1]: stats
+                for key, stats in summary.items()
+                if key.split(":")[0] == str(conf["address"])
+            }
+            counters["moves"].append(
+                (
+                    stage_labels[name],
+                    sum(
+                        commands[command]["count"]
+                        for command in MOVE_COMMANDS
+                        if command in commands
+                    ),
+                )
+            )
+            for counter in ("timeouts", "errors"):
+                counters[counter].append(
+                    (
+                        stage_labels[name],
+                        sum(stats[counter] for stats in commands.values()),
+                    )
+                )
+        metric(
+            "motor_stage_moves_total",
+            "counter",
+            "Move commands sent to the stage",
+            counters["moves"],
+        )
+        metric(
+            "motor_stage_serial_timeouts_total",
+            "counter",
+            "Queries of the stage without answer",
+            counters["timeouts"],
+        )
+        metric(
+            "motor_stage_serial_errors_total",
+            "counter",
+            "Failed serial writes and reads of commands of the stage",
+            counters["errors"],
+        )
+
+        metric(
+            "motor_stage_poll_failures_total",
+            "counter",
+            "Failed polls of the port",
+            [({"port": port}, count) for port, count in failures.items()],
+        )
+        metric(
+            "motor_stage_poll_lag_seconds",
+            "gauge",
+            "Delay of the end of the last poll against its schedule",
+            [({"port": port}, value) for port, value in lag.items()],
+        )
+        metric(
+            "motor_stage_last_poll_timestamp_seconds",
+            "gauge",
+            "Unix time of the last successful poll of the port",
+            [({"port": port}, value) for port, value in last_poll.items()],
+        )
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the metrics of the monitor of the server at /metrics."""
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.monitor.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        self.server.log.debug(format % args)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """HTTP server of the Prometheus metrics, by default only reachable from the local host."""
+
+    daemon_threads = True
+
+    def __init__(self, monitor: StageMonitor, address: tuple[str, int]):
+        """
+        Args:
+            monitor (StageMonitor): Monitor of the stages
+            address (tuple[str, int]): Host and port to listen on, port 0 for a free port
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.monitor = monitor
+        super().__init__(address, MetricsHandler)
+
+    def start(self) -> None:
+        """Serves in a background thread."""
+        Thread(target=self.serve_forever, daemon=True).start()
@@ -1,14 +1,27 @@
 from motor_stage_ui.pi_stages_interface import PIStagesInterface
 from motor_stage_ui.pi_stages_interface import SerialInterface
+from motor_stage_ui.pi_stages_interface import set_tracing
+from motor_stage_ui.position_poller import PositionPoller
+from motor_stage_ui.serial_trace import format_stats
+from motor_stage_ui.telemetry import TelemetryRecorder, TelemetryWriter
 from motor_stage_ui.test.utils import SerialInterfaceMock
 from motor_stage_ui import logger
 
 import yaml
 import logging
 from PyQt5.QtCore import QSize, Qt, QTimer
-from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QLineEdit, QLabel
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtWidgets import (
+    QApplication,
+    QMainWindow,
+    QPushButton,
+    QLineEdit,
+    QLabel,
+    QPlainTextEdit,
+)
 import sys
 import os
+import time
 from pathlib import Path
 
 """
@@ -29,9 +42,10 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Motor Stage")
         self.setFixedSize(QSize(1400, 500))
 
-        timer = QTimer(self)
         self.pos = []
         self.motor = []
+        self.pollers = {}
+        self.poll_rates = {}
         for index, motor in enumerate(self.conf):
             self.motor.append(
                 PIStagesInterface(
@@ -60,36 +74,76 @@ class MainWindow(QMainWindow):
                 )
             )
 
-            # really bad loop to connect the position button to a timer for positional update
-            try:
-                [
-                    timer.timeout.connect(
-                        lambda: self.pos[i].setText(
-                            (
-                                self.get_position_clicked(
-                                    self.conf[list(self.conf.keys())[i]]["address"],
-                                    unit=self.conf[list(self.conf.keys())[i]]["unit"],
-                                    stage=self.conf[list(self.conf.keys())[i]][
-                                        "stage_type"
-                                    ],
-                                    step_size=eval(
-                                        str(
-                                            self.conf[list(self.conf.keys())[i]][
-                                                "step_size"
-                                            ]
-                                        )
-                                    ),
-                                    index=index,
-                                )
-                            )
-                        )
-                    )
-                    for i in range(len(self.pos))
-                ]
-            except:
-                self.log.warning("Could not get motor position!")
-        timer.start(200)  # position update timer in ms
+            # one polling thread per serial port, stages of a daisy chain are polled in turn
+            port = self.conf[motor]["port"]
+            if port not in self.pollers:
+                poller = PositionPoller(port=port, interval=200, parent=self)
+                poller.position_changed.connect(self.position_changed)
+                poller.status_changed.connect(self.status_changed)
+                poller.poll_failed.connect(self.poll_failed)
+                poller.poll_rate_changed.connect(self.poll_rate_changed)
+                self.pollers[port] = poller
+            self.pollers[port].add_stage(
+                index,
+                self.motor[index],
+                address,
+                unit,
+                stage,
+                step_size,
+                poll_moving=self.conf[motor].get("poll_moving", 100),
+                poll_idle=self.conf[motor].get("poll_idle", 1000),
+            )
         self.labels()
+        self.recorder = None
+        self.record = self.record_button()
+        self.stats = self.stats_button()
+        self.stats_panel = self.stats_window()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(1000)
+        self.stats_timer.timeout.connect(self.update_stats)
+
+    def showEvent(self, event) -> None:
+        self.start_polling()
+        super().showEvent(event)
+
+    def closeEvent(self, event) -> None:
+        self.stop_polling()
+        if self.recorder is not None:
+            self.record_toggled(False)
+        if self.stats.isChecked():
+            self.stats.setChecked(False)
+        super().closeEvent(event)
+
+    def start_polling(self) -> None:
+        """Starts the background position polling of all serial ports."""
+        for poller in self.pollers.values():
+            if not poller.isRunning():
+                poller.start()
+
+    def stop_polling(self) -> None:
+        """Stops the background position polling of all serial ports."""
+        for poller in self.pollers.values():
+            poller.stop()
+
+    def position_changed(self, index: int, position: str) -> None:
+        self.pos[index].setText(position)
+
+    def status_changed(self, index: int, status: str) -> None:
+        self.pos[index].setToolTip("Status: %s" % status)
+
+    def poll_failed(self, index: int) -> None:
+        self.pos[index].setToolTip("No response from motorstage")
+
+    def poll_rate_changed(self, port: str, rate: float) -> None:
+        """Shows the measured serial round trips per second of each port in the status bar."""
+        self.poll_rates[port] = rate
+        self.statusBar().showMessage(
+            "Poll rate: "
+            + ", ".join(
+                "%s %.1f queries/s" % (port, rate)
+                for port, rate in self.poll_rates.items()
+            )
+        )
 
     def position_setting(
         self,
@@ -125,8 +179,93 @@ class MainWindow(QMainWindow):
         )
         return position
 
+    def record_toggled(self, checked: bool) -> None:
+        """Starts or stops the telemetry recording of all stages into telemetry_<date>_<time>.npy."""
+        if checked:
+            motors = {}
+            for index, motor in enumerate(self.conf):
+                motors.setdefault(self.conf[motor]["port"], self.motor[index])
+            path = time.strftime("telemetry_%Y%m%d_%H%M%S.npy")
+            self.recorder = TelemetryRecorder(self.conf, motors, TelemetryWriter(path))
+            self.recorder.start()
+            self.record.setStyleSheet("background-color : red")
+            self.statusBar().showMessage(
+                "Recording telemetry to %s at %.1f samples/s"
+                % (path, self.recorder.rate)
+            )
+        elif self.recorder is not None:
+            self.recorder.stop()
+            self.statusBar().showMessage(
+                "Recorded %i samples to %s"
+                % (self.recorder.samples, self.recorder.writer.path)
+            )
+            self.recorder = None
+            self.record.setStyleSheet("background-color : grey")
+
+    def stats_toggled(self, checked: bool) -> None:
+        """Enables the tracing of the serial traffic and shows the command statistics, updated every second."""
+        set_tracing(checked)
+        if checked:
+            self.update_stats()
+            self.stats_panel.show()
+            self.stats_timer.start()
+        else:
+            self.stats_timer.stop()
+            self.stats_panel.hide()
+
+    def update_stats(self) -> None:
+        traces = {}
+        for motor in self.motor:
+            trace = motor.serial_interface.trace
+            if trace is not None:
+                traces.setdefault(trace.port, trace)
+        self.stats_panel.setPlainText(
+            format_stats({port: trace.summary() for port, trace in traces.items()})
+        )
+
     """ Draw GUI """
 
+    def record_button(self) -> QPushButton:
+        """Draws the toggle button of the telemetry recording below the motorstages.
+
+        Returns:
+            QPushButton: Record button
+        """
+        record = QPushButton(text="Record", parent=self)
+        record.setFixedSize(100, 30)
+        record.move(0, (len(self.conf) + 1) * 30 + 20)
+        record.setStyleSheet("background-color : grey")
+        record.setCheckable(True)
+        record.toggled.connect(self.record_toggled)
+        return record
+
+    def stats_button(self) -> QPushButton:
+        """Draws the toggle button of the serial statistics next to the record button.
+
+        Returns:
+            QPushButton: Stats button
+        """
+        stats = QPushButton(text="Stats", parent=self)
+        stats.setFixedSize(100, 30)
+        stats.move(110, (len(self.conf) + 1) * 30 + 20)
+        stats.setCheckable(True)
+        stats.toggled.connect(self.stats_toggled)
+        return stats
+
+    def stats_window(self) -> QPlainTextEdit:
+        """Window of the counters and latencies of the serial commands, see motor_stage_ui.serial_trace.
+
+        Returns:
+            QPlainTextEdit: Read only text panel
+        """
+        panel = QPlainTextEdit(self)
+        panel.setWindowFlags(Qt.Window)
+        panel.setWindowTitle("Serial statistics")
+        panel.setReadOnly(True)
+        panel.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        panel.resize(800, 300)
+        return panel
+
     def labels(self):
         """Draws labels above motorstage buttons."""
         label = QLabel("Motor", self)
@@ -307,6 +446,10 @@ class MainWindow(QMainWindow):
 
     """ Button actions when clicked  """
 
+    def wake_poller(self, index: int) -> None:
+        """Switches the position polling of a stage to the fast rate after a move command."""
+        self.pollers[self.conf[list(self.conf.keys())[index]]["port"]].wake(index)
+
     def init_clicked(self, address: int, index: int) -> None:
         self.motor[index].init_motor(address)
 
@@ -314,11 +457,13 @@ class MainWindow(QMainWindow):
         self, address: int, unit: str, stage: str, step_size: str, index: int
     ) -> None:
         self.motor[index].move_relative(address, "-1", unit, stage, step_size)
+        self.wake_poller(index)
 
     def move_ahead_clicked(
         self, address: int, unit: str, stage: str, step_size: float, index: int
     ) -> None:
         self.motor[index].move_relative(address, "1", unit, stage, step_size)
+        self.wake_poller(index)
 
     def abort_clicked(self, address: int, index: int) -> None:
         self.motor[index].abort(address)
@@ -328,6 +473,7 @@ class MainWindow(QMainWindow):
 
     def go_home_clicked(self, address: int, index: int) -> None:
         self.motor[index].go_home(address)
+        self.wake_poller(index)
 
     def set_position_abs_clicked(
         self,
@@ -339,6 +485,7 @@ class MainWindow(QMainWindow):
         index: int,
     ) -> None:
         self.motor[index].move_to_position(address, textbox, unit, stage, step_size)
+        self.wake_poller(index)
 
     def set_position_rel_clicked(
         self,
@@ -350,6 +497,7 @@ class MainWindow(QMainWindow):
         index: int,
     ) -> None:
         self.motor[index].move_relative(address, textbox, unit, stage, step_size)
+        self.wake_poller(index)
 
     def get_position_clicked(
         self, address: int, unit: str, stage: str, step_size: float, index: int
@@ -369,6 +517,8 @@ def main():
         config_path = path / "configuration.yaml"
         interface = SerialInterface
 
+    # log output must not block the GUI thread
+    logger.setup_queue_logging()
     app = QApplication(sys.argv)
     window = MainWindow(config_path, interface=interface)
     window.show()
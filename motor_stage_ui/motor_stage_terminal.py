@@ -1,30 +1,37 @@
-from motor_stage_ui.pi_stages_interface import PIStagesInterface as MC
-import motor_stage_ui
-from motor_stage_ui.pi_stages_interface import SerialInterface
-from motor_stage_ui.test.utils import SerialInterfaceMock
+from motor_stage_ui.stage_client import DEFAULT_SOCKET, connect
 
 from pathlib import Path
+import json
 import os
 import click
 import yaml
 
 """
 
-Terminal control UI.
+Terminal control UI. Commands sent to a running motor stage server only load the client,
+the serial driver and the other modules are imported by the commands which need them.
 
 """
 
 
 @click.group()
 @click.pass_context
-def motor(conf):
+@click.option(
+    "--socket",
+    default=DEFAULT_SOCKET,
+    show_default=True,
+    help="socket of the motor stage server",
+)
+def motor(conf, socket: str):
     """Terminal interface for control of the mercury motor controller.
     write e.g. motor move -a amount NAME to move stage NAME amount units.
     Amount can be in different units (3mm, 2cm..). If something does not work check first the configuration file
     (also in basil).
+    If a motor stage server ('motor serve') is running, the commands are sent to the server.
 
         Args:
             conf (str): Needs path to configuration yaml. This path is converted into a click object and passed to the individual functions.
+            socket (str): Path of the unix socket of the motor stage server
     """
     try:
         if os.environ["TEST"]:
@@ -44,6 +51,50 @@ def motor(conf):
         conf.obj["MOCK"] = True
     else:
         conf.obj["MOCK"] = False
+    conf.obj["SOCKET"] = socket
+
+
+def _interface(conf) -> type:
+    """Serial interface class of the configuration, the mock in test mode.
+
+    Args:
+        conf (click.Context): Click context with configuration
+
+    Returns:
+        type: Serial interface class
+    """
+    if conf.obj["MOCK"]:
+        from motor_stage_ui.test.utils import SerialInterfaceMock
+
+        return SerialInterfaceMock
+    from motor_stage_ui.pi_stages_interface import SerialInterface
+
+    return SerialInterface
+
+
+def _call(conf, method: str, **params):
+    """Executes a command on the motor stage server if one is running, else in this process.
+
+    Args:
+        conf (click.Context): Click context with configuration
+        method (str): Name of the command
+        params: Arguments of the command
+
+    Returns:
+        Result of the command
+    """
+    client = connect(conf.obj["SOCKET"])
+    if client is not None:
+        try:
+            return client.call(method, **params)
+        finally:
+            client.close()
+    # no server running, the ports are opened by this process
+    from motor_stage_ui.stage_server import StageController
+
+    return StageController(conf.obj["CONF"], interface=_interface(conf)).call(
+        method, **params
+    )
 
 
 @click.command()
@@ -55,76 +106,59 @@ def init(conf, motor_name: str):
     Args:
         motor_name (str): name of the motorstage
     """
-    if conf.obj["MOCK"]:
-        interface = SerialInterfaceMock
-    else:
-        interface = SerialInterface
-    mc = MC(
-        port=conf.obj["CONF"][motor_name]["port"],
-        baud_rate=conf.obj["CONF"][motor_name]["baud_rate"],
-        interface=interface,
-    )
-    mc.init_motor(conf.obj["CONF"][motor_name]["address"])
+    _call(conf, "init", motor_name=motor_name)
 
 
 @click.command()
 @click.pass_context
 @click.argument("motor_name")
 @click.option("-a", default="0", help="move value")
-def move(conf, motor_name: str, a: str):
+@click.option("-w", "--wait", is_flag=True, help="wait until the stage settled")
+def move(conf, motor_name: str, a: str, wait: bool):
     """Moves the motor stage a relative amount, positive values for ahead, negatives for back.
     Accepts string inputs with units (4cm, -2mm...). If no unit is given, the motor moves the default unit amount.
 
     Args:
         motor_name (str): name of the motorstage
         a (str): Move amount
+        wait (bool): Wait until the stage settled and echo the final position
     """
-    if conf.obj["MOCK"]:
-        interface = SerialInterfaceMock
-    else:
-        interface = SerialInterface
-    mc = MC(
-        port=conf.obj["CONF"][motor_name]["port"],
-        baud_rate=conf.obj["CONF"][motor_name]["baud_rate"],
-        interface=interface,
-    )
-    mc.move_relative(
-        conf.obj["CONF"][motor_name]["address"],
-        a,
-        conf.obj["CONF"][motor_name]["unit"],
-        conf.obj["CONF"][motor_name]["stage_type"],
-        conf.obj["CONF"][motor_name]["step_size"],
-    )
+    position = _call(conf, "move", motor_name=motor_name, a=a, wait=wait)
+    if wait:
+        click.echo(
+            "Position of: "
+            + motor_name
+            + " "
+            + position
+            + " "
+            + conf.obj["CONF"][motor_name]["unit"]
+        )
 
 
 @click.command()
 @click.pass_context
 @click.argument("motor_name")
 @click.option("-a", default="0", help="move value")
-def moveto(conf, motor_name: str, a: str):
+@click.option("-w", "--wait", is_flag=True, help="wait until the stage settled")
+def moveto(conf, motor_name: str, a: str, wait: bool):
     """Moves the motor stage to a absolute position.
     Accepts string inputs with units (4cm, -2mm...). If no unit is given, the motor moves to the default position unit.
 
     Args:
         motor_name (str): name of the motorstage
         a (str): Move to position
+        wait (bool): Wait until the stage settled and echo the final position
     """
-    if conf.obj["MOCK"]:
-        interface = SerialInterfaceMock
-    else:
-        interface = SerialInterface
-    mc = MC(
-        port=conf.obj["CONF"][motor_name]["port"],
-        baud_rate=conf.obj["CONF"][motor_name]["baud_rate"],
-        interface=interface,
-    )
-    mc.move_to_position(
-        conf.obj["CONF"][motor_name]["address"],
-        a,
-        conf.obj["CONF"][motor_name]["unit"],
-        conf.obj["CONF"][motor_name]["stage_type"],
-        conf.obj["CONF"][motor_name]["step_size"],
-    )
+    position = _call(conf, "moveto", motor_name=motor_name, a=a, wait=wait)
+    if wait:
+        click.echo(
+            "Position of: "
+            + motor_name
+            + " "
+            + position
+            + " "
+            + conf.obj["CONF"][motor_name]["unit"]
+        )
 
 
 @click.command()
@@ -136,27 +170,11 @@ def pos(conf, motor_name: str):
     Args:
         motor_name (str): name of the motorstage
     """
-    if conf.obj["MOCK"]:
-        interface = SerialInterfaceMock
-    else:
-        interface = SerialInterface
-    mc = MC(
-        port=conf.obj["CONF"][motor_name]["port"],
-        baud_rate=conf.obj["CONF"][motor_name]["baud_rate"],
-        interface=interface,
-    )
     click.echo(
         "Position of: "
         + motor_name
         + " "
-        + str(
-            mc.get_position(
-                conf.obj["CONF"][motor_name]["address"],
-                conf.obj["CONF"][motor_name]["unit"],
-                conf.obj["CONF"][motor_name]["stage_type"],
-                float(conf.obj["CONF"][motor_name]["step_size"]),
-            )
-        )
+        + str(_call(conf, "pos", motor_name=motor_name))
         + " "
         + conf.obj["CONF"][motor_name]["unit"]
     )
@@ -171,16 +189,7 @@ def stop(conf, motor_name: str):
     Args:
         motor_name (str): name of the motorstage
     """
-    if conf.obj["MOCK"]:
-        interface = SerialInterfaceMock
-    else:
-        interface = SerialInterface
-    mc = MC(
-        port=conf.obj["CONF"][motor_name]["port"],
-        baud_rate=conf.obj["CONF"][motor_name]["baud_rate"],
-        interface=interface,
-    )
-    mc.abort(conf.obj["CONF"][motor_name]["address"])
+    _call(conf, "stop", motor_name=motor_name)
 
 
 @click.command()
@@ -192,16 +201,7 @@ def sethome(conf, motor_name: str):
     Args:
         motor_name (str): name of the motorstage
     """
-    if conf.obj["MOCK"]:
-        interface = SerialInterfaceMock
-    else:
-        interface = SerialInterface
-    mc = MC(
-        port=conf.obj["CONF"][motor_name]["port"],
-        baud_rate=conf.obj["CONF"][motor_name]["baud_rate"],
-        interface=interface,
-    )
-    mc.set_home(conf.obj["CONF"][motor_name]["address"])
+    _call(conf, "sethome", motor_name=motor_name)
 
 
 @click.command()
@@ -213,16 +213,7 @@ def gohome(conf, motor_name: str):
     Args:
         motor_name (str): name of the motorstage
     """
-    if conf.obj["MOCK"]:
-        interface = SerialInterfaceMock
-    else:
-        interface = SerialInterface
-    mc = MC(
-        port=conf.obj["CONF"][motor_name]["port"],
-        baud_rate=conf.obj["CONF"][motor_name]["baud_rate"],
-        interface=interface,
-    )
-    mc.go_home(conf.obj["CONF"][motor_name]["address"])
+    _call(conf, "gohome", motor_name=motor_name)
 
 
 @click.command()
@@ -234,23 +225,293 @@ def status(conf, motor_name: str):
     Args:
         motor_name (str): name of the motorstage
     """
-    if conf.obj["MOCK"]:
-        interface = SerialInterfaceMock
-    else:
-        interface = SerialInterface
-    mc = MC(
-        port=conf.obj["CONF"][motor_name]["port"],
-        baud_rate=conf.obj["CONF"][motor_name]["baud_rate"],
-        interface=interface,
-    )
     click.echo(
         "Status of: "
         + motor_name
         + " "
-        + str(mc.get_stat(conf.obj["CONF"][motor_name]["address"]))
+        + str(_call(conf, "status", motor_name=motor_name))
     )
 
 
+@click.command()
+@click.pass_context
+@click.argument("script", type=click.File("r"), default="-")
+@click.option(
+    "-s", "--stats", is_flag=True, help="print the serial command statistics at the end"
+)
+def run(conf, script, stats: bool):
+    """Runs a yaml script of motor commands in one process, e.g. moves, waits, position reads and loops
+    over positions. The script is read from stdin if no file is given.
+    The commands use one connection to the motor stage server, or open the ports once if no server is running.
+
+    Args:
+        script (file): yaml script, see motor_stage_ui.script.ScriptRunner
+        stats (bool): Trace the serial traffic and print the statistics of the commands at the end.
+            With a server the statistics of the server are printed, if it runs with --trace.
+    """
+    from motor_stage_ui.script import ScriptRunner
+    from motor_stage_ui.serial_trace import format_stats
+
+    client = connect(conf.obj["SOCKET"])
+    if client is not None:
+        call = client.call
+    else:
+        from motor_stage_ui.pi_stages_interface import set_tracing
+        from motor_stage_ui.stage_server import StageController
+
+        interface = _interface(conf)
+        if stats:
+            set_tracing(True)
+        call = StageController(conf.obj["CONF"], interface=interface).call
+    try:
+        for method, params, result in ScriptRunner(call).run(yaml.safe_load(script)):
+            motor_name = params.get("motor_name")
+            if method == "stats":
+                click.echo(format_stats(result))
+            elif method == "status":
+                click.echo("Status of: " + motor_name + " " + str(result))
+            elif result is not None:
+                click.echo(
+                    "Position of: "
+                    + motor_name
+                    + " "
+                    + str(result)
+                    + " "
+                    + conf.obj["CONF"][motor_name]["unit"]
+                )
+        if stats:
+            click.echo(format_stats(call("stats")))
+    finally:
+        if client is not None:
+            client.close()
+        elif stats:
+            set_tracing(False)
+
+
+@click.command()
+@click.pass_context
+@click.option("--json", "as_json", is_flag=True, help="print the statistics as JSON")
+def stats(conf, as_json: bool):
+    """Prints counters and round trip times of the serial commands of the motor stage server
+    ('motor serve --trace'): count, timeouts and errors, mean, 95th percentile and maximum latency
+    per address and command. The JSON output also contains the bytes and the latency histograms.
+
+    Args:
+        as_json (bool): Print the statistics as JSON
+    """
+    from motor_stage_ui.serial_trace import format_stats
+
+    summaries = _call(conf, "stats")
+    if as_json:
+        click.echo(json.dumps(summaries, indent=2))
+    elif not summaries:
+        click.echo("No serial statistics, start the server with 'motor serve --trace'")
+    else:
+        click.echo(format_stats(summaries))
+
+
+@click.command()
+@click.pass_context
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.argument("motor_names", nargs=-1)
+@click.option(
+    "-r",
+    "--rate",
+    type=float,
+    default=None,
+    help="samples per second [default: highest rate of the baud rates, at most 100]",
+)
+@click.option("-d", "--duration", type=float, default=None, help="recording time in s")
+def record(conf, output: str, motor_names: tuple, rate: float, duration: float):
+    """Records position and status of the motor stages at a fixed rate into a binary telemetry file
+    (numpy .npy format, see motor_stage_ui.telemetry). Records all stages if no names are given and runs
+    until interrupted if no duration is given. The serial ports are opened by this process.
+
+    Args:
+        output (str): Path of the telemetry file
+        motor_names (tuple): names of the motorstages
+        rate (float): Samples per second
+        duration (float): Recording time in seconds
+    """
+    from motor_stage_ui.pi_stages_interface import PIStagesInterface
+    from motor_stage_ui.telemetry import TelemetryRecorder, TelemetryWriter
+
+    interface = _interface(conf)
+    names = motor_names or tuple(conf.obj["CONF"])
+    for name in names:
+        if name not in conf.obj["CONF"]:
+            raise click.BadParameter("Unknown motorstage %s" % name)
+    stages = {name: conf.obj["CONF"][name] for name in names}
+    motors = {
+        stage["port"]: PIStagesInterface(
+            port=stage["port"], baud_rate=stage["baud_rate"], interface=interface
+        )
+        for stage in stages.values()
+    }
+    recorder = TelemetryRecorder(stages, motors, TelemetryWriter(output), rate=rate)
+    for index, name in enumerate(names):
+        click.echo("Stage %i: %s" % (index, name))
+    click.echo("Recording at %.1f samples/s" % recorder.rate)
+    try:
+        recorder.run(duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.stop()
+    click.echo(
+        "Recorded %i samples to %s, %i samples missed"
+        % (recorder.samples, output, recorder.missed)
+    )
+
+
+@click.command("scan-bus")
+@click.pass_context
+@click.argument("ports", nargs=-1)
+@click.option(
+    "-b",
+    "--baud-rate",
+    "baud_rates",
+    type=int,
+    multiple=True,
+    help="baud rate to try, can be repeated [default: all]",
+)
+@click.option(
+    "-t",
+    "--timeout",
+    type=float,
+    default=None,
+    help="probe timeout per address in s [default: sized from the baud rate]",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="write the configuration stub to this file",
+)
+def scan_bus_command(
+    conf, ports: tuple, baud_rates: tuple, timeout: float, output: str
+):
+    """Finds the motor controllers of daisy chains: sends a status query to all 16 addresses of every port,
+    all ports in parallel, and prints a configuration stub of the controllers which answered.
+    Probes all serial ports found and the ports of the configuration if no PORTS are given.
+    The baud rates are tried in turn until controllers answer. Stop a running server first,
+    the ports are opened by this process.
+
+    Args:
+        ports (tuple): Serial ports
+        baud_rates (tuple): Baud rates to try
+        timeout (float): Probe timeout per address in seconds
+        output (str): Path of the configuration stub
+    """
+    from motor_stage_ui.bus_scan import config_stub, describe, scan_bus
+
+    interface = _interface(conf)
+    if not ports:
+        from serial.tools.list_ports import comports
+
+        ports = sorted(
+            {info.device for info in comports()}
+            | {stage["port"] for stage in conf.obj["CONF"].values()}
+        )
+    results = scan_bus(
+        list(ports),
+        list(baud_rates) or None,
+        timeout=timeout,
+        interface=interface,
+    )
+    for port, (baud_rate, answers) in results.items():
+        if not answers:
+            click.echo("%s: no controller answers" % port)
+            continue
+        click.echo("%s: %i controllers at %i baud" % (port, len(answers), baud_rate))
+        for address, answer in answers.items():
+            click.echo("  address %2i: %s" % (address, describe(answer)))
+    stub = yaml.safe_dump(config_stub(results), sort_keys=False)
+    header = "# Generated by motor scan-bus, set stage_type, step_size and unit of every stage\n"
+    if output:
+        with open(output, "w") as file:
+            file.write(header + stub)
+        click.echo("Configuration stub written to " + output)
+    elif stub.strip() != "{}":
+        click.echo(header + stub, nl=False)
+
+
+@click.command()
+@click.pass_context
+@click.option("--host", default="127.0.0.1", show_default=True, help="TCP host")
+@click.option("--port", type=int, default=None, help="also listen on this TCP port")
+@click.option(
+    "--trace", is_flag=True, help="trace the serial traffic for 'motor stats'"
+)
+@click.option(
+    "--metrics",
+    type=int,
+    default=None,
+    help="serve Prometheus metrics on this HTTP port",
+)
+@click.option(
+    "--metrics-interval",
+    default=1.0,
+    show_default=True,
+    help="poll interval of the metrics in s",
+)
+def serve(
+    conf, host: str, port: int, trace: bool, metrics: int, metrics_interval: float
+):
+    """Runs the motor stage server. The server keeps the serial ports open,
+    all other motor commands are sent to it instead of opening the ports themselves.
+    With --port the server also accepts clients over TCP, e.g. from other hosts.
+    With --metrics the positions, status and serial counters of all stages are served
+    at http://HOST:METRICS/metrics for Prometheus, this also enables --trace.
+
+    Args:
+        host (str): TCP host to listen on
+        port (int): TCP port to listen on
+        trace (bool): Record counters and latencies of the serial commands
+        metrics (int): HTTP port of the metrics
+        metrics_interval (float): Poll interval of the metrics in seconds
+    """
+    from motor_stage_ui.pi_stages_interface import set_tracing
+    from motor_stage_ui.stage_server import StageController, StageServer, TCPStageServer
+    from motor_stage_ui import logger
+    from threading import Thread
+
+    interface = _interface(conf)
+    # log output must not block the requests
+    logger.setup_queue_logging()
+    set_tracing(trace)
+    controller = StageController(conf.obj["CONF"], interface=interface)
+    servers = [StageServer(conf.obj["SOCKET"], controller)]
+    click.echo("Motor stage server listening on " + conf.obj["SOCKET"])
+    if port is not None:
+        servers.append(TCPStageServer((host, port), controller))
+        Thread(target=servers[-1].serve_forever, daemon=True).start()
+        click.echo("Motor stage server listening on %s:%i" % servers[-1].server_address)
+    monitor = None
+    if metrics is not None:
+        # http.server is only imported when needed, it slows down the start of every command
+        from motor_stage_ui.metrics import MetricsServer, StageMonitor
+
+        monitor = StageMonitor(
+            conf.obj["CONF"], interface=interface, interval=metrics_interval
+        )
+        monitor.start()
+        servers.append(MetricsServer(monitor, (host, metrics)))
+        servers[-1].start()
+        click.echo(
+            "Metrics served on http://%s:%i/metrics" % servers[-1].server_address[:2]
+        )
+    try:
+        servers[0].serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if monitor is not None:
+            monitor.stop()
+        for server in servers:
+            server.server_close()
+
+
 motor.add_command(init)
 motor.add_command(move)
 motor.add_command(moveto)
@@ -260,3 +521,8 @@ motor.add_command(sethome)
 motor.add_command(gohome)
 motor.add_command(pos)
 motor.add_command(status)
+motor.add_command(run)
+motor.add_command(record)
+motor.add_command(stats)
+motor.add_command(scan_bus_command)
+motor.add_command(serve)
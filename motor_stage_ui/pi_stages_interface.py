@@ -1,14 +1,33 @@
 import serial
-from threading import Lock
+from threading import Lock, RLock
+from concurrent.futures import Future
+import math
+import re
 import time
-from pint import UnitRegistry
 import logging
 from motor_stage_ui import logger
+from motor_stage_ui.command_queue import (
+    get_command_queue,
+    close_command_queue,
+    close_command_queues,
+)
+from motor_stage_ui.serial_trace import SerialTrace
+from motor_stage_ui.circuit_breaker import CircuitBreaker
 
 # sudo chown :usr /dev/ttyUSB0
 
 
 class SerialInterface:
+    # SerialTrace of the port, None if tracing is disabled
+    trace = None
+
+    # Length of the answers of queries including the terminator, e.g. 'P:+0000012345' and 'S:84 00 00 00 00 00'
+    REPLY_LENGTHS = {"TP": 14, "TS": 20}
+
+    # Longest time from the end of a command until the first character of the answer in seconds,
+    # response time of the controller and latency of the USB serial adapter
+    response_time = 0.05
+
     def __init__(
         self,
         port: str,
@@ -18,16 +37,63 @@ class SerialInterface:
         timeout: float = 2,
         stopbits: float = 2,
     ):
-        self._serial = serial.Serial(
+        self._serial = self._open_port(port, baud_rate, parity, timeout, stopbits)
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.port = port
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self._terminator = terminator
+        self._lock = RLock()
+        # start bit, 8 data bits, parity and stop bits per character
+        self.char_time = (1 + 8 + (parity != "N") + stopbits) / baud_rate
+        self.breaker = CircuitBreaker()
+        # set after a failed read, stale answers are discarded before the next command
+        self._resync = False
+
+    def _open_port(
+        self, port: str, baud_rate: int, parity: str, timeout: float, stopbits: float
+    ) -> serial.Serial:
+        """Opens the serial port. Simulations of the controllers replace the port here.
+
+        Returns:
+            serial.Serial: Opened port
+        """
+        return serial.Serial(
             port=port,
             baudrate=baud_rate,
             parity=parity,
             timeout=timeout,
             stopbits=stopbits,
         )
-        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
-        self._terminator = terminator
-        self._lock = Lock()
+
+    def close(self):
+        """Close the serial port."""
+        self._serial.close()
+
+    def deadline(self, command: str, pending: int = 0) -> float | None:
+        """Read timeout of the answer of a query, sized from the baud rate and the length of the answer.
+
+        Args:
+            command (str): Query
+            pending (int, optional): Characters which are sent or received before the answer. Defaults to 0.
+
+        Returns:
+            float | None: Timeout in seconds, None if the length of the answer is unknown
+        """
+        length = self.REPLY_LENGTHS.get(command[-2:])
+        if length is None:
+            return None
+        return self.response_time + (pending + length) * self.char_time
+
+    @staticmethod
+    def _address(command: str) -> int | None:
+        """Address of the motorstage of an encoded command e.g. '\x010TP', None for commands without address."""
+        if len(command) < 2 or command[0] != "\x01":
+            return None
+        try:
+            return int(command[1], 16) + 1
+        except ValueError:
+            return None
 
     # Serial helper functions
 
@@ -39,29 +105,611 @@ class SerialInterface:
             command (str): Address of the motorstage
 
         """
+        self._write_many([command])
+
+    def _write_many(self, commands: list[str]):
+        """Write several commands to the serial port with one bulk write.
+
+        Args:
+            commands (list[str]): Commands for the port
+        """
         with self._lock:
-            msg = (command + self._terminator).encode()
+            if self._resync:
+                self._serial.reset_input_buffer()
+                self._resync = False
+            msg = "".join(command + self._terminator for command in commands).encode()
             self.log.debug(msg)
-            self._serial.write(msg)
+            if self.trace is None:
+                self._serial.write(msg)
+                return
+            start = time.perf_counter()
+            try:
+                self._serial.write(msg)
+            except serial.SerialException:
+                self.trace.error(time.perf_counter())
+                raise
+            self.trace.written(commands, self._terminator, start, time.perf_counter())
+
+    def _read(self, timeout: float = None):
+        """Read message from serial port. Incomplete answers are discarded.
 
-    def _read(self):
-        """Read message from serial port.
+        Args:
+            timeout (float, optional): Read timeout in seconds. Defaults to the timeout of the port.
 
         Returns:
             str: message
         """
-        msg = (
-            self._serial.read_until(self._terminator.encode())
-            .decode()
-            .strip(self._terminator)
-        )
-        if msg == "":
-            self.log.error("No responds from serial interface.")
-            raise ValueError
+        with self._lock:
+            timeout = self.timeout if timeout is None else timeout
+            try:
+                # changing the timeout reconfigures the port, it is only set if it differs
+                if self._serial.timeout != timeout:
+                    self._serial.timeout = timeout
+                raw = self._serial.read_until(self._terminator.encode())
+            except serial.SerialException:
+                if self.trace is not None:
+                    self.trace.error(time.perf_counter())
+                raise
+            complete = raw.endswith(self._terminator.encode())
+            if self.trace is not None:
+                self.trace.read(len(raw), time.perf_counter(), timeout=not complete)
+            if not complete:
+                # the rest of the answer may still arrive, it must not be taken for the next answer
+                self._resync = True
+                if raw:
+                    self.log.error("Incomplete answer %r from serial interface." % raw)
+                else:
+                    self.log.error("No responds from serial interface.")
+                raise ValueError
+        return raw.decode().strip(self._terminator)
+
+    def transaction(self, command: str, timeout: float = None) -> str:
+        """Write command to serial port and read back the answer.
+        The bus is locked for the whole exchange, no other command can be sent in between.
+        Queries of an address which does not respond are refused until its backoff elapsed, see CircuitBreaker.
+
+        Args:
+            command (str): Command for the port
+            timeout (float, optional): Read timeout in seconds.
+                Defaults to the deadline of the query if the length of its answer is known, else the timeout of the port.
+
+        Returns:
+            str: Answer message
+        """
+        address = self._address(command)
+        if address is not None and not self.breaker.allow(address):
+            self.log.debug("Motorstage with address %i is offline" % address)
+            raise ValueError("Motorstage with address %i is offline" % address)
+        if timeout is None:
+            timeout = self.deadline(command, pending=len(command) + 1)
+        with self._lock:
+            self._write(command)
+            try:
+                msg = self._read(timeout)
+            except ValueError:
+                if address is not None:
+                    self.breaker.failure(address)
+                raise
+        if address is not None:
+            self.breaker.success(address)
         return msg
 
+    def transactions(self, commands: list[str], timeout: float = None) -> list[str]:
+        """Pipelined transactions: all commands are written at once, then all answers are read back in order.
+        The bus is locked for the whole exchange. The answers do not tell the address, so if one is missing
+        the commands are repeated one by one to find the addresses which do not respond.
+
+        Args:
+            commands (list[str]): Commands for the port
+            timeout (float, optional): Read timeout in seconds per answer. Defaults to the deadline of every query.
+
+        Returns:
+            list[str]: Answer messages in the order of the commands
+        """
+        if not commands:
+            return []
+        addresses = [self._address(command) for command in commands]
+        for address in addresses:
+            if address is not None and not self.breaker.allow(address):
+                self.log.debug("Motorstage with address %i is offline" % address)
+                raise ValueError("Motorstage with address %i is offline" % address)
+        if timeout is None:
+            # the first answer follows all commands
+            pending = sum(len(command) + 1 for command in commands)
+            timeouts = [self.deadline(commands[0], pending=pending)] + [
+                self.deadline(command) for command in commands[1:]
+            ]
+        else:
+            timeouts = [timeout] * len(commands)
+        with self._lock:
+            self._write_many(commands)
+            try:
+                answers = [self._read(timeout) for timeout in timeouts]
+            except ValueError:
+                for command in commands:
+                    try:
+                        self.transaction(command, timeout)
+                    except ValueError:
+                        pass
+                raise
+        for address in addresses:
+            if address is not None:
+                self.breaker.success(address)
+        return answers
+
+
+# Process wide registry of opened serial interfaces. Stages in a daisy chain share one port
+# and therefore one serial interface and one lock.
+_serial_interfaces = {}
+_serial_interfaces_lock = Lock()
+# Serial interfaces get a SerialTrace if tracing is enabled
+_tracing = False
+
+
+def get_serial_interface(
+    port: str,
+    baud_rate: int = 9600,
+    parity: str = "N",
+    terminator: str = "\r",
+    timeout: float = 2,
+    stopbits: float = 2,
+    interface: type[SerialInterface] = SerialInterface,
+) -> SerialInterface:
+    """Returns the serial interface of the given port. The port is opened only once per process,
+    all further requests for the same port get the already opened interface.
+
+    Args:
+        port (str): Serial port
+        baud_rate (int, optional): Baud rate of the port. Defaults to 9600.
+        parity (str, optional): Parity of the port. Defaults to "N".
+        terminator (str, optional): Message terminator. Defaults to carriage return.
+        timeout (float, optional): Read timeout in seconds. Defaults to 2.
+        stopbits (float, optional): Number of stop bits. Defaults to 2.
+        interface (type[SerialInterface], optional): Serial interface class. Defaults to SerialInterface.
+
+    Returns:
+        SerialInterface: Shared serial interface of the port
+    """
+    key = (interface, port)
+    with _serial_interfaces_lock:
+        serial_interface = _serial_interfaces.get(key)
+        if serial_interface is None:
+            serial_interface = interface(
+                port=port,
+                baud_rate=baud_rate,
+                parity=parity,
+                terminator=terminator,
+                timeout=timeout,
+                stopbits=stopbits,
+            )
+            if _tracing:
+                serial_interface.trace = SerialTrace(port)
+            _serial_interfaces[key] = serial_interface
+        elif serial_interface.baud_rate != baud_rate:
+            raise ValueError(
+                "Port %s already opened with baud rate %s, requested %s"
+                % (port, serial_interface.baud_rate, baud_rate)
+            )
+    return serial_interface
+
+
+def close_serial_interfaces() -> None:
+    """Closes all opened serial interfaces and clears the registry."""
+    close_command_queues()
+    with _serial_interfaces_lock:
+        for serial_interface in _serial_interfaces.values():
+            serial_interface.close()
+        _serial_interfaces.clear()
+
+
+def close_serial_interface(serial_interface: SerialInterface) -> None:
+    """Closes one opened serial interface and removes it from the registry.
+
+    Args:
+        serial_interface (SerialInterface): Serial interface of the port
+    """
+    close_command_queue(serial_interface)
+    with _serial_interfaces_lock:
+        for key, value in list(_serial_interfaces.items()):
+            if value is serial_interface:
+                del _serial_interfaces[key]
+    serial_interface.close()
+
+
+def set_tracing(enabled: bool = True) -> None:
+    """Enables or disables the tracing of the serial traffic of all opened and future serial interfaces.
+    Enabling resets the statistics.
+
+    Args:
+        enabled (bool, optional): Record commands, answers and round trip times. Defaults to True.
+    """
+    global _tracing
+    with _serial_interfaces_lock:
+        _tracing = enabled
+        for (_, port), serial_interface in _serial_interfaces.items():
+            serial_interface.trace = SerialTrace(port) if enabled else None
+
+
+# Bits of the first byte of the 'TS' status answer (status byte of the LM629 motion controller)
+STATUS_FLAGS = {
+    "busy": 0,
+    "command_error": 1,
+    "trajectory_complete": 2,
+    "index_pulse": 3,
+    "position_limit": 4,
+    "position_error": 5,
+    "breakpoint": 6,
+    "motor_off": 7,
+}
+
+
+def decode_status(msg: str) -> dict:
+    """Decodes the status byte of a 'TS' answer e.g. 'S:84 00 00 00 00 00'.
+
+    Args:
+        msg (str): Answer of the status command
+
+    Returns:
+        dict: Status flags by name, empty if the answer can not be decoded
+    """
+    status = status_byte(msg)
+    if status is None:
+        return {}
+    return {flag: bool(status >> bit & 1) for flag, bit in STATUS_FLAGS.items()}
+
+
+def status_byte(msg: str) -> int | None:
+    """Raw status byte of a 'TS' answer e.g. 'S:84 00 00 00 00 00'.
+
+    Args:
+        msg (str): Answer of the status command
+
+    Returns:
+        int | None: Status byte, None if the answer can not be decoded
+    """
+    try:
+        return int(msg.split(":")[-1].split()[0], 16)
+    except (ValueError, IndexError):
+        return None
+
+
+# Pint unit registry shared by all interfaces, created with the first unit string which needs pint
+_unit_registry = None
+_unit_registry_lock = Lock()
+
+
+def get_unit_registry():
+    """Returns the process wide pint unit registry. Pint is imported and the registry is created on first use,
+    since loading the unit definitions is slow and most inputs are converted without pint.
+
+    Returns:
+        pint.UnitRegistry: Shared unit registry
+    """
+    global _unit_registry
+    with _unit_registry_lock:
+        if _unit_registry is None:
+            from pint import UnitRegistry
+
+            _unit_registry = UnitRegistry()
+    return _unit_registry
+
+
+# Base unit of the motor step size per stage type
+BASE_UNITS = {"translation": "um", "rotation": "deg"}
+
+# Conversion factors of common units into the base unit of the stage type, other units are converted with pint
+UNIT_FACTORS = {
+    "translation": {
+        "nm": 1e-3,
+        "um": 1.0,
+        "µm": 1.0,
+        "micrometer": 1.0,
+        "mm": 1e3,
+        "millimeter": 1e3,
+        "cm": 1e4,
+        "centimeter": 1e4,
+        "m": 1e6,
+        "meter": 1e6,
+        "in": 25.4e3,
+        "inch": 25.4e3,
+    },
+    "rotation": {
+        "deg": 1.0,
+        "degree": 1.0,
+        "°": 1.0,
+        "arcmin": 1 / 60,
+        "arcsec": 1 / 3600,
+        "rad": 180 / math.pi,
+        "radian": 180 / math.pi,
+        "mrad": 0.18 / math.pi,
+        "urad": 1.8e-4 / math.pi,
+    },
+}
+
+# Amount input as number with optional unit, e.g. '-2mm', '1.5 deg' or '3e-2cm'
+AMOUNT_PATTERN = re.compile(
+    r"^\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)\s*([^\d\s+\-*/^()]*)\s*$"
+)
+
+
+# Signed position in steps at the end of a 'TP' answer
+POSITION_PATTERN = re.compile(r"([+-]?\d+)\s*$")
+
+
+class SettleState:
+    """Bookkeeping of the position polls while waiting for several motorstages to settle,
+    shared by the synchronous and the asyncio stage interfaces. The drivers only do the I/O:
+    poll the positions of the pending stages, pass them to update and check the status register
+    of the stages at rest.
+    """
 
-class PIStagesInterface:
+    def __init__(
+        self,
+        addresses: list[int],
+        targets: dict = None,
+        timeout: float = 60,
+        settle_polls: int = 2,
+        log: logging.Logger = None,
+    ):
+        """
+        Args:
+            addresses (list[int]): Addresses of the motorstages
+            targets (dict, optional): Target positions in motor steps by address. Defaults to None.
+            timeout (float, optional): Maximum waiting time in seconds. Defaults to 60.
+            settle_polls (int, optional): Number of consecutive polls with unchanged position to count as settled. Defaults to 2.
+            log (logging.Logger, optional): Logger of the stage interface. Defaults to None.
+        """
+        self.targets = targets or {}
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.settle_polls = settle_polls
+        self.log = log
+        # addresses which did not settle yet, they are polled
+        self.pending = list(addresses)
+        # final positions by address
+        self.settled = {}
+        self._previous = {}
+        self._stable = {}
+
+    def update(self, address: int, position: int) -> bool:
+        """Records a polled position. A stage at its target position is settled.
+
+        Args:
+            address (int): Address of the motorstage
+            position (int): Polled position in motor steps
+
+        Returns:
+            bool: True if the stage is at rest but not at its target, its trajectory status has to be checked
+        """
+        if position == self._previous.get(address):
+            self._stable[address] = self._stable.get(address, 0) + 1
+        else:
+            self._stable[address] = 0
+        self._previous[address] = position
+        if position == self.targets.get(address):
+            self.settled[address] = position
+            return False
+        return self._stable[address] >= self.settle_polls - 1
+
+    def settle(self, address: int) -> None:
+        """Marks a stage at rest without running trajectory as settled at its last polled position.
+
+        Args:
+            address (int): Address of the motorstage
+        """
+        self.settled[address] = self._previous[address]
+
+    def done(self, poll_interval: float) -> bool:
+        """Ends a poll: settled stages are not polled anymore.
+
+        Args:
+            poll_interval (float): Time until the next poll in seconds
+
+        Returns:
+            bool: True if all stages settled
+        """
+        self.pending = [
+            address for address in self.pending if address not in self.settled
+        ]
+        if not self.pending:
+            return True
+        if time.monotonic() + poll_interval > self.deadline:
+            if self.log is not None:
+                self.log.error(
+                    "Motorstages with addresses %s did not settle within %.1f s"
+                    % (self.pending, self.timeout)
+                )
+            raise TimeoutError
+        return False
+
+
+class StageConversion:
+    """Conversion between user units and motor steps, shared by the synchronous and the asyncio stage interfaces.
+    Also holds the parts of the moves which do no I/O, so both drivers build the same commands.
+    Expects a 'log' and an '_unit_factors' dict attribute.
+    """
+
+    @property
+    def ureg(self):
+        """Shared pint unit registry, see get_unit_registry."""
+        return get_unit_registry()
+
+    def _format_position(
+        self, value: int, unit: str, stage: str, step_size: float
+    ) -> str:
+        """Converts a position in motor steps into the given unit.
+
+        Args:
+            value (int): position in motor steps
+            unit (str): output unit
+            stage (str): stage type either 'rotation' or translation
+            step_size (float): step size of the motorstage given in deg or um
+
+        Returns:
+            str: position in unit 3 digits precision
+        """
+        return "%.3f" % (value * step_size / self._unit_factor(unit, stage))
+
+    def _parse_position(self, msg: str) -> int:
+        """Parses the answer of a position query e.g. 'P:+0000012345', the signed number at the end of the answer.
+
+        Args:
+            msg (str): Answer of the 'TP' command
+
+        Returns:
+            int: position in integer step sizes
+        """
+        match = POSITION_PATTERN.search(msg)
+        if match is None:
+            self.log.error(
+                "Invalid motor stage responds:, check addresses, baudrate..."
+            )
+            raise ValueError
+        return int(match.group(1))
+
+    def _calculate_value(
+        self, amount: str, unit: str, stage: str, step_size: float | str
+    ) -> int:
+        """Calculates number of motor steps from a given input amount and the given units
+
+        Args:
+            amount (str): Input amount
+            unit (str): default unit to convert
+            stage (str): stagetype
+            step_size (float): hardware specific step size
+
+        Returns:
+            int: Number of motor steps.
+        """
+        if stage not in BASE_UNITS:
+            self.log.warning("Invalid stage type")
+            raise ValueError
+        match = AMOUNT_PATTERN.match(amount)
+        if match:
+            value, amount_unit = match.groups()
+            return (
+                float(value)
+                * self._unit_factor(amount_unit or unit, stage)
+                / float(step_size)
+            )
+        # expressions like '1/2 inch' are parsed by pint
+        try:
+            quantity = self.ureg.Quantity(amount)
+            if quantity.unitless:
+                quantity = quantity.magnitude * self.ureg.Quantity(unit)
+            return quantity.to(BASE_UNITS[stage]).magnitude / float(step_size)
+        # pint errors derive from these builtin exceptions
+        except (AttributeError, TypeError, ValueError, SyntaxError) as e:
+            self.log.warning("Can not convert %s: %s" % (amount, e))
+            raise ValueError
+
+    def _unit_factor(self, unit: str, stage: str) -> float:
+        """Conversion factor of a unit into the base unit of the stage type (um or deg).
+        Factors are calculated once and cached, pint is only used for units which are not tabulated.
+
+        Args:
+            unit (str): unit
+            stage (str): stage type either 'rotation' or translation
+
+        Returns:
+            float: factor to convert the unit into the base unit
+        """
+        factor = self._unit_factors.get((unit, stage))
+        if factor is None:
+            factor = UNIT_FACTORS[stage].get(unit)
+            if factor is None:
+                try:
+                    factor = self.ureg.Quantity(1, unit).to(BASE_UNITS[stage]).magnitude
+                except (AttributeError, TypeError, ValueError) as e:
+                    self.log.warning("Invalid unit %s: %s" % (unit, e))
+                    raise ValueError
+            self._unit_factors[(unit, stage)] = factor
+        return factor
+
+    def _move_steps(self, amount: str, unit: str, stage: str, step_size: float) -> int:
+        """Checks the input of a move and converts the amount into motor steps.
+
+        Args:
+            amount (str): absolute position or relative move amount
+            unit (str): input unit
+            stage (str): stage type either 'rotation' or translation
+            step_size (float): step size of the motorstage given in deg or um respectively
+
+        Returns:
+            int: Number of motor steps
+        """
+        if amount == "" or stage not in ["translation", "rotation"]:
+            self.log.warning("Invalid stage type or amount input")
+            raise ValueError
+        return int(self._calculate_value(amount, unit, stage, step_size))
+
+    def _target_steps(self, targets: dict, stages: dict, port: str) -> dict:
+        """Checks the targets of a move of several motorstages and converts them into motor steps.
+
+        Args:
+            targets (dict): Absolute target positions by motorstage name
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml
+            port (str): Serial port of the interface, stages of other ports are rejected
+
+        Returns:
+            dict: Target positions in integer step sizes by address
+        """
+        steps = {}
+        for name, amount in targets.items():
+            conf = stages[name]
+            if conf.get("port", port) != port:
+                self.log.error("Motorstage %s is not connected to this port" % name)
+                raise ValueError
+            if amount == "" or conf["stage_type"] not in ["translation", "rotation"]:
+                self.log.warning("Invalid stage type or amount input of %s" % name)
+                raise ValueError
+            steps[conf["address"]] = int(
+                self._calculate_value(
+                    str(amount), conf["unit"], conf["stage_type"], conf["step_size"]
+                )
+            )
+        return steps
+
+    def _move_commands(self, steps: dict) -> list[str]:
+        """Encoded absolute move commands of several motorstages, written back-to-back with one write.
+
+        Args:
+            steps (dict): Target positions in integer step sizes by address
+
+        Returns:
+            list[str]: Move commands
+        """
+        if not all(steps):
+            self.log.error("Commands needs motor address")
+            raise ValueError
+        return [
+            ("\x01%X" % (address - 1)) + "MA%d" % value
+            for address, value in steps.items()
+        ]
+
+    def _format_positions(self, positions: dict, names, stages: dict) -> dict:
+        """Converts the final positions of a move of several motorstages into their units.
+
+        Args:
+            positions (dict): Positions in integer step sizes by address
+            names (iterable): Names of the moved motorstages
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml
+
+        Returns:
+            dict: position of each motorstage in its unit with 3 digits precision
+        """
+        return {
+            name: self._format_position(
+                positions[stages[name]["address"]],
+                stages[name]["unit"],
+                stages[name]["stage_type"],
+                float(stages[name]["step_size"]),
+            )
+            for name in names
+        }
+
+
+class PIStagesInterface(StageConversion):
     def __init__(
         self,
         port: str,
@@ -71,47 +719,75 @@ class PIStagesInterface:
         timeout: float = 2,
         stopbits: float = 2,
         interface: type[SerialInterface] = SerialInterface,
+        queued: bool = False,
     ):
-        self.serial_interface = interface(
+        """
+        Args:
+            port (str): Serial port
+            baud_rate (int, optional): Baud rate of the port. Defaults to 9600.
+            parity (str, optional): Parity of the port. Defaults to "N".
+            terminator (str, optional): Message terminator. Defaults to carriage return.
+            timeout (float, optional): Read timeout in seconds. Defaults to 2.
+            stopbits (float, optional): Number of stop bits. Defaults to 2.
+            interface (type[SerialInterface], optional): Serial interface class. Defaults to SerialInterface.
+            queued (bool, optional): Send commands without answer through the asynchronous command queue of the port.
+                Those commands then return a future instead of blocking on the write. Defaults to False.
+        """
+        self.serial_interface = get_serial_interface(
             port=port,
             baud_rate=baud_rate,
             parity=parity,
             terminator=terminator,
             timeout=timeout,
             stopbits=stopbits,
+            interface=interface,
         )
 
         self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
-        self.ureg = UnitRegistry()
+        self._unit_factors = {}
+        self.command_queue = (
+            get_command_queue(self.serial_interface) if queued else None
+        )
 
-    def _write_command(self, command: str, address: int = None):
+    def _write_command(self, command: str, address: int = None) -> Future | None:
         """Encodes the command for the PI motor stages.
         This includes a header '01' and an address to select the specific stage and deselect the others and the command.
 
         Args:
             command (str): Command for the stage
             address (int, optional): Address of the specific motor stage. Defaults to None.
+
+        Returns:
+            Future | None: Resolved when the command is written if the interface is queued, else None
         """
         if address:
-            self.serial_interface._write(("\x01%d" % (address - 1)) + command)
+            command = ("\x01%X" % (address - 1)) + command
+            if self.command_queue is not None:
+                return self.command_queue.submit(command)
+            self.serial_interface._write(command)
         else:
             self.log.error("Commands needs motor address")
 
-    def _write_read(self, command: str, address: int = None):
-        """Write command to port and read back answer.
+    def _write_read(self, command: str, address: int = None, timeout: float = None):
+        """Write command to port and read back answer as one transaction.
 
         Args:
             command (str): Command for port
             address (int, optional): Address of specific motor stage. Defaults to None.
+            timeout (float, optional): Read timeout in seconds. Defaults to the timeout of the port.
 
         Returns:
-            _type_: Answer message
+            str: Answer message
         """
-        if address:
-            self.serial_interface._write(("\x01%d" % (address - 1)) + command)
-        else:
+        if not address:
             self.log.error("Commands needs motor address")
-        return self.serial_interface._read()
+            raise ValueError
+        if self.command_queue is not None:
+            # queries must see the effect of all commands queued before
+            self.command_queue.flush()
+        return self.serial_interface.transaction(
+            ("\x01%X" % (address - 1)) + command, timeout=timeout
+        )
 
     # Motor stage commands
 
@@ -143,13 +819,13 @@ class PIStagesInterface:
 
         logging.info("Initialized motorstage with address: %i" % address)
 
-    def motor_on(self, address=None):
-        self._write_command("MN", address)
+    def motor_on(self, address=None) -> Future | None:
+        return self._write_command("MN", address)
 
-    def motor_off(self, address=None):
-        self._write_command("MF", address)
+    def motor_off(self, address=None) -> Future | None:
+        return self._write_command("MF", address)
 
-    def set_velocity(self, address: int, velocity: int):
+    def set_velocity(self, address: int, velocity: int) -> Future | None:
         """Set motorstage velocity.
 
         Args:
@@ -157,7 +833,7 @@ class PIStagesInterface:
             velocity (int): Motorstage velocity is set allegedly as steps per second (This seems a bit random in tests.)
         """
         velocity = "SV" + str(velocity)
-        self._write_command(velocity, address=address)
+        return self._write_command(velocity, address=address)
 
     def find_edge(
         self, address: int, unit: str, stage: str, step_size: float, edge: int = 0
@@ -174,23 +850,31 @@ class PIStagesInterface:
         )
         self.log.warning("Edge found at position: {pos}".format(pos=pos))
 
-    def set_home(self, address: int) -> None:
+    def set_home(self, address: int) -> Future | None:
         """Set the current position of the motorstage as new 0.
 
         Args:
             address (int): Address of the motorstage
+
+        Returns:
+            Future | None: Resolved when the command is written if the interface is queued, else None
         """
-        self._write_command("DH", address)
+        future = self._write_command("DH", address)
         self.log.info("Set Home for motorstage with address: %i" % (address))
+        return future
 
-    def go_home(self, address: int) -> None:
+    def go_home(self, address: int) -> Future | None:
         """Moves the motorstage to the absolute zero position.
 
         Args:
             address (int): Address of the motorstage
+
+        Returns:
+            Future | None: Resolved when the command is written if the interface is queued, else None
         """
-        self._write_command("GH", address)
+        future = self._write_command("GH", address)
         self.log.info("Go Home for motorstage with address: %i" % (address))
+        return future
 
     def get_stat(self, address: int) -> None:
         """Logs status of the motor stage to the terminal. This also resets status register.
@@ -202,18 +886,22 @@ class PIStagesInterface:
         self.log.debug("Status of motor stage with address %i: %s" % (address, err_msg))
         return err_msg
 
-    def abort(self, address: int) -> None:
+    def abort(self, address: int) -> Future | None:
         """Stops all movement of the motorstage.
 
         Args:
             address (int): Address of the motorstage
+
+        Returns:
+            Future | None: Resolved when the command is written if the interface is queued, else None
         """
-        self._write_command("AB", address)
+        future = self._write_command("AB", address)
         self.log.info("Stop all movement motorstage with address: %i" % (address))
+        return future
 
     def move_to_position(
         self, address: int, amount: str, unit: str, stage: str, step_size: float
-    ) -> None:
+    ) -> Future | None:
         """Moves the motor stage absolute position.
         Accepts string inputs with units (4cm, -2mm...). If no unit is given, the motor moves the default unit amount.
         The unit inputs are converted using the pint package into the according motor controller steps.
@@ -225,11 +913,14 @@ class PIStagesInterface:
             unit (str): input unit
             stage (int): stage type either 'rotation' or translation
             step_size (float): step size of the motorstage given in deg or um respectively
+
+        Returns:
+            Future | None: Resolved when the command is written if the interface is queued, else None
         """
         try:
             if amount != "" and stage in ["translation", "rotation"]:
                 pos = self._calculate_value(amount, unit, stage, step_size)
-                self._move_to_position(address, int(pos))
+                return self._move_to_position(address, int(pos))
             else:
                 self.log.warning("Invalid stage type")
         except:
@@ -237,7 +928,7 @@ class PIStagesInterface:
 
     def move_relative(
         self, address: int, amount: str, unit: str, stage: str, step_size: float
-    ) -> None:
+    ) -> Future | None:
         """Moves the motor stage relative amount, positive values for ahead, negatives for back.
         Accepts string inputs with units (4cm, -2mm...). If no unit is given, the motor moves the default unit amount.
         The unit inputs are converted using the pint package into the according motor controller steps.
@@ -249,16 +940,181 @@ class PIStagesInterface:
             unit (str): input unit
             stage (int): stage type either 'rotation' or translation
             step_size (float): step size of the motorstage given in deg or um respectively
+
+        Returns:
+            Future | None: Resolved when the command is written if the interface is queued, else None
         """
         try:
             if amount != "" and stage in ["translation", "rotation"]:
                 pos = self._calculate_value(amount, unit, stage, step_size)
-                self._move_relative(address, int(pos))
+                return self._move_relative(address, int(pos))
             else:
                 self.log.warning("Invalid stage type")
         except:
             self.log.warning("Invalid amount input")
 
+    def move_and_wait(
+        self,
+        address: int,
+        amount: str,
+        unit: str,
+        stage: str,
+        step_size: float,
+        relative: bool = False,
+        timeout: float = 60,
+        poll_interval: float = 0.05,
+    ) -> str:
+        """Moves the motor stage and blocks until it settled.
+        Accepts string inputs with units (4cm, -2mm...). If no unit is given, the motor moves the default unit amount.
+
+        Args:
+            address (int): Address of the motorstage
+            amount (str): absolute position or relative move amount
+            unit (str): input and output unit
+            stage (int): stage type either 'rotation' or translation
+            step_size (float): step size of the motorstage given in deg or um respectively
+            relative (bool, optional): Move relative instead of absolute. Defaults to False.
+            timeout (float, optional): Maximum time to wait for the move in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls in seconds. Defaults to 0.05.
+
+        Returns:
+            str: final position of the motorstage in unit 3 digits precision
+        """
+        value = self._move_steps(amount, unit, stage, step_size)
+        if relative:
+            target = self._get_position(address) + value
+            self._move_relative(address, value)
+        else:
+            target = value
+            self._move_to_position(address, value)
+        position = self.wait_until_idle(
+            address, timeout=timeout, poll_interval=poll_interval, target=target
+        )
+        return self._format_position(position, unit, stage, float(step_size))
+
+    def move_many(
+        self,
+        targets: dict,
+        stages: dict,
+        timeout: float = 60,
+        poll_interval: float = 0.05,
+    ) -> dict:
+        """Moves several motorstages of the daisy chain to absolute positions at the same time and blocks until all settled.
+        All move commands are sent back-to-back with one write, then the positions of all stages are polled together.
+        Accepts string inputs with units (4cm, -2mm...). If no unit is given, the default unit of the stage is used.
+
+        Args:
+            targets (dict): Absolute target positions by motorstage name
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml,
+                each with 'address', 'unit', 'stage_type' and 'step_size'
+            timeout (float, optional): Maximum time to wait for the moves in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls in seconds. Defaults to 0.05.
+
+        Returns:
+            dict: final position of each motorstage in its unit with 3 digits precision
+        """
+        steps = self._target_steps(targets, stages, self.serial_interface.port)
+        positions = self.move_to_steps(
+            steps, timeout=timeout, poll_interval=poll_interval
+        )
+        return self._format_positions(positions, targets, stages)
+
+    def move_to_steps(
+        self, steps: dict, timeout: float = 60, poll_interval: float = 0.05
+    ) -> dict:
+        """Moves several motorstages of the daisy chain to absolute positions in motor steps at the same time
+        and blocks until all settled. All move commands are sent back-to-back with one write.
+
+        Args:
+            steps (dict): Target positions in integer step sizes by address
+            timeout (float, optional): Maximum time to wait for the moves in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls in seconds. Defaults to 0.05.
+
+        Returns:
+            dict: final positions in integer step sizes by address
+        """
+        commands = self._move_commands(steps)
+        if self.command_queue is not None:
+            self.command_queue.flush()
+        self.serial_interface._write_many(commands)
+        self.log.info("Move to positions %s" % steps)
+        return self._wait_until_idle(
+            list(steps), targets=steps, timeout=timeout, poll_interval=poll_interval
+        )
+
+    def wait_until_idle(
+        self,
+        address: int,
+        timeout: float = 60,
+        poll_interval: float = 0.05,
+        target: int = None,
+    ) -> int:
+        """Blocks until the motorstage stopped moving.
+        The stage is settled as soon as it reached the target position, or its position did not change
+        between consecutive polls while the status reports no running trajectory.
+
+        Args:
+            address (int): Address of the motorstage
+            timeout (float, optional): Maximum waiting time in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls in seconds. Defaults to 0.05.
+            target (int, optional): Target position in motor steps. Defaults to None.
+
+        Returns:
+            int: final position of the motorstage in integer step sizes
+        """
+        return self._wait_until_idle(
+            [address],
+            targets={address: target},
+            timeout=timeout,
+            poll_interval=poll_interval,
+        )[address]
+
+    def _wait_until_idle(
+        self,
+        addresses: list[int],
+        targets: dict = None,
+        timeout: float = 60,
+        poll_interval: float = 0.05,
+        settle_polls: int = 2,
+    ) -> dict:
+        """Waits until all given motorstages of the daisy chain settled, the positions of all moving stages are polled together.
+
+        Args:
+            addresses (list[int]): Addresses of the motorstages
+            targets (dict, optional): Target positions in motor steps by address. Defaults to None.
+            timeout (float, optional): Maximum waiting time in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls in seconds. Defaults to 0.05.
+            settle_polls (int, optional): Number of consecutive polls with unchanged position to count as settled. Defaults to 2.
+
+        Returns:
+            dict: final positions in integer step sizes by address
+        """
+        state = SettleState(addresses, targets, timeout, settle_polls, self.log)
+        while True:
+            pending = state.pending
+            for address, position in zip(pending, self._get_positions(pending)):
+                if state.update(address, position) and not self._trajectory_running(
+                    address
+                ):
+                    state.settle(address)
+            if state.done(poll_interval):
+                return state.settled
+            time.sleep(poll_interval)
+
+    def _trajectory_running(self, address: int) -> bool:
+        """Checks the status register for a running trajectory.
+
+        Args:
+            address (int): Address of the motorstage
+
+        Returns:
+            bool: True if the status reports an unfinished trajectory of a powered motor
+        """
+        flags = decode_status(self.get_stat(address))
+        return (
+            bool(flags) and not flags["trajectory_complete"] and not flags["motor_off"]
+        )
+
     def get_position(
         self, address: int, unit: str, stage: str, step_size: float
     ) -> str:
@@ -274,38 +1130,66 @@ class PIStagesInterface:
             str: current position of motorstage in unit 3 digits precision respectively
         """
         if stage in ["translation", "rotation"]:
-            if stage == "translation":
-                pos = self._get_position(address) * step_size * self.ureg.micrometer
-                return "%.3f" % (pos.to(unit).magnitude)
-            if stage == "rotation":
-                pos = self._get_position(address) * step_size * self.ureg.deg
-                return "%.3f" % (pos.to(unit).magnitude)
+            return self._format_position(
+                self._get_position(address), unit, stage, step_size
+            )
         else:
             self.log.warning("Invalid stage type")
 
-    def _move_to_position(self, address: int, value: int) -> None:
+    def get_positions(self, stages: dict) -> dict:
+        """Get current positions of several motorstages of the daisy chain.
+        The position queries are pipelined: all commands are written first, then all answers are read.
+
+        Args:
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml,
+                each with 'address', 'unit', 'stage_type' and 'step_size'
+
+        Returns:
+            dict: current position of each motorstage in its unit with 3 digits precision
+        """
+        for name, conf in stages.items():
+            if conf["stage_type"] not in ["translation", "rotation"]:
+                self.log.warning("Invalid stage type of motorstage %s" % name)
+                raise ValueError
+        steps = self._get_positions([conf["address"] for conf in stages.values()])
+        return {
+            name: self._format_position(
+                value, conf["unit"], conf["stage_type"], float(conf["step_size"])
+            )
+            for value, (name, conf) in zip(steps, stages.items())
+        }
+
+    def _move_to_position(self, address: int, value: int) -> Future | None:
         """Helper function for pyserial
 
         Args:
             address (int): Address of the motorstage
             value (int): move amount
+
+        Returns:
+            Future | None: Resolved when the command is written if the interface is queued, else None
         """
-        self._write_command("MA%d" % value, address)
+        future = self._write_command("MA%d" % value, address)
         self.log.info(
             "Move to position %i motorstage with address: %i" % (value, address)
         )
+        return future
 
-    def _move_relative(self, address: int, value: int = 1000000) -> None:
+    def _move_relative(self, address: int, value: int = 1000000) -> Future | None:
         """Helper function for pyserial
 
         Args:
             address (int): Address of the motorstage
             value (int): move amount
+
+        Returns:
+            Future | None: Resolved when the command is written if the interface is queued, else None
         """
-        self._write_command("MR%d" % value, address)
+        future = self._write_command("MR%d" % value, address)
         self.log.info(
             "Moved motorstage relative %i with address: %i" % (value, address)
         )
+        return future
 
     def _get_position(self, address: int) -> None:
         """Helper function for pyserial
@@ -316,39 +1200,62 @@ class PIStagesInterface:
         Returns:
             int: current position of motorstage in integer step sizes
         """
-        try:
-            msg = int(
-                self._write_read("TP", address)[3:].replace("+", "").replace(":", "")
-            )
-        except ValueError:
-            self.log.error(
-                "Invalid motor stage responds:, check addresses, baudrate..."
-            )
+        return self._parse_position(self._write_read("TP", address))
+
+    def _get_positions(self, addresses: list[int]) -> list[int]:
+        """Pipelined position query of several motorstages on the daisy chain.
+
+        Args:
+            addresses (list[int]): Addresses of the motorstages
+
+        Returns:
+            list[int]: current positions of the motorstages in integer step sizes
+        """
+        if not all(addresses):
+            self.log.error("Commands needs motor address")
             raise ValueError
-        return msg
+        if self.command_queue is not None:
+            self.command_queue.flush()
+        answers = self.serial_interface.transactions(
+            [("\x01%X" % (address - 1)) + "TP" for address in addresses]
+        )
+        return [self._parse_position(answer) for answer in answers]
 
-    def _calculate_value(
-        self, amount: str, unit: str, stage: str, step_size: float | str
-    ) -> int:
-        """Calculates number of motor steps from a given input amount and the given units
+    def _get_telemetry(
+        self, addresses: list[int]
+    ) -> list[tuple[int | None, int | None]]:
+        """Pipelined position and status query of several motorstages on the daisy chain.
+        Motorstages which are offline are skipped, so the others are still queried at full rate.
 
         Args:
-            amount (str): Input amount
-            unit (str): default unit to convert
-            stage (str): stagetype
-            step_size (float): hardware specific step size
+            addresses (list[int]): Addresses of the motorstages
 
         Returns:
-            int: Number of motor steps.
+            list[tuple[int | None, int | None]]: position in integer step sizes and status byte of every motorstage,
+                None for motorstages which are offline
         """
-        if stage == "translation":
-            try:
-                pos = self.ureg(amount).to("um").magnitude / float(step_size)
-            except:
-                pos = self.ureg(amount + unit).to("um").magnitude / float(step_size)
-        if stage == "rotation":
-            try:
-                pos = self.ureg(amount).to("deg").magnitude / float(step_size)
-            except:
-                pos = self.ureg(amount + unit).to("deg").magnitude / float(step_size)
-        return pos
+        if not all(addresses):
+            self.log.error("Commands needs motor address")
+            raise ValueError
+        if self.command_queue is not None:
+            self.command_queue.flush()
+        online = [
+            address
+            for address in addresses
+            if self.serial_interface.breaker.allow(address)
+        ]
+        answers = (
+            self.serial_interface.transactions(
+                [("\x01%X" % (address - 1)) + "TP" for address in online]
+                + [("\x01%X" % (address - 1)) + "TS" for address in online]
+            )
+            if online
+            else []
+        )
+        telemetry = {
+            address: (self._parse_position(position), status_byte(status))
+            for address, position, status in zip(
+                online, answers[: len(online)], answers[len(online) :]
+            )
+        }
+        return [telemetry.get(address, (None, None)) for address in addresses]
@@ -0,0 +1,177 @@
+from motor_stage_ui.pi_stages_interface import PIStagesInterface, decode_status
+from motor_stage_ui import logger
+
+import logging
+import time
+from threading import Lock
+from PyQt5.QtCore import QThread, pyqtSignal
+
+"""
+
+Background position polling of the motor stages.
+
+"""
+
+
+class PositionPoller(QThread):
+    """Polls position and status of all stages connected to one serial port in a worker thread.
+    The results are published through Qt signals, a slow or not responding controller therefore never blocks the GUI.
+    Moving stages are polled with a short interval, idle stages with a long one.
+    """
+
+    position_changed = pyqtSignal(int, str)
+    status_changed = pyqtSignal(int, str)
+    poll_failed = pyqtSignal(int)
+    poll_rate_changed = pyqtSignal(str, float)
+
+    def __init__(self, port: str = "", interval: int = 200, parent=None):
+        """
+        Args:
+            port (str, optional): Serial port of the polled stages, used to identify the poller. Defaults to "".
+            interval (int, optional): Default time between two polls of a stage in ms. Defaults to 200.
+            parent (QObject, optional): Qt parent object. Defaults to None.
+        """
+        super().__init__(parent)
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.port = port
+        self.interval = interval
+        self.queries = 0
+        self._stages = []
+        # indices of stages woken by the GUI thread, the schedule itself is only changed by the poller thread
+        self._woken = set()
+        self._woken_lock = Lock()
+
+    def add_stage(
+        self,
+        index: int,
+        motor: PIStagesInterface,
+        address: int,
+        unit: str,
+        stage: str,
+        step_size: float,
+        poll_moving: int = None,
+        poll_idle: int = None,
+    ) -> None:
+        """Adds a motor stage to the polling cycle.
+
+        Args:
+            index (int): Index of the motorstage in the GUI, used to identify the stage in the signals
+            motor (PIStagesInterface): Interface of the motorstage
+            address (int): Address of the motorstage
+            unit (str): output unit
+            stage (str): stage type either 'rotation' or translation
+            step_size (float): step size of the motorstage given in deg or um
+            poll_moving (int, optional): Poll interval in ms while the stage moves. Defaults to the poller interval.
+            poll_idle (int, optional): Poll interval in ms while the stage is idle. Defaults to the poller interval.
+        """
+        self._stages.append(
+            {
+                "index": index,
+                "motor": motor,
+                "address": address,
+                "unit": unit,
+                "stage": stage,
+                "step_size": step_size,
+                "poll_moving": self.interval if poll_moving is None else poll_moving,
+                "poll_idle": self.interval if poll_idle is None else poll_idle,
+                "position": None,
+                "moving": True,
+                "due": 0,
+            }
+        )
+
+    def wake(self, index: int) -> None:
+        """Marks a stage as moving and polls it with the next cycle, e.g. after a move command.
+        Called from the GUI thread, the wake is handed over to the poller thread.
+
+        Args:
+            index (int): Index of the motorstage in the GUI
+        """
+        with self._woken_lock:
+            self._woken.add(index)
+
+    def _apply_wakes(self) -> None:
+        """Schedules the woken stages for an immediate poll, in the poller thread."""
+        with self._woken_lock:
+            woken, self._woken = self._woken, set()
+        for stage in self._stages:
+            if stage["index"] in woken:
+                stage["moving"] = True
+                stage["due"] = 0
+
+    def poll_once(self) -> None:
+        """Queries position and status of every stage exactly once and emits the results."""
+        for stage in self._stages:
+            if self.isInterruptionRequested():
+                return
+            self._poll_stage(stage)
+
+    def poll_due(self) -> float:
+        """Queries every stage whose poll interval has elapsed.
+
+        Returns:
+            float: Time in ms until the next stage is due
+        """
+        self._apply_wakes()
+        for stage in self._stages:
+            if self.isInterruptionRequested():
+                return 0
+            if stage["due"] <= time.monotonic():
+                self._poll_stage(stage)
+        return max(
+            0, (min(stage["due"] for stage in self._stages) - time.monotonic()) * 1000
+        )
+
+    def _poll_stage(self, stage: dict) -> None:
+        """Queries position and status of one stage, updates its motion state and schedules the next poll.
+
+        Args:
+            stage (dict): Polled stage
+        """
+        try:
+            self.queries += 1
+            position = stage["motor"].get_position(
+                stage["address"], stage["unit"], stage["stage"], stage["step_size"]
+            )
+            self.queries += 1
+            status = stage["motor"].get_stat(stage["address"])
+        except ValueError:
+            self.log.warning(
+                "Could not get position of motorstage with address: %i"
+                % stage["address"]
+            )
+            stage["due"] = time.monotonic() + stage["poll_idle"] / 1000
+            self.poll_failed.emit(stage["index"])
+            return
+
+        # A stage is moving while its position changes or its trajectory is not yet complete
+        flags = decode_status(status)
+        stage["moving"] = position != stage["position"] or (
+            bool(flags) and not flags["trajectory_complete"] and not flags["motor_off"]
+        )
+        stage["position"] = position
+        interval = stage["poll_moving"] if stage["moving"] else stage["poll_idle"]
+        stage["due"] = time.monotonic() + interval / 1000
+
+        if position is not None:
+            self.position_changed.emit(stage["index"], position)
+        self.status_changed.emit(stage["index"], status)
+
+    def run(self) -> None:
+        """Polling loop. The measured number of serial round trips per second is emitted about once a second."""
+        start, queries = time.monotonic(), self.queries
+        while not self.isInterruptionRequested():
+            wait = self.poll_due()
+            elapsed = time.monotonic() - start
+            if elapsed >= 1:
+                self.poll_rate_changed.emit(
+                    self.port, (self.queries - queries) / elapsed
+                )
+                start, queries = time.monotonic(), self.queries
+            # sleep in short slices to react quickly on stop requests and woken stages
+            self.msleep(int(min(wait, 50)))
+
+    def stop(self) -> None:
+        """Stops the polling thread and waits for it to finish."""
+        self.requestInterruption()
+        self.wait()
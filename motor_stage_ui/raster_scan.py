@@ -0,0 +1,130 @@
+from motor_stage_ui.pi_stages_interface import PIStagesInterface
+from motor_stage_ui import logger
+
+import logging
+import math
+import time
+
+"""
+
+Raster scans over two motor stages.
+
+"""
+
+
+class RasterScan:
+    """2D raster scan over two motorstages of one daisy chain, e.g. a DUT scan across x_axis and y_axis.
+    At every grid point the stages are moved, settled and a user callback is called.
+    """
+
+    def __init__(
+        self,
+        motor: PIStagesInterface,
+        stages: dict,
+        x_axis: str,
+        y_axis: str,
+        x: tuple[str, str, str],
+        y: tuple[str, str, str],
+        serpentine: bool = True,
+        timeout: float = 60,
+        poll_interval: float = 0.05,
+    ):
+        """
+        Args:
+            motor (PIStagesInterface): Interface of the daisy chain
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml
+            x_axis (str): Name of the fast scan axis
+            y_axis (str): Name of the slow scan axis
+            x (tuple[str, str, str]): start, stop and step of the fast axis with units, e.g. ('0mm', '10mm', '0.5mm')
+            y (tuple[str, str, str]): start, stop and step of the slow axis with units
+            serpentine (bool, optional): Scan every second row backwards to reduce travel. Defaults to True.
+            timeout (float, optional): Maximum time to wait for each move in seconds. Defaults to 60.
+            poll_interval (float, optional): Time between two position polls while settling in seconds. Defaults to 0.05.
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.INFO)
+        self.motor = motor
+        self.stages = stages
+        self.x_axis = x_axis
+        self.y_axis = y_axis
+        self.serpentine = serpentine
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.x_values = self._axis_values(x_axis, *x)
+        self.y_values = self._axis_values(y_axis, *y)
+        self.points_per_second = 0.0
+
+    def _axis_values(self, name: str, start: str, stop: str, step: str) -> list[float]:
+        """Grid values of one axis in the unit of the stage, the stop value is included if it lies on the grid.
+
+        Args:
+            name (str): Name of the motorstage
+            start (str): start position with unit
+            stop (str): stop position with unit
+            step (str): step width with unit
+
+        Returns:
+            list[float]: Grid values in the unit of the stage
+        """
+        unit = self.stages[name]["unit"]
+        start, stop, step = (
+            self.motor.ureg.Quantity(value).to(unit).magnitude
+            for value in (start, stop, step)
+        )
+        if step == 0:
+            self.log.error("Step width of %s must not be zero" % name)
+            raise ValueError
+        step = math.copysign(abs(step), stop - start)
+        n_steps = math.floor((stop - start) / step + 1e-9) if stop != start else 0
+        return [start + i * step for i in range(n_steps + 1)]
+
+    def points(self) -> list[tuple[float, float]]:
+        """Grid points in scan order.
+
+        Returns:
+            list[tuple[float, float]]: x and y value of each point in the units of the stages
+        """
+        points = []
+        for row, y in enumerate(self.y_values):
+            xs = self.x_values
+            if self.serpentine and row % 2:
+                xs = xs[::-1]
+            points.extend((x, y) for x in xs)
+        return points
+
+    def run(self, callback=None):
+        """Runs the scan. Generator yielding the result of every point as soon as it is measured.
+
+        Args:
+            callback (callable, optional): Called at every settled point with the positions of both stages by name.
+                Its return value is yielded as result of the point. Defaults to None.
+
+        Yields:
+            dict: index, positions by stage name and result of each point
+        """
+        start = time.monotonic()
+        current, measured = {}, {}
+        for index, (x, y) in enumerate(self.points()):
+            # only axes whose target changed are moved
+            targets = {
+                name: "%r%s" % (value, self.stages[name]["unit"])
+                for name, value in ((self.x_axis, x), (self.y_axis, y))
+                if current.get(name) != value
+            }
+            if targets:
+                measured.update(
+                    self.motor.move_many(
+                        targets,
+                        self.stages,
+                        timeout=self.timeout,
+                        poll_interval=self.poll_interval,
+                    )
+                )
+            current = {self.x_axis: x, self.y_axis: y}
+            positions = dict(measured)
+            result = callback(positions) if callback is not None else None
+            self.points_per_second = (index + 1) / (time.monotonic() - start)
+            yield {"index": index, "positions": positions, "result": result}
+        self.log.info(
+            "Scanned %i points with %.2f points/s"
+            % (len(self.x_values) * len(self.y_values), self.points_per_second)
+        )
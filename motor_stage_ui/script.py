@@ -0,0 +1,103 @@
+from motor_stage_ui.stage_server import StageController
+from motor_stage_ui import logger
+
+import logging
+import time
+
+"""
+
+Batch execution of motor command scripts.
+
+"""
+
+
+class ScriptRunner:
+    """Executes a sequence of motor commands. A script is a list of steps, every step is a mapping with one command:
+
+        - moveto: {motor_name: x_axis, a: 1mm, wait: true}
+        - pos: x_axis
+        - sleep: 0.5
+        - loop:
+            var: x
+            values: [0mm, 1mm, 2mm]
+            steps:
+              - moveto: {motor_name: x_axis, a: "{x}", wait: true}
+              - pos: x_axis
+
+    The arguments of a command are either the motorstage name or a mapping of the command arguments.
+    Inside a loop '{var}' in string arguments is replaced by the current value, 'count' repeats the steps instead of 'values'.
+    Amounts without unit (a: 1) are moved in the default unit of the stage.
+    """
+
+    def __init__(self, call):
+        """
+        Args:
+            call (callable): Executes one command given by name and keyword arguments,
+                e.g. StageController.call or StageClient.call
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.INFO)
+        self.call = call
+
+    def run(self, steps: list, variables: dict = None):
+        """Runs the script. Generator yielding every executed command as soon as it finished.
+
+        Args:
+            steps (list): Steps of the script
+            variables (dict, optional): Values of the loop variables. Defaults to None.
+
+        Yields:
+            tuple[str, dict, object]: name, arguments and result of every command
+        """
+        variables = variables or {}
+        if not isinstance(steps, list):
+            self.log.error("Script has to be a list of steps")
+            raise ValueError("Script has to be a list of steps")
+        for step in steps:
+            if not isinstance(step, dict) or len(step) != 1:
+                self.log.error("Invalid script step %r" % (step,))
+                raise ValueError("Invalid script step %r" % (step,))
+            ((method, args),) = step.items()
+            if method == "sleep":
+                time.sleep(float(args))
+            elif method == "loop":
+                yield from self._loop(args, variables)
+            elif method in StageController.COMMANDS:
+                if isinstance(args, dict):
+                    params = {
+                        key: self._substitute(value, variables)
+                        for key, value in args.items()
+                    }
+                else:
+                    params = {"motor_name": self._substitute(args, variables)}
+                # YAML reads amounts without unit as numbers, the stage interfaces expect strings
+                if isinstance(params.get("a"), (int, float)):
+                    params["a"] = str(params["a"])
+                yield method, params, self.call(method, **params)
+            else:
+                self.log.error("Unknown script command %s" % method)
+                raise ValueError("Unknown script command %s" % method)
+
+    def _loop(self, args: dict, variables: dict):
+        """Runs the steps of a loop once for every value.
+
+        Args:
+            args (dict): 'steps' and either 'var' and 'values' or 'count'
+            variables (dict): Values of the enclosing loop variables
+
+        Yields:
+            tuple[str, dict, object]: name, arguments and result of every command
+        """
+        if "values" in args:
+            values = args["values"]
+        else:
+            values = range(int(args.get("count", 1)))
+        for value in values:
+            yield from self.run(
+                args.get("steps", []), dict(variables, **{args.get("var", "i"): value})
+            )
+
+    @staticmethod
+    def _substitute(value, variables: dict):
+        if isinstance(value, str) and variables:
+            return value.format(**variables)
+        return value
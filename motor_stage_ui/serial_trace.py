@@ -0,0 +1,247 @@
+from bisect import bisect_left
+from collections import deque
+from threading import Lock
+import re
+
+"""
+
+Tracing of the serial traffic: counters and latency histograms per controller address and command.
+
+"""
+
+# Upper bounds of the latency histogram bins in seconds
+LATENCY_BINS = [
+    1e-4,
+    2e-4,
+    5e-4,
+    1e-3,
+    2e-3,
+    5e-3,
+    1e-2,
+    2e-2,
+    5e-2,
+    0.1,
+    0.2,
+    0.5,
+    1.0,
+    2.0,
+    5.0,
+    float("inf"),
+]
+
+# Address and mnemonic of an encoded command e.g. '\x010TP'
+_COMMAND = re.compile(r"\x01([0-9A-Fa-f])([A-Za-z]{2})")
+
+
+def is_query(mnemonic: str) -> bool:
+    """Commands which are answered by the controller: the 'tell' commands and the version query."""
+    return mnemonic.startswith("T") or mnemonic == "VE"
+
+
+class CommandStats:
+    """Counters and latency histogram of one command of one controller."""
+
+    def __init__(self):
+        self.count = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * len(LATENCY_BINS)
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.histogram[bisect_left(LATENCY_BINS, duration)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the histogram bin containing the quantile q of the latencies."""
+        rank = q * sum(self.histogram)
+        total = 0
+        for bound, count in zip(LATENCY_BINS, self.histogram):
+            total += count
+            if count and total >= rank:
+                return min(bound, self.max_time)
+        return 0.0
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "mean": self.total_time / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max_time,
+            "histogram": {
+                "%g" % bound: count
+                for bound, count in zip(LATENCY_BINS, self.histogram)
+                if count
+            },
+        }
+
+
+class SerialTrace:
+    """Trace of the traffic of one serial port. The serial interface reports every write and read,
+    queries are matched with their answers in order to measure the round trip time.
+    Write only commands are recorded with the time of the write.
+    """
+
+    def __init__(self, port: str, history: int = 1000):
+        """
+        Args:
+            port (str): Serial port
+            history (int, optional): Number of most recent commands kept in the event history. Defaults to 1000.
+        """
+        self.port = port
+        self.stats = {}
+        # (time, address, mnemonic, bytes sent, bytes received, duration, result) of the last commands
+        self.events = deque(maxlen=history)
+        self._pending = deque()
+        self._lock = Lock()
+
+    def _stats(self, address: int, mnemonic: str) -> CommandStats:
+        stats = self.stats.get((address, mnemonic))
+        if stats is None:
+            stats = self.stats[(address, mnemonic)] = CommandStats()
+        return stats
+
+    def written(
+        self, commands: list[str], terminator: str, start: float, end: float
+    ) -> None:
+        """Records commands written with one write.
+
+        Args:
+            commands (list[str]): Commands without terminator
+            terminator (str): Message terminator appended to every command
+            start (float): perf_counter time before the write
+            end (float): perf_counter time after the write
+        """
+        with self._lock:
+            for command in commands:
+                match = _COMMAND.match(command)
+                address, mnemonic = (
+                    (int(match.group(1), 16) + 1, match.group(2).upper())
+                    if match
+                    else (0, command[:2])
+                )
+                n_bytes = len(command) + len(terminator)
+                stats = self._stats(address, mnemonic)
+                stats.bytes_sent += n_bytes
+                if is_query(mnemonic):
+                    self._pending.append((address, mnemonic, start))
+                else:
+                    stats.add(end - start)
+                    self.events.append(
+                        (
+                            end,
+                            address,
+                            mnemonic,
+                            n_bytes,
+                            0,
+                            end - start,
+                            "ok",
+                        )
+                    )
+
+    def read(self, n_bytes: int, end: float, timeout: bool = False) -> None:
+        """Records the answer to the oldest unanswered query.
+
+        Args:
+            n_bytes (int): Number of bytes received
+            end (float): perf_counter time after the read
+            timeout (bool, optional): No answer was received. Defaults to False.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            address, mnemonic, start = self._pending.popleft()
+            stats = self._stats(address, mnemonic)
+            stats.bytes_received += n_bytes
+            if timeout:
+                stats.timeouts += 1
+                # the answers of the other pending queries can not be assigned anymore
+                self._pending.clear()
+            else:
+                stats.add(end - start)
+            self.events.append(
+                (
+                    end,
+                    address,
+                    mnemonic,
+                    0,
+                    n_bytes,
+                    end - start,
+                    "timeout" if timeout else "ok",
+                )
+            )
+
+    def error(self, end: float) -> None:
+        """Records a failed write or read of the port, e.g. a disconnected adapter."""
+        with self._lock:
+            address, mnemonic, start = (
+                self._pending.popleft() if self._pending else (0, "--", end)
+            )
+            self._pending.clear()
+            self._stats(address, mnemonic).errors += 1
+            self.events.append((end, address, mnemonic, 0, 0, end - start, "error"))
+
+    def summary(self) -> dict:
+        """Statistics of all commands.
+
+        Returns:
+            dict: Counters and latencies by 'address:mnemonic'
+        """
+        with self._lock:
+            return {
+                "%i:%s" % key: stats.summary()
+                for key, stats in sorted(self.stats.items())
+            }
+
+
+def format_stats(summaries: dict) -> str:
+    """Formats the statistics of several ports as a table.
+
+    Args:
+        summaries (dict): SerialTrace.summary of every port by port
+
+    Returns:
+        str: Table with one line per port, address and command
+    """
+    lines = [
+        "%-14s %4s %4s %8s %7s %7s %10s %10s %10s"
+        % (
+            "port",
+            "addr",
+            "cmd",
+            "count",
+            "timeout",
+            "errors",
+            "mean ms",
+            "p95 ms",
+            "max ms",
+        )
+    ]
+    for port, summary in summaries.items():
+        for key, stats in summary.items():
+            address, mnemonic = key.split(":")
+            lines.append(
+                "%-14s %4s %4s %8i %7i %7i %10.3f %10.3f %10.3f"
+                % (
+                    port,
+                    address,
+                    mnemonic,
+                    stats["count"],
+                    stats["timeouts"],
+                    stats["errors"],
+                    stats["mean"] * 1e3,
+                    stats["p95"] * 1e3,
+                    stats["max"] * 1e3,
+                )
+            )
+    return "\n".join(lines)
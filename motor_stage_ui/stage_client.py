@@ -0,0 +1,105 @@
+import json
+import os
+import socket
+import tempfile
+
+"""
+
+Client of the stage control server. Only depends on the standard library, so that commands sent to a running
+server do not load the serial driver.
+
+"""
+
+DEFAULT_SOCKET = os.path.join(
+    tempfile.gettempdir(),
+    "motor_stage_ui-%s.sock" % (os.getuid() if hasattr(os, "getuid") else "user"),
+)
+
+
+class StageClient:
+    """Client of the stage control server."""
+
+    def __init__(self, address: str | tuple[str, int] = DEFAULT_SOCKET, timeout=None):
+        """
+        Args:
+            address (str | tuple[str, int], optional): Path of the unix socket or host and port of the TCP server.
+                Defaults to DEFAULT_SOCKET.
+            timeout (float, optional): Socket timeout in seconds. Defaults to None.
+
+        Raises:
+            OSError: if no server listens on the address
+        """
+        if isinstance(address, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(address)
+        except OSError:
+            self._socket.close()
+            raise
+        self._file = self._socket.makefile("rwb")
+        self._id = 0
+
+    def call(self, method: str, **params):
+        """Sends a command to the server and waits for the answer.
+
+        Args:
+            method (str): Name of the command
+            params: Arguments of the command
+
+        Returns:
+            Result of the command
+        """
+        return self.call_many([(method, params)])[0]
+
+    def call_many(self, requests: list[tuple[str, dict]]) -> list:
+        """Pipelines several commands: all requests are sent at once, then all answers are read.
+
+        Args:
+            requests (list[tuple[str, dict]]): Name and arguments of each command
+
+        Returns:
+            list: Results of the commands in order
+        """
+        ids = []
+        lines = []
+        for method, params in requests:
+            self._id += 1
+            ids.append(self._id)
+            lines.append(
+                json.dumps({"id": self._id, "method": method, "params": params}) + "\n"
+            )
+        self._file.write("".join(lines).encode())
+        self._file.flush()
+        answers = {}
+        for _ in ids:
+            answer = json.loads(self._file.readline())
+            answers[answer["id"]] = answer
+        errors = [answers[i]["error"] for i in ids if "error" in answers[i]]
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return [answers[i]["result"] for i in ids]
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+
+def connect(path: str = DEFAULT_SOCKET) -> StageClient | None:
+    """Connects to a running stage control server.
+
+    Args:
+        path (str, optional): Path of the unix socket. Defaults to DEFAULT_SOCKET.
+
+    Returns:
+        StageClient | None: Connected client, None if no server is running
+    """
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    try:
+        return StageClient(path)
+    except OSError:
+        return None
@@ -0,0 +1,257 @@
+from motor_stage_ui.pi_stages_interface import PIStagesInterface
+from motor_stage_ui.pi_stages_interface import SerialInterface
+
+# the client is re-exported, it is part of the server API
+from motor_stage_ui.stage_client import DEFAULT_SOCKET, StageClient, connect
+from motor_stage_ui import logger
+
+import errno
+import json
+import logging
+import os
+import socketserver
+from threading import Lock
+
+"""
+
+Stage control server: one long running process owns the serial ports, clients send commands over a local socket or TCP.
+
+"""
+
+
+class StageController:
+    """Executes the terminal commands by motorstage name. The interfaces of the stages are created once and reused."""
+
+    # Commands which can be called by clients
+    COMMANDS = [
+        "init",
+        "move",
+        "moveto",
+        "pos",
+        "wait",
+        "stop",
+        "sethome",
+        "gohome",
+        "status",
+        "stats",
+    ]
+
+    def __init__(self, conf: dict, interface: type[SerialInterface] = SerialInterface):
+        """
+        Args:
+            conf (dict): Stage configurations by motorstage name, as in the configuration yaml
+            interface (type[SerialInterface], optional): Serial interface class. Defaults to SerialInterface.
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.conf = conf
+        self.interface = interface
+        self._motors = {}
+        self._motors_lock = Lock()
+
+    def motor(self, motor_name: str) -> PIStagesInterface:
+        """Interface of a motorstage, created with the first use.
+
+        Args:
+            motor_name (str): name of the motorstage
+
+        Returns:
+            PIStagesInterface: Interface of the motorstage
+        """
+        if motor_name not in self.conf:
+            self.log.error("Unknown motorstage %s" % motor_name)
+            raise ValueError("Unknown motorstage %s" % motor_name)
+        with self._motors_lock:
+            if motor_name not in self._motors:
+                self._motors[motor_name] = PIStagesInterface(
+                    port=self.conf[motor_name]["port"],
+                    baud_rate=self.conf[motor_name]["baud_rate"],
+                    interface=self.interface,
+                )
+        return self._motors[motor_name]
+
+    def call(self, method: str, **params):
+        """Executes a command.
+
+        Args:
+            method (str): Name of the command, one of COMMANDS
+            params: Arguments of the command
+
+        Returns:
+            Result of the command
+        """
+        if method not in self.COMMANDS:
+            self.log.error("Unknown command %s" % method)
+            raise ValueError("Unknown command %s" % method)
+        return getattr(self, method)(**params)
+
+    def init(self, motor_name: str) -> None:
+        self.motor(motor_name).init_motor(self.conf[motor_name]["address"])
+
+    def move(self, motor_name: str, a: str, wait: bool = False) -> str | None:
+        return self._move(motor_name, a, wait, relative=True)
+
+    def moveto(self, motor_name: str, a: str, wait: bool = False) -> str | None:
+        return self._move(motor_name, a, wait, relative=False)
+
+    def pos(self, motor_name: str) -> str:
+        conf = self.conf[motor_name]
+        return self.motor(motor_name).get_position(
+            conf["address"], conf["unit"], conf["stage_type"], float(conf["step_size"])
+        )
+
+    def wait(self, motor_name: str, timeout: float = 60) -> str:
+        conf = self.conf[motor_name]
+        position = self.motor(motor_name).wait_until_idle(
+            conf["address"], timeout=timeout
+        )
+        return self.motor(motor_name)._format_position(
+            position, conf["unit"], conf["stage_type"], float(conf["step_size"])
+        )
+
+    def stop(self, motor_name: str) -> None:
+        self.motor(motor_name).abort(self.conf[motor_name]["address"])
+
+    def sethome(self, motor_name: str) -> None:
+        self.motor(motor_name).set_home(self.conf[motor_name]["address"])
+
+    def gohome(self, motor_name: str) -> None:
+        self.motor(motor_name).go_home(self.conf[motor_name]["address"])
+
+    def status(self, motor_name: str) -> str:
+        return self.motor(motor_name).get_stat(self.conf[motor_name]["address"])
+
+    def stats(self) -> dict:
+        """Counters and latencies of the serial commands of this process, empty if tracing is disabled.
+
+        Returns:
+            dict: SerialTrace.summary of every traced port by port
+        """
+        with self._motors_lock:
+            traces = {
+                motor.serial_interface.port: motor.serial_interface.trace
+                for motor in self._motors.values()
+                if motor.serial_interface.trace is not None
+            }
+        return {port: trace.summary() for port, trace in traces.items()}
+
+    def _move(self, motor_name: str, a: str, wait: bool, relative: bool) -> str | None:
+        """Moves a motorstage relative or absolute, optionally waiting until it settled.
+
+        Returns:
+            str | None: final position if waited for the stage, else None
+        """
+        conf = self.conf[motor_name]
+        motor = self.motor(motor_name)
+        if wait:
+            return motor.move_and_wait(
+                conf["address"],
+                a,
+                conf["unit"],
+                conf["stage_type"],
+                float(conf["step_size"]),
+                relative=relative,
+            )
+        move = motor.move_relative if relative else motor.move_to_position
+        move(conf["address"], a, conf["unit"], conf["stage_type"], conf["step_size"])
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles one client connection. Requests and answers are JSON objects, one per line:
+    {"id": 1, "method": "pos", "params": {"motor_name": "x_axis"}} -> {"id": 1, "result": "0.000"}
+    Clients may pipeline requests, the requests of one connection are executed and answered in order.
+    """
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            self.wfile.write(self.server.answer(line))
+            self.wfile.flush()
+
+
+class _TCPRequestHandler(_RequestHandler):
+    disable_nagle_algorithm = True
+
+
+class _StageServerMixin:
+    """Request execution shared by the unix socket and the TCP server."""
+
+    daemon_threads = True
+
+    def answer(self, line: bytes) -> bytes:
+        """Executes one request and encodes the answer.
+
+        Args:
+            line (bytes): JSON encoded request
+
+        Returns:
+            bytes: JSON encoded answer
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            # any other JSON value is answered with an error, the connection stays open
+            if not isinstance(request, dict):
+                raise ValueError("Request is not a JSON object")
+            request_id = request.get("id")
+            result = self.controller.call(
+                request["method"], **request.get("params", {})
+            )
+            answer = {"id": request_id, "result": result}
+        except Exception as e:
+            self.log.warning("Request %s failed: %r" % (line, e))
+            answer = {
+                "id": request_id,
+                "error": "%s: %s" % (type(e).__name__, e),
+            }
+        return (json.dumps(answer) + "\n").encode()
+
+
+class StageServer(
+    _StageServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    """Stage control server listening on a local unix socket."""
+
+    def __init__(self, path: str, controller: StageController):
+        """
+        Args:
+            path (str): Path of the unix socket
+            controller (StageController): Executes the received commands
+
+        Raises:
+            OSError: if another server listens on the socket
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.INFO)
+        self.controller = controller
+        client = connect(path)
+        if client is not None:
+            client.close()
+            self.log.error("A motor stage server is already listening on %s" % path)
+            raise OSError(errno.EADDRINUSE, "Server already running", path)
+        # socket file left behind by a server which did not shut down
+        if os.path.exists(path):
+            os.remove(path)
+        super().__init__(path, _RequestHandler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+class TCPStageServer(
+    _StageServerMixin, socketserver.ThreadingMixIn, socketserver.TCPServer
+):
+    """Stage control server listening on a TCP port, for clients on other hosts. Every client gets its own thread."""
+
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple[str, int], controller: StageController):
+        """
+        Args:
+            address (tuple[str, int]): Host and port to listen on, port 0 selects a free port
+            controller (StageController): Executes the received commands
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.INFO)
+        self.controller = controller
+        super().__init__(address, _TCPRequestHandler)
@@ -0,0 +1,236 @@
+from motor_stage_ui.pi_stages_interface import PIStagesInterface, SerialInterface
+from motor_stage_ui import logger
+
+import ast
+import logging
+import struct
+import time
+from threading import Event, Thread
+
+"""
+
+Telemetry recording of the motor stage positions into binary files.
+
+"""
+
+# One record per stage and sample: unix time in ns, stage index, position in motor steps,
+# status byte (-1 if the status could not be decoded)
+TELEMETRY_DTYPE = [
+    ("time", "<i8"),
+    ("stage", "<u2"),
+    ("position", "<i8"),
+    ("status", "<i2"),
+]
+_RECORD = struct.Struct("<qHqh")
+
+# Size of the .npy header, large enough for the shape of any file
+_HEADER_SIZE = 192
+
+
+class TelemetryWriter:
+    """Append-only telemetry file in the numpy .npy format with TELEMETRY_DTYPE records.
+    Records are buffered and written in chunks, the record count in the header is updated with every chunk.
+    The file can be read without this package, e.g. with numpy.load(path, mmap_mode="r").
+    """
+
+    def __init__(self, path: str, chunk_size: int = 4096):
+        """
+        Args:
+            path (str): Path of the telemetry file, an existing file is overwritten
+            chunk_size (int, optional): Number of records written at once. Defaults to 4096.
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._buffer = bytearray(chunk_size * _RECORD.size)
+        self._buffered = 0
+        self._file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self) -> None:
+        header = "{'descr': %r, 'fortran_order': False, 'shape': (%i,), }" % (
+            TELEMETRY_DTYPE,
+            self.count,
+        )
+        header = header.ljust(_HEADER_SIZE - 11) + "\n"
+        self._file.seek(0)
+        self._file.write(
+            b"\x93NUMPY\x01\x00"
+            + struct.pack("<H", _HEADER_SIZE - 10)
+            + header.encode("latin1")
+        )
+
+    def append(self, timestamp: int, stage: int, position: int, status: int) -> None:
+        """Adds one record.
+
+        Args:
+            timestamp (int): unix time in ns
+            stage (int): index of the motorstage
+            position (int): position in integer step sizes
+            status (int): status byte, -1 if unknown
+        """
+        _RECORD.pack_into(
+            self._buffer,
+            self._buffered * _RECORD.size,
+            timestamp,
+            stage,
+            position,
+            status,
+        )
+        self._buffered += 1
+        if self._buffered == self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered records and updates the record count of the file."""
+        if not self._buffered:
+            return
+        self._file.seek(0, 2)
+        self._file.write(memoryview(self._buffer)[: self._buffered * _RECORD.size])
+        self.count += self._buffered
+        self._buffered = 0
+        self._write_header()
+        self._file.flush()
+
+    def close(self) -> None:
+        """Writes the remaining records and closes the file."""
+        self.flush()
+        self._file.close()
+
+
+def read_telemetry(path: str) -> list[tuple[int, int, int, int]]:
+    """Reads a telemetry file without numpy.
+
+    Args:
+        path (str): Path of the telemetry file
+
+    Returns:
+        list[tuple[int, int, int, int]]: time, stage, position and status of every record
+    """
+    with open(path, "rb") as file:
+        file.seek(8)
+        (header_size,) = struct.unpack("<H", file.read(2))
+        header = ast.literal_eval(file.read(header_size).decode("latin1"))
+        data = file.read(header["shape"][0] * _RECORD.size)
+    return list(_RECORD.iter_unpack(data))
+
+
+# Highest default sample rate in samples per second
+MAX_RATE = 100
+
+
+def max_sample_rate(stages: dict) -> float:
+    """Highest sample rate the baud rates of the serial ports allow: every sample sends a position
+    and a status query to every stage and receives both answers, the ports are sampled one after the other.
+    Characters take 11 bits (start bit, 8 data bits, 2 stop bits) on the line.
+
+    Args:
+        stages (dict): Stage configurations by motorstage name, as in the configuration yaml
+
+    Returns:
+        float: Samples per second, at most MAX_RATE
+    """
+    # '\x01' + address + mnemonic + terminator of both queries and the length of both answers
+    characters = 2 * 5 + sum(
+        SerialInterface.REPLY_LENGTHS[query] for query in ("TP", "TS")
+    )
+    sample_time = {}
+    for conf in stages.values():
+        sample_time[conf["port"]] = (
+            sample_time.get(conf["port"], 0) + characters * 11 / conf["baud_rate"]
+        )
+    return min(MAX_RATE, 1 / sum(sample_time.values()))
+
+
+class TelemetryRecorder:
+    """Samples position and status of all motorstages at a fixed rate in a background thread.
+    Every sample is one pipelined query per serial port.
+    """
+
+    def __init__(
+        self,
+        stages: dict,
+        motors: dict,
+        writer: TelemetryWriter,
+        rate: float = None,
+    ):
+        """
+        Args:
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml.
+                The stage index of the records is the position of the name in this mapping.
+            motors (dict): Interface of every serial port of the stages by port
+            writer (TelemetryWriter): Telemetry file
+            rate (float, optional): Samples per second. Defaults to the highest rate the baud rates allow, see max_sample_rate.
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.INFO)
+        self.writer = writer
+        self.rate = max_sample_rate(stages) if rate is None else rate
+        self.period = 1 / self.rate
+        self.samples = 0
+        self.missed = 0
+        self._ports = {}
+        for index, conf in enumerate(stages.values()):
+            self._ports.setdefault(conf["port"], []).append((index, conf["address"]))
+        self._motors = motors
+        self._stop = Event()
+        self._thread = None
+
+    def sample(self) -> None:
+        """Records position and status of all stages once."""
+        for port, stages in self._ports.items():
+            motor: PIStagesInterface = self._motors[port]
+            # the time of the query, the answers are late by the round trip or a timeout of the bus
+            timestamp = time.time_ns()
+            telemetry = motor._get_telemetry([address for _, address in stages])
+            for (index, _), (position, status) in zip(stages, telemetry):
+                if position is None:
+                    # motorstage offline
+                    continue
+                self.writer.append(
+                    timestamp, index, position, -1 if status is None else status
+                )
+        self.samples += 1
+
+    def run(self, duration: float = None) -> None:
+        """Samples until stopped or the duration elapsed. Samples which can not be taken in time are skipped.
+
+        Args:
+            duration (float, optional): Recording time in seconds. Defaults to None.
+        """
+        start = time.monotonic()
+        next_sample = start
+        while not self._stop.is_set():
+            if duration is not None and time.monotonic() - start >= duration:
+                break
+            try:
+                self.sample()
+            except ValueError:
+                self.log.warning("Sample failed")
+            next_sample += self.period
+            delay = next_sample - time.monotonic()
+            if delay < 0:
+                skipped = int(-delay / self.period) + 1
+                self.missed += skipped
+                next_sample += skipped * self.period
+                delay += skipped * self.period
+            self._stop.wait(delay)
+        self.writer.flush()
+
+    def start(self) -> None:
+        """Starts sampling in a background thread."""
+        self._stop.clear()
+        self._thread = Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling and closes the telemetry file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.writer.close()
+        self.log.debug(
+            "Recorded %i samples to %s, %i samples missed"
+            % (self.samples, self.writer.path, self.missed)
+        )
@@ -0,0 +1,202 @@
+from pathlib import Path
+import asyncio
+import os
+import time
+import pytest
+import yaml
+from motor_stage_ui.async_pi_stages_interface import (
+    AsyncPIStagesInterface,
+    AsyncSerialInterface,
+)
+from motor_stage_ui.test.utils import AsyncSerialInterfaceMock, PtySerialDevice
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = AsyncSerialInterfaceMock
+
+
+def stages(port: str) -> AsyncPIStagesInterface:
+    return AsyncPIStagesInterface(
+        port=port,
+        baud_rate=TESTCONFIG["x_axis"]["baud_rate"],
+        interface=INTERFACE,
+    )
+
+
+def test_commands():
+    ADDRESS = TESTCONFIG["x_axis"]["address"]
+    UNIT = TESTCONFIG["x_axis"]["unit"]
+    STEPSIZE = TESTCONFIG["x_axis"]["step_size"]
+    STAGE = TESTCONFIG["x_axis"]["stage_type"]
+    pistages = stages("/dev/ttyAsync0")
+
+    async def run():
+        await pistages.set_home(address=ADDRESS)
+        await pistages.move_relative(
+            address=ADDRESS, amount="1mm", unit=UNIT, stage=STAGE, step_size=STEPSIZE
+        )
+        await pistages.move_to_position(
+            address=ADDRESS, amount="-1mm", unit=UNIT, stage=STAGE, step_size=STEPSIZE
+        )
+        await pistages.abort(address=ADDRESS)
+        assert await pistages.get_stat(address=ADDRESS) == "\x010TS"
+        assert (
+            await pistages.get_position(
+                address=ADDRESS, unit=UNIT, stage=STAGE, step_size=STEPSIZE
+            )
+            == "0.000"
+        )
+
+    asyncio.run(run())
+    assert pistages.serial_interface._serial_commands == [
+        b"\x010DH\r",
+        b"\x010MR55555\r",
+        b"\x010MA-55555\r",
+        b"\x010AB\r",
+        b"\x010TS\r",
+        b"\x010TP\r",
+    ]
+
+    with pytest.raises(ValueError):
+        asyncio.run(
+            pistages.move_relative(
+                address=ADDRESS, amount="1mm", unit=UNIT, stage="linear", step_size=1
+            )
+        )
+
+
+def test_wait_until_idle():
+    pistages = stages(TESTCONFIG["x_axis"]["port"])
+    ADDRESS = TESTCONFIG["rot"]["address"]
+    UNIT = TESTCONFIG["rot"]["unit"]
+    STEPSIZE = float(TESTCONFIG["rot"]["step_size"])
+    STAGE = TESTCONFIG["rot"]["stage_type"]
+
+    async def run():
+        # many coroutines share the port, their transactions must not interleave
+        positions = await asyncio.gather(
+            pistages.move_and_wait(
+                ADDRESS, "0deg", UNIT, STAGE, STEPSIZE, poll_interval=0.001
+            ),
+            pistages.get_positions(
+                {"x_axis": TESTCONFIG["x_axis"], "rot": TESTCONFIG["rot"]}
+            ),
+            *(pistages.get_stat(ADDRESS) for _ in range(10)),
+        )
+        assert positions[0] == "0.000"
+        assert positions[1] == {"x_axis": "0.000", "rot": "0.000"}
+        assert positions[2:] == ["\x012TS"] * 10
+        assert await pistages.move_many(
+            {"x_axis": "1mm"}, {"x_axis": TESTCONFIG["x_axis"]}, poll_interval=0.001
+        ) == {"x_axis": "0.000"}
+
+    asyncio.run(run())
+
+    # position changes with every poll: stage is moving
+    positions = iter(range(1000))
+    pistages._parse_position = lambda msg: next(positions)
+    with pytest.raises(TimeoutError):
+        asyncio.run(pistages.wait_until_idle(ADDRESS, timeout=0.05, poll_interval=0.01))
+    del pistages._parse_position
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo terminal")
+def test_async_serial_interface():
+    controller, device = os.openpty()
+    serial_interface = AsyncSerialInterface(port=os.ttyname(device), timeout=0.2)
+
+    async def answer():
+        await asyncio.sleep(0.01)
+        os.write(controller, b"\x010TP\r\x010TS\r")
+
+    async def run():
+        _, answers = await asyncio.gather(
+            answer(), serial_interface.transactions(["\x010TP", "\x010TS"])
+        )
+        assert answers == ["\x010TP", "\x010TS"]
+        assert os.read(controller, 64) == b"\x010TP\r\x010TS\r"
+        with pytest.raises(ValueError):
+            await serial_interface.transaction("\x010TP")
+
+    try:
+        asyncio.run(run())
+    finally:
+        serial_interface.close()
+        os.close(controller)
+        os.close(device)
+
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pseudo terminal")
+def test_async_incomplete_answer(caplog):
+    controller, device = os.openpty()
+    serial_interface = AsyncSerialInterface(port=os.ttyname(device), timeout=0.1)
+
+    async def answer(msg: bytes):
+        await asyncio.sleep(0.01)
+        os.write(controller, msg)
+
+    async def run():
+        for _ in range(5):
+            _, msg = await asyncio.gather(
+                answer(b"P:+0000012345\r"), serial_interface.transaction("\x010TP")
+            )
+            assert msg == "P:+0000012345"
+        # the answer stops after a few characters
+        with pytest.raises(ValueError):
+            await asyncio.gather(
+                answer(b"P:+00000"), serial_interface.transaction("\x010TP")
+            )
+        # the rest arrives late and is not taken for the next answer
+        os.write(controller, b"12345\r")
+        await asyncio.sleep(0.01)
+        _, msg = await asyncio.gather(
+            answer(b"S:84 00 00 00 00 00\r"), serial_interface.transaction("\x010TS")
+        )
+        assert msg == "S:84 00 00 00 00 00"
+
+    try:
+        asyncio.run(run())
+    finally:
+        serial_interface.close()
+        os.close(controller)
+        os.close(device)
+    # the readers of the event loop did not fail
+    assert not [record for record in caplog.records if record.name == "asyncio"]
+
+
+def test_async_cancelled_transaction(monkeypatch):
+    device = PtySerialDevice()
+    serial_interface = AsyncSerialInterface(port=device.port)
+    execute = device.simulator._execute
+
+    def slow(command, now):
+        # the position answer arrives after the caller gave up
+        if command.endswith("TP"):
+            time.sleep(0.1)
+        execute(command, now)
+
+    async def run():
+        monkeypatch.setattr(device.simulator, "_execute", slow)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(serial_interface.transaction("\x010TP"), 0.02)
+        await asyncio.sleep(0.2)
+        monkeypatch.setattr(device.simulator, "_execute", execute)
+        # the late answer is discarded, not taken for the answer of the next command
+        assert (await serial_interface.transaction("\x010TS")).startswith("S:")
+        assert (await serial_interface.transaction("\x010TP")).startswith("P:")
+
+    try:
+        asyncio.run(run())
+    finally:
+        serial_interface.close()
+        device.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
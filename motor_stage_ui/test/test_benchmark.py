@@ -0,0 +1,59 @@
+from click.testing import CliRunner
+import json
+import pytest
+from motor_stage_ui import benchmark
+
+
+def test_run_benchmarks():
+    results = benchmark.run_benchmarks(
+        ["write_command", "calculate_value", "position_reads", "position_reads_pty"],
+        duration=0.01,
+    )
+    assert set(results["results"]) == {
+        "write_command",
+        "calculate_value",
+        "position_reads",
+        "position_reads_pty",
+    }
+    assert all(result["value"] > 0 for result in results["results"].values())
+    assert results["results"]["position_reads"]["unit"] == "1/s"
+    json.dumps(results)
+
+
+def test_compare():
+    baseline = {
+        "results": {
+            "get_position": {"value": 1.0, "unit": "s"},
+            "position_reads": {"value": 1000.0, "unit": "1/s"},
+        }
+    }
+    results = {
+        "results": {
+            "get_position": {"value": 1.1, "unit": "s"},
+            "position_reads": {"value": 900.0, "unit": "1/s"},
+            "cli_cold_start": {"value": 0.2, "unit": "s"},
+        }
+    }
+    assert benchmark.compare(results, baseline, tolerance=0.2) == []
+    regressions = benchmark.compare(results, baseline, tolerance=0.05)
+    assert [regression.split(":")[0] for regression in regressions] == [
+        "get_position",
+        "position_reads",
+    ]
+
+
+def test_main(tmp_path):
+    path = str(tmp_path / "results.json")
+    runner = CliRunner()
+    result = runner.invoke(
+        benchmark.main, ["-d", "0.01", "-o", path, "get_position", "query_command"]
+    )
+    assert result.exit_code == 0
+    with open(path) as file:
+        assert set(json.load(file)["results"]) == {"get_position", "query_command"}
+    result = runner.invoke(benchmark.main, ["unknown"])
+    assert result.exit_code != 0
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,81 @@
+import time
+import pytest
+from motor_stage_ui.bus_scan import config_stub, describe, scan_bus, scan_port
+from motor_stage_ui.pi_stages_interface import SerialInterface
+from motor_stage_ui.test.utils import (
+    PtySerialDevice,
+    SerialInterfaceSimulator,
+    SimulatedSerial,
+)
+
+
+class ChainSimulator(SerialInterfaceSimulator):
+    """Controllers on some addresses of /dev/ttyChain0 at 115200 baud, no controllers on other ports."""
+
+    addresses = (1, 3, 12)
+
+    def _open_port(
+        self, port: str, baud_rate: int, parity: str, timeout: float, stopbits: float
+    ) -> SimulatedSerial:
+        serial_port = super()._open_port(port, baud_rate, parity, timeout, stopbits)
+        if port != "/dev/ttyChain0" or baud_rate != 115200:
+            serial_port.stages.clear()
+        return serial_port
+
+
+INTERFACE = ChainSimulator
+
+
+def test_scan_bus():
+    results = scan_bus(
+        ["/dev/ttyChain0", "/dev/ttyChain1"],
+        baud_rates=[9600, 115200],
+        timeout=0.01,
+        interface=INTERFACE,
+    )
+    baud_rate, answers = results["/dev/ttyChain0"]
+    assert baud_rate == 115200
+    assert list(answers) == [1, 3, 12]
+    assert answers[12] == "S:04 00 00 00 00 00"
+    assert results["/dev/ttyChain1"] == (None, {})
+    stub = config_stub(results)
+    assert list(stub) == ["ttyChain0_1", "ttyChain0_3", "ttyChain0_12"]
+    assert stub["ttyChain0_12"]["address"] == 12
+    assert stub["ttyChain0_12"]["baud_rate"] == 115200
+    assert stub["ttyChain0_12"]["port"] == "/dev/ttyChain0"
+
+
+def test_scan_missing_port():
+    assert scan_bus(["/dev/ttyDoesNotExist"], baud_rates=[9600]) == {
+        "/dev/ttyDoesNotExist": (None, {})
+    }
+    assert scan_bus([]) == {}
+
+
+def test_scan_pty():
+    device = PtySerialDevice()
+    for address in range(3, 17):
+        del device.simulator.stages[address]
+    try:
+        start = time.monotonic()
+        baud_rate, answers = scan_port(
+            device.port, baud_rates=[9600], interface=SerialInterface
+        )
+        # the missing addresses only cost the short deadline of the status answer
+        assert time.monotonic() - start < 2
+    finally:
+        device.close()
+    assert baud_rate == 9600
+    assert list(answers) == [1, 2]
+
+
+def test_describe():
+    assert describe("S:84 00 00 00 00 00") == (
+        "S:84 00 00 00 00 00 (trajectory_complete, motor_off)"
+    )
+    assert describe("S:00 00 00 00 00 00") == "S:00 00 00 00 00 00 (ok)"
+    assert describe("\x010TS") == "'\\x010TS' (status not decoded)"
+
+
+if __name__ == "__main__":
+    pytest.main()
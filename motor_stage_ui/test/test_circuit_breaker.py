@@ -0,0 +1,53 @@
+import pytest
+from motor_stage_ui import circuit_breaker
+from motor_stage_ui.circuit_breaker import CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_offline(clock):
+    breaker = CircuitBreaker(threshold=2, backoff=0.5, max_backoff=2)
+    breaker.failure(3)
+    # a single failure is tolerated
+    assert breaker.allow(3)
+    breaker.failure(3)
+    assert not breaker.allow(3)
+    assert breaker.allow(1)
+    assert breaker.offline() == [3]
+    clock.now += 0.5
+    assert breaker.allow(3)
+    assert breaker.offline() == []
+
+
+def test_backoff(clock):
+    breaker = CircuitBreaker(threshold=1, backoff=0.5, max_backoff=2)
+    backoffs = []
+    for _ in range(5):
+        breaker.failure(1)
+        start = clock.now
+        while not breaker.allow(1):
+            clock.now += 0.25
+        backoffs.append(clock.now - start)
+    assert backoffs == [0.5, 1.0, 2.0, 2.0, 2.0]
+    # an answer of the probe brings the address back online
+    breaker.success(1)
+    breaker.failure(1)
+    clock.now += 0.5
+    assert breaker.allow(1)
+
+
+if __name__ == "__main__":
+    pytest.main()
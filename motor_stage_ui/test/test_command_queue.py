@@ -0,0 +1,85 @@
+from pathlib import Path
+import pytest
+import yaml
+from motor_stage_ui.pi_stages_interface import PIStagesInterface
+from motor_stage_ui.command_queue import CommandQueue
+from motor_stage_ui.test.utils import SerialInterfaceMock
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = SerialInterfaceMock
+
+PISTAGES = PIStagesInterface(
+    port="/dev/ttyQueue0",
+    baud_rate=TESTCONFIG["x_axis"]["baud_rate"],
+    interface=INTERFACE,
+    queued=True,
+)
+
+
+def test_queued_commands():
+    ADDRESS = TESTCONFIG["x_axis"]["address"]
+    UNIT = TESTCONFIG["x_axis"]["unit"]
+    STEPSIZE = TESTCONFIG["x_axis"]["step_size"]
+    STAGE = TESTCONFIG["x_axis"]["stage_type"]
+    futures = [
+        PISTAGES.move_relative(
+            address=ADDRESS, amount="1mm", unit=UNIT, stage=STAGE, step_size=STEPSIZE
+        ),
+        PISTAGES.go_home(address=ADDRESS),
+        PISTAGES.abort(address=ADDRESS),
+    ]
+    for future in futures:
+        assert future.result(timeout=1) is None
+    assert PISTAGES.serial_interface._serial_commands[-3:] == [
+        b"\x010MR55555\r",
+        b"\x010GH\r",
+        b"\x010AB\r",
+    ]
+
+
+def test_query_waits_for_queue():
+    ADDRESS = TESTCONFIG["x_axis"]["address"]
+    PISTAGES.set_home(address=ADDRESS)
+    assert PISTAGES.get_stat(address=ADDRESS) == "\x010TS"
+    assert PISTAGES.serial_interface._serial_commands[-2:] == [
+        b"\x010DH\r",
+        b"\x010TS\r",
+    ]
+
+
+def test_coalesced_writes():
+    serial_interface = INTERFACE(port="/dev/ttyQueue1")
+    batches = []
+    write_many = serial_interface._write_many
+    serial_interface._write_many = lambda commands: (
+        batches.append(commands),
+        write_many(commands),
+    )
+    command_queue = CommandQueue(serial_interface)
+    # Block the bus, all commands queued meanwhile are written with one bulk write
+    with serial_interface._lock:
+        futures = [command_queue.submit("\x010MR%d" % i) for i in range(10)]
+        command_queue.submit("\x010AB")
+    command_queue.flush()
+    assert all(future.done() for future in futures)
+    assert sum(len(batch) for batch in batches) == 11
+    assert len(batches) <= 2
+    command_queue.close()
+
+    failing = INTERFACE(port="/dev/ttyQueue2")
+    failing._write_many = lambda commands: (_ for _ in ()).throw(OSError("closed"))
+    command_queue = CommandQueue(failing)
+    with pytest.raises(OSError):
+        command_queue.submit("\x010AB").result(timeout=1)
+    command_queue.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
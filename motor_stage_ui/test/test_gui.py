@@ -188,5 +188,80 @@ def test_get_position_clicked(app):
     assert app.motor[1].serial_interface._serial_commands[-1] == b"\x012TP\r"
 
 
+def test_position_polling(app, qtbot):
+    app.start_polling()
+    qtbot.waitUntil(lambda: app.pos[1].text() == "0.000", timeout=2000)
+    app.stop_polling()
+    assert app.pos[0].text() == "0.000"
+    assert app.pos[0].toolTip() == "Status: \x010TS"
+    assert not any(poller.isRunning() for poller in app.pollers.values())
+
+
+def test_poll_once_queries_each_stage_once(app):
+    poller = app.pollers[TESTCONFIG["x_axis"]["port"]]
+    commands = app.motor[0].serial_interface._serial_commands
+    n_commands = len(commands)
+    poller.poll_once()
+    tp_commands = [c for c in commands[n_commands:] if c.endswith(b"TP\r")]
+    assert tp_commands == [b"\x010TP\r", b"\x012TP\r"]
+    assert poller.queries == 4
+
+
+def test_poll_rate(app, qtbot):
+    poller = app.pollers[TESTCONFIG["x_axis"]["port"]]
+    with qtbot.waitSignal(poller.poll_rate_changed, timeout=3000) as blocker:
+        app.start_polling()
+    app.stop_polling()
+    port, rate = blocker.args
+    assert port == TESTCONFIG["x_axis"]["port"]
+    assert rate > 0
+    qtbot.waitUntil(lambda: "queries/s" in app.statusBar().currentMessage())
+
+
+def test_adaptive_polling(app):
+    poller = app.pollers[TESTCONFIG["x_axis"]["port"]]
+    poller.poll_once()
+    poller.poll_once()
+    stage = poller._stages[0]
+    assert not stage["moving"]
+    assert poller.poll_due() > stage["poll_moving"]
+
+    # the wake is handed over to the poller thread, which polls the stage with its next cycle
+    app.go_home_clicked(address=TESTCONFIG["x_axis"]["address"], index=0)
+    assert poller._woken == {0}
+    queries = poller.queries
+    poller.poll_due()
+    assert poller._woken == set()
+    assert poller.queries == queries + 2
+
+
+def test_record_toggled(app, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app.record.setChecked(True)
+    assert app.recorder is not None
+    path = tmp_path / app.recorder.writer.path
+    app.record.setChecked(False)
+    assert app.recorder is None
+    assert path.exists()
+    assert "Recorded" in app.statusBar().currentMessage()
+
+
+def test_stats_toggled(app):
+    app.stats.setChecked(True)
+    assert app.motor[0].serial_interface.trace is not None
+    app.get_position_clicked(
+        TESTCONFIG["x_axis"]["address"],
+        TESTCONFIG["x_axis"]["unit"],
+        TESTCONFIG["x_axis"]["stage_type"],
+        TESTCONFIG["x_axis"]["step_size"],
+        index=0,
+    )
+    app.update_stats()
+    assert "TP" in app.stats_panel.toPlainText()
+    app.stats.setChecked(False)
+    assert app.motor[0].serial_interface.trace is None
+    assert app.stats_panel.isHidden()
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,75 @@
+import logging
+import threading
+import time
+import pytest
+from motor_stage_ui import logger
+
+
+def test_configured_once(monkeypatch):
+    log = logger.setup_main_logger("TestLogger", logging.INFO)
+    handlers = list(logging.root.handlers)
+    installs = []
+    monkeypatch.setattr(
+        logger.coloredlogs, "install", lambda *args, **kwargs: installs.append(args)
+    )
+    for i in range(100):
+        assert logger.setup_main_logger("TestLogger%i" % i, logging.WARNING)
+    assert logger.setup_main_logger("TestLogger", logging.INFO) is log
+    assert installs == []
+    assert logging.root.handlers == handlers
+    assert log.level == logging.INFO
+    assert callable(log.success) and callable(log.notice)
+
+
+def test_logfile(tmp_path):
+    path = tmp_path / "motor.log"
+    fh = logger.setup_logfile(str(path))
+    logger.add_logfile_to_loggers(fh)
+    try:
+        logger.setup_main_logger("TestLogfile", logging.INFO).info("to file")
+        # loggers created after the file was added log into it as well
+        logger.setup_main_logger("TestLogfileLate", logging.INFO).warning("late")
+    finally:
+        logger.close_logfile(fh)
+        fh.close()
+    logger.setup_main_logger("TestLogfile", logging.INFO).info("not in file")
+    text = path.read_text()
+    assert "to file" in text and "late" in text
+    assert "not in file" not in text
+
+
+class _BlockingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.messages.append(record.getMessage())
+
+
+def test_queue_logging():
+    handler = _BlockingHandler()
+    logger.add_logfile_to_loggers(handler)
+    log = logger.setup_main_logger("TestQueue", logging.DEBUG)
+    logger.setup_queue_logging()
+    try:
+        start = time.perf_counter()
+        for i in range(3):
+            log.debug("record %i", i)
+        # the slow handler does not block the log calls
+        assert time.perf_counter() - start < 1
+        assert handler.messages == []
+        handler.unblock.set()
+    finally:
+        logger.stop_queue_logging()
+        logger.close_logfile(handler)
+    assert handler.messages == ["record 0", "record 1", "record 2"]
+    assert not any(
+        isinstance(h, logging.handlers.QueueHandler) for h in logging.root.handlers
+    )
+
+
+if __name__ == "__main__":
+    pytest.main()
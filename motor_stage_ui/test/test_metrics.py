@@ -0,0 +1,170 @@
+from pathlib import Path
+import time
+import urllib.error
+import urllib.request
+import pytest
+import serial
+import yaml
+from motor_stage_ui.metrics import CONTENT_TYPE, MetricsServer, StageMonitor
+from motor_stage_ui.pi_stages_interface import PIStagesInterface, set_tracing
+from motor_stage_ui.test.utils import SerialInterfaceMock, SerialInterfaceSimulator
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = SerialInterfaceMock
+
+
+@pytest.fixture
+def monitor():
+    monitor = StageMonitor(TESTCONFIG, interface=INTERFACE, interval=0.01)
+    yield monitor
+    monitor.stop()
+    set_tracing(False)
+
+
+def samples(text: str) -> dict:
+    return {
+        line.rsplit(" ", 1)[0]: line.rsplit(" ", 1)[1]
+        for line in text.splitlines()
+        if not line.startswith("#")
+    }
+
+
+def test_render(monitor):
+    metrics = samples(monitor.render())
+    # nothing polled yet
+    assert (
+        metrics['motor_stage_up{stage="x_axis",port="/dev/ttyUSB0",address="1"}'] == "0"
+    )
+    assert (
+        metrics[
+            'motor_stage_position_steps{stage="x_axis",port="/dev/ttyUSB0",address="1"}'
+        ]
+        == "NaN"
+    )
+    monitor.poll()
+    PIStagesInterface(
+        port=TESTCONFIG["rot"]["port"],
+        baud_rate=TESTCONFIG["rot"]["baud_rate"],
+        interface=INTERFACE,
+    ).move_relative(
+        TESTCONFIG["rot"]["address"],
+        "1deg",
+        TESTCONFIG["rot"]["unit"],
+        TESTCONFIG["rot"]["stage_type"],
+        TESTCONFIG["rot"]["step_size"],
+    )
+    text = monitor.render()
+    metrics = samples(text)
+    assert (
+        metrics['motor_stage_up{stage="x_axis",port="/dev/ttyUSB0",address="1"}'] == "1"
+    )
+    assert (
+        metrics[
+            'motor_stage_position{stage="rot",port="/dev/ttyUSB0",address="3",unit="deg"}'
+        ]
+        == "0.0"
+    )
+    # the mock echoes the status command, the status can not be decoded
+    assert (
+        metrics['motor_stage_status{stage="rot",port="/dev/ttyUSB0",address="3"}']
+        == "NaN"
+    )
+    assert (
+        metrics['motor_stage_moves_total{stage="rot",port="/dev/ttyUSB0",address="3"}']
+        == "1"
+    )
+    assert (
+        metrics[
+            'motor_stage_serial_timeouts_total{stage="rot",port="/dev/ttyUSB0",address="3"}'
+        ]
+        == "0"
+    )
+    assert float(metrics['motor_stage_poll_lag_seconds{port="/dev/ttyUSB0"}']) >= 0
+    assert "# TYPE motor_stage_moves_total counter" in text
+
+
+def test_poll_failure():
+    monitor = StageMonitor(
+        {"x_axis": dict(TESTCONFIG["x_axis"], port="/dev/ttySimMetrics")},
+        interface=SerialInterfaceSimulator,
+    )
+    # no controller answers on address 1
+    serial_interface = monitor._motors["/dev/ttySimMetrics"].serial_interface
+    del serial_interface.stages[1]
+    monitor.poll()
+    metrics = samples(monitor.render())
+    assert metrics['motor_stage_poll_failures_total{port="/dev/ttySimMetrics"}'] == "1"
+    assert (
+        metrics['motor_stage_last_poll_timestamp_seconds{port="/dev/ttySimMetrics"}']
+        == "NaN"
+    )
+    assert (
+        metrics[
+            'motor_stage_serial_timeouts_total{stage="x_axis",port="/dev/ttySimMetrics",address="1"}'
+        ]
+        == "3"
+    )
+    # the failed pipelined query is repeated command by command, then the stage is offline
+    assert serial_interface.breaker.offline() == [1]
+    set_tracing(False)
+
+
+class DisconnectedInterface(SerialInterfaceMock):
+    """Serial interface of an unplugged adapter."""
+
+    def transactions(self, commands: list[str], timeout: float = None) -> list[str]:
+        raise serial.SerialException("device disconnected")
+
+
+def test_poll_disconnected():
+    monitor = StageMonitor(
+        {"x_axis": dict(TESTCONFIG["x_axis"], port="/dev/ttyUnplugged")},
+        interface=DisconnectedInterface,
+        interval=0.01,
+    )
+    monitor.start()
+    try:
+        time.sleep(0.1)
+        # the poll thread keeps running and counts the failed polls
+        assert monitor._thread.is_alive()
+        metrics = samples(monitor.render())
+        assert (
+            int(metrics['motor_stage_poll_failures_total{port="/dev/ttyUnplugged"}'])
+            > 1
+        )
+        assert (
+            metrics[
+                'motor_stage_up{stage="x_axis",port="/dev/ttyUnplugged",address="1"}'
+            ]
+            == "0"
+        )
+    finally:
+        monitor.stop()
+        set_tracing(False)
+
+
+def test_server(monitor):
+    monitor.start()
+    server = MetricsServer(monitor, ("127.0.0.1", 0))
+    server.start()
+    url = "http://127.0.0.1:%i" % server.server_address[1]
+    try:
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert "motor_stage_position_steps" in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -1,8 +1,14 @@
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import time
 import pytest
 import yaml
-from motor_stage_ui.pi_stages_interface import PIStagesInterface
-from motor_stage_ui.test.utils import SerialInterfaceMock
+from motor_stage_ui.pi_stages_interface import PIStagesInterface, SerialInterface
+from motor_stage_ui.pi_stages_interface import get_serial_interface
+from motor_stage_ui.pi_stages_interface import close_serial_interface
+from motor_stage_ui.pi_stages_interface import decode_status
+from motor_stage_ui.pi_stages_interface import SettleState
+from motor_stage_ui.test.utils import PtySerialDevice, SerialInterfaceMock
 
 
 FILEPATH = Path(__file__).parent
@@ -163,6 +169,132 @@ def test_get_position():
     )
 
 
+def test_move_and_wait():
+    ADDRESS = TESTCONFIG["x_axis"]["address"]
+    UNIT = TESTCONFIG["x_axis"]["unit"]
+    STEPSIZE = TESTCONFIG["x_axis"]["step_size"]
+    STAGE = TESTCONFIG["x_axis"]["stage_type"]
+    assert (
+        PISTAGES.move_and_wait(
+            address=ADDRESS,
+            amount="1mm",
+            unit=UNIT,
+            stage=STAGE,
+            step_size=STEPSIZE,
+            poll_interval=0.001,
+        )
+        == "0.000"
+    )
+    assert b"\x010MA55555\r" in PISTAGES.serial_interface._serial_commands[-4:]
+    assert PISTAGES.serial_interface._serial_commands[-1] == b"\x010TS\r"
+
+    # mock position never reaches the target but is stable
+    assert PISTAGES.wait_until_idle(address=ADDRESS, poll_interval=0.001) == 0
+    with pytest.raises(ValueError):
+        PISTAGES.move_and_wait(
+            address=ADDRESS, amount="", unit=UNIT, stage=STAGE, step_size=STEPSIZE
+        )
+
+
+def test_wait_until_idle_timeout():
+    ADDRESS = TESTCONFIG["x_axis"]["address"]
+    parse_position = PISTAGES._parse_position
+    positions = iter(range(1000))
+    # position changes with every poll: stage is moving
+    PISTAGES._parse_position = lambda msg: next(positions)
+    try:
+        with pytest.raises(TimeoutError):
+            PISTAGES.wait_until_idle(address=ADDRESS, timeout=0.05, poll_interval=0.01)
+        positions = iter(range(1000))
+        assert (
+            PISTAGES.wait_until_idle(
+                address=ADDRESS, timeout=1, poll_interval=0.001, target=3
+            )
+            == 3
+        )
+    finally:
+        PISTAGES._parse_position = parse_position
+
+
+def test_settle_state():
+    state = SettleState([1, 2, 3], targets={1: 10}, timeout=1)
+    # stage 1 reaches its target, stage 2 moves, stage 3 is at rest after the second poll
+    assert not state.update(1, 10)
+    assert not state.update(2, 0)
+    assert not state.update(3, 5)
+    assert not state.done(0.01)
+    assert state.pending == [2, 3]
+    assert not state.update(2, 4)
+    assert state.update(3, 5)
+    state.settle(3)
+    assert not state.done(0.01)
+    assert state.pending == [2]
+    assert state.settled == {1: 10, 3: 5}
+    with pytest.raises(TimeoutError):
+        state.done(2)
+
+
+def test_move_many():
+    stages = {name: TESTCONFIG[name] for name in ["x_axis", "rot"]}
+    assert PISTAGES.move_many(
+        {"x_axis": "1mm", "rot": "1deg"}, stages, poll_interval=0.001
+    ) == {"x_axis": "0.000", "rot": "0.000"}
+    commands = PISTAGES.serial_interface._serial_commands
+    first = commands.index(b"\x010MA55555\r", -8)
+    assert commands[first : first + 4] == [
+        b"\x010MA55555\r",
+        b"\x012MA29411\r",
+        b"\x010TP\r",
+        b"\x012TP\r",
+    ]
+
+    with pytest.raises(ValueError):
+        PISTAGES.move_many(
+            {"x_axis": "1mm"}, {"x_axis": dict(stages["x_axis"], port="/dev/ttyUSB9")}
+        )
+
+
+def test_get_positions():
+    stages = {name: TESTCONFIG[name] for name in ["x_axis", "rot"]}
+    assert PISTAGES.get_positions(stages) == {"x_axis": "0.000", "rot": "0.000"}
+    assert PISTAGES.serial_interface._serial_commands[-2:] == [
+        b"\x010TP\r",
+        b"\x012TP\r",
+    ]
+
+
+def test_calculate_value():
+    STEPSIZE = TESTCONFIG["x_axis"]["step_size"]
+    assert int(PISTAGES._calculate_value("2 mm", "mm", "translation", STEPSIZE)) == (
+        111111
+    )
+    assert int(PISTAGES._calculate_value("-2", "cm", "translation", STEPSIZE)) == (
+        -1111111
+    )
+    assert PISTAGES._calculate_value("1e-3m", "mm", "translation", 1) == 1000
+    # units and expressions not covered by the fast parser are converted by pint
+    assert PISTAGES._calculate_value("1 thou", "mm", "translation", 1) == (
+        pytest.approx(25.4)
+    )
+    assert PISTAGES._calculate_value("1/2 inch", "mm", "translation", 1) == (
+        pytest.approx(12700)
+    )
+
+    STEPSIZE = float(TESTCONFIG["rot"]["step_size"])
+    assert int(PISTAGES._calculate_value("1", "deg", "rotation", STEPSIZE)) == 29411
+    assert PISTAGES._calculate_value("60arcmin", "deg", "rotation", 1) == (
+        pytest.approx(1)
+    )
+
+    for amount, unit, stage in [
+        ("abc", "mm", "translation"),
+        ("1deg", "mm", "translation"),
+        ("1", "mm", "linear"),
+    ]:
+        with pytest.raises(ValueError):
+            PISTAGES._calculate_value(amount, unit, stage, 1)
+
+
 def test_get_stat():
     ADDRESS = TESTCONFIG["x_axis"]["address"]
     PISTAGES.get_stat(address=ADDRESS)
@@ -173,5 +305,150 @@ def test_get_stat():
     assert PISTAGES.serial_interface._serial_commands[-1] == b"\x012TS\r"
 
 
+def test_shared_serial_interface():
+    pistages = PIStagesInterface(
+        port=TESTCONFIG["rot"]["port"],
+        baud_rate=TESTCONFIG["rot"]["baud_rate"],
+        interface=INTERFACE,
+    )
+    assert pistages.serial_interface is PISTAGES.serial_interface
+    assert (
+        get_serial_interface(
+            port=TESTCONFIG["x_axis"]["port"],
+            baud_rate=TESTCONFIG["x_axis"]["baud_rate"],
+            interface=INTERFACE,
+        )
+        is PISTAGES.serial_interface
+    )
+
+    other = PIStagesInterface(
+        port="/dev/ttyUSB1",
+        baud_rate=TESTCONFIG["x_axis"]["baud_rate"],
+        interface=INTERFACE,
+    )
+    assert other.serial_interface is not PISTAGES.serial_interface
+
+    with pytest.raises(ValueError):
+        get_serial_interface(
+            port=TESTCONFIG["x_axis"]["port"], baud_rate=115200, interface=INTERFACE
+        )
+
+
+def test_transaction():
+    ADDRESS = TESTCONFIG["x_axis"]["address"]
+    assert PISTAGES._write_read("TS", ADDRESS, timeout=0.1) == "\x010TS"
+
+    ADDRESS = TESTCONFIG["rot"]["address"]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        replies = list(
+            pool.map(
+                lambda i: PISTAGES.serial_interface.transaction("\x012TS%d" % i),
+                range(100),
+            )
+        )
+    assert replies == ["\x012TS%d" % i for i in range(100)]
+
+    with pytest.raises(ValueError):
+        PISTAGES._write_read("TS")
+
+
+def test_address_encoding():
+    # the address is sent as one hex digit
+    PISTAGES.abort(address=12)
+    assert PISTAGES.serial_interface._serial_commands[-1] == b"\x01BAB\r"
+    PISTAGES.abort(address=16)
+    assert PISTAGES.serial_interface._serial_commands[-1] == b"\x01FAB\r"
+
+
+def test_decode_status():
+    flags = decode_status("S:84 00 00 00 00 00")
+    assert flags["trajectory_complete"]
+    assert flags["motor_off"]
+    assert not flags["busy"]
+    assert decode_status("S:01 00 00 00 00 00")["busy"]
+    assert decode_status("\x010TS") == {}
+
+
+@pytest.fixture
+def device():
+    device = PtySerialDevice()
+    pistages = PIStagesInterface(
+        port=device.port, baud_rate=9600, interface=SerialInterface
+    )
+    yield device, pistages
+    close_serial_interface(pistages.serial_interface)
+    device.close()
+
+
+def test_deadline(device):
+    device, pistages = device
+    serial_interface = pistages.serial_interface
+    # 5 characters of the command and 14 of the answer, 11 bits per character at 9600 baud
+    assert serial_interface.deadline("\x010TP", pending=5) == pytest.approx(
+        serial_interface.response_time + 19 * 11 / 9600
+    )
+    assert serial_interface.deadline("\x010VE") is None
+    assert pistages._get_position(1) == 0
+    # no controller answers on address 2
+    del device.simulator.stages[2]
+    start = time.monotonic()
+    with pytest.raises(ValueError):
+        pistages._get_position(2)
+    assert time.monotonic() - start < 0.5
+    assert pistages._get_position(1) == 0
+
+
+def test_incomplete_answer(device, monkeypatch):
+    device, pistages = device
+    execute = device.simulator._execute
+
+    def truncated(command, now):
+        execute(command, now)
+        msg, ready = device.simulator._replies.pop()
+        device.simulator._replies.append((msg[:5], ready))
+
+    monkeypatch.setattr(device.simulator, "_execute", truncated)
+    start = time.monotonic()
+    with pytest.raises(ValueError):
+        pistages._get_position(1)
+    assert time.monotonic() - start < 0.5
+    monkeypatch.setattr(device.simulator, "_execute", execute)
+    # the rest of the broken answer is not taken for the next answer
+    assert pistages._get_position(1) == 0
+
+
+def test_empty_transactions(device):
+    device, pistages = device
+    # nothing to query or move, no round trip on the port
+    assert pistages.serial_interface.transactions([]) == []
+    assert pistages._get_positions([]) == []
+    assert pistages.get_positions({}) == {}
+    assert pistages.move_to_steps({}) == {}
+    assert pistages.move_many({}, {}) == {}
+
+
+def test_offline_stage(device):
+    device, pistages = device
+    breaker = pistages.serial_interface.breaker
+    breaker.backoff = 0.2
+    stage = device.simulator.stages.pop(2)
+    # the failed pipelined query is repeated command by command to find the stage which does not respond
+    with pytest.raises(ValueError):
+        pistages._get_telemetry([1, 2])
+    assert breaker.offline() == [2]
+    # the offline stage is refused without a serial round trip, the others are served
+    start = time.monotonic()
+    with pytest.raises(ValueError):
+        pistages._get_position(2)
+    assert pistages._get_telemetry([1, 2])[1] == (None, None)
+    assert pistages._get_telemetry([1, 2])[0][0] == 0
+    assert time.monotonic() - start < 0.05
+    # the stage is probed again after the backoff
+    device.simulator.stages[2] = stage
+    time.sleep(0.2)
+    assert pistages._get_telemetry([1, 2])[1][0] == 0
+    assert breaker.offline() == []
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,99 @@
+from pathlib import Path
+import pytest
+import yaml
+from motor_stage_ui.pi_stages_interface import PIStagesInterface
+from motor_stage_ui.raster_scan import RasterScan
+from motor_stage_ui.test.utils import SerialInterfaceMock
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = SerialInterfaceMock
+
+PISTAGES = PIStagesInterface(
+    port=TESTCONFIG["x_axis"]["port"],
+    baud_rate=TESTCONFIG["x_axis"]["baud_rate"],
+    interface=INTERFACE,
+)
+
+
+def test_points():
+    scan = RasterScan(
+        PISTAGES,
+        TESTCONFIG,
+        "x_axis",
+        "rot",
+        x=("0mm", "2mm", "1mm"),
+        y=("0deg", "1deg", "1deg"),
+    )
+    assert scan.points() == [
+        (0, 0),
+        (1, 0),
+        (2, 0),
+        (2, 1),
+        (1, 1),
+        (0, 1),
+    ]
+
+    scan = RasterScan(
+        PISTAGES,
+        TESTCONFIG,
+        "x_axis",
+        "rot",
+        x=("1cm", "0cm", "0.5cm"),
+        y=("0deg", "0deg", "1deg"),
+        serpentine=False,
+    )
+    assert scan.points() == [(10, 0), (5, 0), (0, 0)]
+
+    with pytest.raises(ValueError):
+        RasterScan(
+            PISTAGES,
+            TESTCONFIG,
+            "x_axis",
+            "rot",
+            x=("0mm", "1mm", "0mm"),
+            y=("0deg", "1deg", "1deg"),
+        )
+
+
+def test_run():
+    scan = RasterScan(
+        PISTAGES,
+        TESTCONFIG,
+        "x_axis",
+        "rot",
+        x=("0mm", "1mm", "1mm"),
+        y=("0deg", "1deg", "1deg"),
+        poll_interval=0.001,
+    )
+    visited = []
+    results = list(
+        scan.run(lambda positions: visited.append(positions) or len(visited))
+    )
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["result"] for result in results] == [1, 2, 3, 4]
+    assert visited[0] == {"x_axis": "0.000", "rot": "0.000"}
+    assert scan.points_per_second > 0
+
+    moves = [
+        command
+        for command in PISTAGES.serial_interface._serial_commands[-40:]
+        if b"MA" in command
+    ]
+    assert moves[-5:] == [
+        b"\x010MA0\r",
+        b"\x012MA0\r",
+        b"\x010MA55555\r",
+        b"\x012MA29411\r",
+        b"\x010MA0\r",
+    ]
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,93 @@
+from pathlib import Path
+import pytest
+import yaml
+from motor_stage_ui.script import ScriptRunner
+from motor_stage_ui.stage_server import StageController
+from motor_stage_ui.test.utils import SerialInterfaceMock
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = SerialInterfaceMock
+
+SCRIPT = """
+- moveto: {motor_name: x_axis, a: 1mm}
+- sleep: 0.001
+- loop:
+    var: x
+    values: [1mm, 2mm]
+    steps:
+      - moveto: {motor_name: x_axis, a: "{x}", wait: true}
+      - loop:
+          count: 2
+          steps:
+            - pos: rot
+- wait: x_axis
+- status: x_axis
+"""
+
+
+def test_script():
+    controller = StageController(TESTCONFIG, interface=INTERFACE)
+    commands = list(ScriptRunner(controller.call).run(yaml.safe_load(SCRIPT)))
+    assert commands == [
+        ("moveto", {"motor_name": "x_axis", "a": "1mm"}, None),
+        ("moveto", {"motor_name": "x_axis", "a": "1mm", "wait": True}, "0.000"),
+        ("pos", {"motor_name": "rot"}, "0.000"),
+        ("pos", {"motor_name": "rot"}, "0.000"),
+        ("moveto", {"motor_name": "x_axis", "a": "2mm", "wait": True}, "0.000"),
+        ("pos", {"motor_name": "rot"}, "0.000"),
+        ("pos", {"motor_name": "rot"}, "0.000"),
+        ("wait", {"motor_name": "x_axis"}, "0.000"),
+        ("status", {"motor_name": "x_axis"}, "\x010TS"),
+    ]
+    assert (
+        b"\x010MA111111\r"
+        in controller.motor("x_axis").serial_interface._serial_commands
+    )
+
+
+def test_numeric_amount():
+    controller = StageController(TESTCONFIG, interface=INTERFACE)
+    script = yaml.safe_load(
+        """
+- moveto: {motor_name: x_axis, a: 1, wait: true}
+- move: {motor_name: x_axis, a: 0.5}
+"""
+    )
+    commands = list(ScriptRunner(controller.call).run(script))
+    assert commands[0] == (
+        "moveto",
+        {"motor_name": "x_axis", "a": "1", "wait": True},
+        "0.000",
+    )
+    # amounts without unit are in the default unit of the stage
+    assert (
+        controller.motor("x_axis")
+        .serial_interface._serial_commands[-5:]
+        .count(b"\x010MA55555\r")
+        == 1
+    )
+    assert (
+        controller.motor("x_axis").serial_interface._serial_commands[-1]
+        == b"\x010MR27777\r"
+    )
+
+
+def test_invalid_script():
+    runner = ScriptRunner(lambda method, **params: None)
+    with pytest.raises(ValueError):
+        list(runner.run({"pos": "x_axis"}))
+    with pytest.raises(ValueError):
+        list(runner.run([{"pos": "x_axis", "stop": "x_axis"}]))
+    with pytest.raises(ValueError):
+        list(runner.run([{"shutdown": "x_axis"}]))
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,125 @@
+from pathlib import Path
+import pytest
+import yaml
+from motor_stage_ui.pi_stages_interface import (
+    PIStagesInterface,
+    close_serial_interface,
+    set_tracing,
+)
+from motor_stage_ui.serial_trace import SerialTrace, format_stats
+from motor_stage_ui.test.utils import SerialInterfaceMock, SerialInterfaceSimulator
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = SerialInterfaceSimulator
+
+
+@pytest.fixture
+def tracing():
+    set_tracing(True)
+    yield
+    set_tracing(False)
+
+
+def test_trace():
+    trace = SerialTrace("/dev/ttyTrace")
+    trace.written(["\x010TP", "\x01AMA100", "\x010TS"], "\r", 1.0, 1.001)
+    trace.read(12, 1.003)
+    trace.read(20, 1.0045)
+    stats = trace.summary()
+    assert list(stats) == ["1:TP", "1:TS", "11:MA"]
+    assert stats["11:MA"]["count"] == 1
+    assert stats["11:MA"]["max"] == pytest.approx(0.001)
+    # bytes of every command with its terminator, not the average of the write
+    assert stats["11:MA"]["bytes_sent"] == 8
+    assert trace.events[0][3] == 8
+    assert stats["1:TP"]["mean"] == pytest.approx(0.003)
+    assert stats["1:TP"]["bytes_sent"] == 5
+    assert stats["1:TP"]["bytes_received"] == 12
+    assert stats["1:TP"]["histogram"] == {"0.005": 1}
+    assert stats["1:TS"]["p95"] == pytest.approx(0.0045)
+    # a timeout drops the pending queries, their answers can not be assigned anymore
+    trace.written(["\x010TP", "\x010TP"], "\r", 2.0, 2.0)
+    trace.read(0, 4.0, timeout=True)
+    trace.read(12, 4.1)
+    trace.written(["\x010TS"], "\r", 5.0, 5.0)
+    trace.error(5.5)
+    stats = trace.summary()
+    assert stats["1:TP"]["count"] == 1
+    assert stats["1:TP"]["timeouts"] == 1
+    assert stats["1:TS"]["errors"] == 1
+    assert [event[-1] for event in trace.events] == [
+        "ok",
+        "ok",
+        "ok",
+        "timeout",
+        "error",
+    ]
+
+
+def test_quantile():
+    trace = SerialTrace("/dev/ttyTrace")
+    for i in range(100):
+        trace.written(["\x010TP"], "\r", 0.0, 0.0)
+        trace.read(12, 0.0015 if i < 90 else 0.15)
+    stats = trace.summary()["1:TP"]
+    assert stats["p50"] == 0.002
+    assert stats["p95"] == 0.15
+    assert stats["max"] == 0.15
+
+
+def test_tracing(tracing):
+    pistages = PIStagesInterface(
+        port="/dev/ttySimTrace", baud_rate=115200, interface=INTERFACE
+    )
+    pistages._get_positions([1, 2])
+    pistages.abort(1)
+    stats = pistages.serial_interface.trace.summary()
+    assert stats["1:TP"]["count"] == stats["2:TP"]["count"] == 1
+    assert stats["1:AB"]["count"] == 1
+    # answer of 'P:+0000000000\r' after the response time of the controller
+    assert stats["1:TP"]["bytes_received"] == 14
+    assert stats["1:TP"]["mean"] >= INTERFACE.latency
+    # tracing can be switched off for opened ports
+    set_tracing(False)
+    assert pistages.serial_interface.trace is None
+    close_serial_interface(pistages.serial_interface)
+
+
+def test_tracing_disabled():
+    pistages = PIStagesInterface(
+        port=TESTCONFIG["x_axis"]["port"],
+        baud_rate=TESTCONFIG["x_axis"]["baud_rate"],
+        interface=SerialInterfaceMock,
+    )
+    pistages.get_stat(TESTCONFIG["x_axis"]["address"])
+    assert pistages.serial_interface.trace is None
+
+
+def test_format_stats():
+    trace = SerialTrace("/dev/ttyTrace")
+    trace.written(["\x010TP"], "\r", 0.0, 0.0)
+    trace.read(12, 0.002)
+    lines = format_stats({"/dev/ttyTrace": trace.summary()}).splitlines()
+    assert lines[0].split()[:5] == ["port", "addr", "cmd", "count", "timeout"]
+    assert lines[1].split() == [
+        "/dev/ttyTrace",
+        "1",
+        "TP",
+        "1",
+        "0",
+        "0",
+        "2.000",
+        "2.000",
+        "2.000",
+    ]
+
+
+if __name__ == "__main__":
+    pytest.main()
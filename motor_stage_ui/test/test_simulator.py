@@ -0,0 +1,122 @@
+from pathlib import Path
+import time
+import pytest
+import yaml
+from motor_stage_ui.pi_stages_interface import PIStagesInterface, decode_status
+from motor_stage_ui.test.utils import SerialInterfaceSimulator
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = SerialInterfaceSimulator
+
+ADDRESS = TESTCONFIG["x_axis"]["address"]
+UNIT = TESTCONFIG["x_axis"]["unit"]
+STEPSIZE = TESTCONFIG["x_axis"]["step_size"]
+STAGE = TESTCONFIG["x_axis"]["stage_type"]
+
+
+def test_move_time():
+    pistages = PIStagesInterface(
+        port="/dev/ttySim0", baud_rate=115200, interface=INTERFACE
+    )
+    start = time.monotonic()
+    position = pistages.move_and_wait(
+        ADDRESS, "1mm", UNIT, STAGE, STEPSIZE, poll_interval=0.01
+    )
+    elapsed = time.monotonic() - start
+    assert position == "1.000"
+    # 55555 steps with 200000 steps/s and 800000 steps/s^2 take 0.528 s
+    assert 0.52 < elapsed < 1.0
+
+    pistages.set_home(ADDRESS)
+    assert (
+        pistages.move_and_wait(
+            ADDRESS, "-0.1mm", UNIT, STAGE, STEPSIZE, relative=True, poll_interval=0.01
+        )
+        == "-0.100"
+    )
+    assert pistages.serial_interface.stages[ADDRESS].target == -5555
+
+
+def test_status():
+    pistages = PIStagesInterface(
+        port="/dev/ttySim1", baud_rate=115200, interface=INTERFACE
+    )
+    assert decode_status(pistages.get_stat(ADDRESS))["trajectory_complete"]
+    pistages.set_velocity(ADDRESS, 1000)
+    pistages.move_relative(ADDRESS, "1mm", UNIT, STAGE, STEPSIZE)
+    assert pistages._trajectory_running(ADDRESS)
+    assert 0 < pistages._get_position(ADDRESS) < 55555
+    pistages.abort(ADDRESS)
+    assert not pistages._trajectory_running(ADDRESS)
+
+    pistages.motor_off(ADDRESS)
+    pistages.move_relative(ADDRESS, "1mm", UNIT, STAGE, STEPSIZE)
+    flags = decode_status(pistages.get_stat(ADDRESS))
+    assert flags["motor_off"] and flags["command_error"]
+    # reading the status resets the error
+    assert not decode_status(pistages.get_stat(ADDRESS))["command_error"]
+
+
+def test_transfer_time():
+    serial_interface = INTERFACE(port="/dev/ttySim2", baud_rate=9600)
+    char_time = 11 / 9600
+    start = time.monotonic()
+    assert serial_interface.transaction("\x010TP") == "P:+0000000000"
+    single = time.monotonic() - start
+    # command, response time and answer
+    assert single >= (5 + 14) * char_time + serial_interface.latency
+
+    start = time.monotonic()
+    assert (
+        serial_interface.transactions(["\x010TP", "\x011TP", "\x012TP"])
+        == ["P:+0000000000"] * 3
+    )
+    pipelined = time.monotonic() - start
+    assert 3 * 14 * char_time <= pipelined < 3 * single
+
+    # no controller answers on an unused address
+    serial_interface.stages.pop(5)
+    with pytest.raises(ValueError):
+        serial_interface.transaction("\x014TP", timeout=0.01)
+
+
+def test_missing_address():
+    serial_interface = INTERFACE(port="/dev/ttySim3", baud_rate=9600)
+    serial_interface.stages.pop(5)
+    deadline = serial_interface.deadline("\x014TP", pending=5)
+    start = time.monotonic()
+    for _ in range(serial_interface.breaker.threshold):
+        with pytest.raises(ValueError):
+            serial_interface.transaction("\x014TP")
+    # every miss costs the deadline of the position answer, not the timeout of the port
+    assert time.monotonic() - start < serial_interface.breaker.threshold * (
+        deadline + 0.05
+    )
+    assert serial_interface.breaker.offline() == [5]
+    # the offline address is refused without a round trip, the others are served
+    start = time.monotonic()
+    with pytest.raises(ValueError):
+        serial_interface.transaction("\x014TP")
+    assert time.monotonic() - start < 0.01
+    assert serial_interface.transaction("\x010TP") == "P:+0000000000"
+
+
+def test_incomplete_answer():
+    serial_interface = INTERFACE(port="/dev/ttySim4", baud_rate=9600)
+    # the status answer takes 20 characters, only a part arrives within the timeout
+    with pytest.raises(ValueError):
+        serial_interface.transaction("\x010TS", timeout=0.015)
+    time.sleep(0.05)
+    # the late rest is discarded before the next command
+    assert serial_interface.transaction("\x010TP") == "P:+0000000000"
+
+
+if __name__ == "__main__":
+    pytest.main()
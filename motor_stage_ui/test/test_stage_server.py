@@ -0,0 +1,211 @@
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from click.testing import CliRunner
+import json
+import os
+import subprocess
+import sys
+import time
+import pytest
+import yaml
+import motor_stage_ui.motor_stage_terminal as terminal_ui
+from motor_stage_ui.stage_server import (
+    StageClient,
+    StageController,
+    StageServer,
+    TCPStageServer,
+    connect,
+)
+from motor_stage_ui.test.utils import SerialInterfaceMock
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = SerialInterfaceMock
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = StageServer(
+        str(tmp_path / "motor.sock"), StageController(TESTCONFIG, interface=INTERFACE)
+    )
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_client(server):
+    client = connect(server.server_address)
+    assert client.call("pos", motor_name="x_axis") == "0.000"
+    assert client.call("status", motor_name="rot") == "\x012TS"
+    assert client.call("move", motor_name="x_axis", a="1mm") is None
+    assert (
+        server.controller.motor("x_axis").serial_interface._serial_commands[-1]
+        == b"\x010MR55555\r"
+    )
+    with pytest.raises(RuntimeError):
+        client.call("pos", motor_name="z_axis")
+    with pytest.raises(RuntimeError):
+        client.call("shutdown")
+    client.close()
+
+    assert connect(server.server_address + ".missing") is None
+
+
+def test_server_running(server, tmp_path):
+    # a second server must not take over the socket of a running server
+    with pytest.raises(OSError):
+        StageServer(server.server_address, server.controller)
+    client = connect(server.server_address)
+    assert client.call("pos", motor_name="x_axis") == "0.000"
+    client.close()
+
+    # stale socket file without server
+    path = str(tmp_path / "stale.sock")
+    stale = StageServer(path, server.controller)
+    stale.socket.close()
+    assert os.path.exists(path)
+    restarted = StageServer(path, server.controller)
+    restarted.server_close()
+
+
+def test_invalid_request(server):
+    client = connect(server.server_address)
+    # a JSON value which is not an object is answered with an error, the pipelined request after it is executed
+    client._file.write(
+        b'[1]\n{"id": 7, "method": "pos", "params": {"motor_name": "x_axis"}}\n'
+    )
+    client._file.flush()
+    assert json.loads(client._file.readline()) == {
+        "id": None,
+        "error": "ValueError: Request is not a JSON object",
+    }
+    assert json.loads(client._file.readline()) == {"id": 7, "result": "0.000"}
+    client.close()
+
+
+@pytest.fixture
+def tcp_server():
+    server = TCPStageServer(
+        ("127.0.0.1", 0), StageController(TESTCONFIG, interface=INTERFACE)
+    )
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_tcp_client(tcp_server):
+    client = StageClient(tcp_server.server_address, timeout=5)
+    assert client.call("pos", motor_name="x_axis") == "0.000"
+    assert client.call("stop", motor_name="rot") is None
+    assert client.call_many(
+        [("pos", {"motor_name": "x_axis"})] * 50 + [("status", {"motor_name": "rot"})]
+    ) == ["0.000"] * 50 + ["\x012TS"]
+    with pytest.raises(RuntimeError):
+        client.call_many([("pos", {"motor_name": "x_axis"}), ("pos", {})])
+    # connection is still in sync after an error
+    assert client.call("pos", motor_name="rot") == "0.000"
+    client.close()
+
+
+def test_tcp_concurrent_clients(tcp_server):
+    def session(_):
+        client = StageClient(tcp_server.server_address, timeout=5)
+        try:
+            return client.call_many(
+                [
+                    ("pos", {"motor_name": "x_axis"}),
+                    ("status", {"motor_name": "x_axis"}),
+                ]
+                * 10
+            )
+        finally:
+            client.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(session, range(8)))
+    assert results == [["0.000", "\x010TS"] * 10] * 8
+
+
+def test_terminal_uses_server(server):
+    calls = []
+    call = server.controller.call
+    server.controller.call = lambda method, **params: (
+        calls.append(method) or call(method, **params)
+    )
+    runner = CliRunner()
+    result = runner.invoke(
+        terminal_ui.motor, ["--socket", server.server_address, "pos", "x_axis"]
+    )
+    assert result.exit_code == 0
+    assert result.output == "Position of: x_axis 0.000 mm\n"
+    result = runner.invoke(
+        terminal_ui.motor,
+        ["--socket", server.server_address, "moveto", "-w", "-a", "1deg", "rot"],
+    )
+    assert result.exit_code == 0
+    assert result.output == "Position of: rot 0.000 deg\n"
+    assert calls == ["pos", "moveto"]
+
+
+def test_thin_client_imports():
+    # the terminal only loads the client, the driver is imported by the commands which open ports
+    modules = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            "import sys, motor_stage_ui.motor_stage_terminal; print(' '.join(sys.modules))",
+        ]
+    ).split()
+    for module in [
+        b"serial",
+        b"asyncio",
+        b"motor_stage_ui.pi_stages_interface",
+        b"motor_stage_ui.stage_server",
+    ]:
+        assert module not in modules
+
+
+def test_serve(tmp_path):
+    path = str(tmp_path / "serve.sock")
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from motor_stage_ui.motor_stage_terminal import motor; motor()",
+            "--socket",
+            path,
+            "serve",
+        ],
+        env=dict(os.environ, TEST="True"),
+        stdout=subprocess.PIPE,
+    )
+    try:
+        deadline = time.monotonic() + 10
+        client = None
+        while client is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+            client = connect(path)
+        assert client is not None
+        assert client.call("pos", motor_name="rot") == "0.000"
+        client.close()
+    finally:
+        process.terminate()
+        process.wait()
+        process.stdout.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,126 @@
+from pathlib import Path
+import time
+import numpy as np
+import pytest
+import yaml
+from motor_stage_ui.pi_stages_interface import PIStagesInterface
+from motor_stage_ui.telemetry import (
+    TELEMETRY_DTYPE,
+    TelemetryRecorder,
+    TelemetryWriter,
+    max_sample_rate,
+    read_telemetry,
+)
+from motor_stage_ui.test.utils import SerialInterfaceMock
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = SerialInterfaceMock
+
+
+def test_writer(tmp_path):
+    path = str(tmp_path / "telemetry.npy")
+    writer = TelemetryWriter(path, chunk_size=4)
+    for i in range(10):
+        writer.append(1000 + i, i % 2, -i, 0x84)
+    # full chunks are on disk, the rest is buffered
+    assert writer.count == 8
+    assert len(read_telemetry(path)) == 8
+    writer.close()
+    records = read_telemetry(path)
+    assert records[0] == (1000, 0, 0, 0x84)
+    assert records[-1] == (1009, 1, -9, 0x84)
+    assert len(records) == 10
+    telemetry = np.load(path, mmap_mode="r")
+    assert telemetry.dtype == np.dtype(TELEMETRY_DTYPE)
+    assert list(telemetry["position"]) == [-i for i in range(10)]
+    with open(path, "rb") as file:
+        assert file.read(6) == b"\x93NUMPY"
+    assert_header_aligned(path)
+
+
+def assert_header_aligned(path):
+    with open(path, "rb") as file:
+        header = file.read(10)
+        assert (10 + int.from_bytes(header[8:10], "little")) % 64 == 0
+
+
+def test_recorder(tmp_path):
+    path = str(tmp_path / "telemetry.npy")
+    motor = PIStagesInterface(
+        port=TESTCONFIG["x_axis"]["port"],
+        baud_rate=TESTCONFIG["x_axis"]["baud_rate"],
+        interface=INTERFACE,
+    )
+    recorder = TelemetryRecorder(
+        TESTCONFIG,
+        {TESTCONFIG["x_axis"]["port"]: motor},
+        TelemetryWriter(path),
+        rate=200,
+    )
+    recorder.sample()
+    # one pipelined transaction per sample
+    assert motor.serial_interface._serial_commands[-4:] == [
+        b"\x010TP\r",
+        b"\x012TP\r",
+        b"\x010TS\r",
+        b"\x012TS\r",
+    ]
+    recorder.start()
+    time.sleep(0.1)
+    recorder.stop()
+    records = read_telemetry(path)
+    assert len(records) == 2 * recorder.samples
+    assert recorder.samples > 1
+    assert {stage for _, stage, _, _ in records} == {0, 1}
+    # the mock echoes the status command, it can not be decoded
+    assert all(position == 0 and status == -1 for _, _, position, status in records)
+    times = [timestamp for timestamp, _, _, _ in records]
+    assert times == sorted(times)
+
+
+def test_sample_time(tmp_path, monkeypatch):
+    path = str(tmp_path / "telemetry.npy")
+    motor = PIStagesInterface(
+        port=TESTCONFIG["x_axis"]["port"],
+        baud_rate=TESTCONFIG["x_axis"]["baud_rate"],
+        interface=INTERFACE,
+    )
+    recorder = TelemetryRecorder(
+        TESTCONFIG, {TESTCONFIG["x_axis"]["port"]: motor}, TelemetryWriter(path)
+    )
+    get_telemetry = motor._get_telemetry
+
+    def slow(addresses):
+        # answers arrive after a long round trip
+        time.sleep(0.05)
+        return get_telemetry(addresses)
+
+    monkeypatch.setattr(motor, "_get_telemetry", slow)
+    before = time.time_ns()
+    recorder.sample()
+    recorder.stop()
+    # the records carry the time of the query, not of the answers
+    assert all(
+        timestamp - before < 0.04e9 for timestamp, _, _, _ in read_telemetry(path)
+    )
+
+
+def test_max_sample_rate():
+    # position and status query and answer take 44 characters of 11 bits per stage
+    assert max_sample_rate(TESTCONFIG) == pytest.approx(9600 / (2 * 44 * 11))
+    assert (
+        max_sample_rate({"x_axis": dict(TESTCONFIG["x_axis"], baud_rate=115200)}) == 100
+    )
+    recorder = TelemetryRecorder(TESTCONFIG, {}, None)
+    assert recorder.rate == max_sample_rate(TESTCONFIG)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -1,5 +1,9 @@
 from click.testing import CliRunner
 import os
+import subprocess
+import sys
+import time
+import yaml
 import motor_stage_ui.motor_stage_terminal as terminal_ui
 
 
@@ -36,6 +40,16 @@ def test_moveto():
     assert result.exit_code == 0
 
 
+def test_move_wait():
+    runner = CliRunner()
+    result = runner.invoke(terminal_ui.motor, ["move", "-a", "2cm", "--wait", "x_axis"])
+    assert result.exit_code == 0
+    assert result.output == "Position of: x_axis 0.000 mm\n"
+    result = runner.invoke(terminal_ui.motor, ["moveto", "-w", "-a", "0deg", "rot"])
+    assert result.exit_code == 0
+    assert result.output == "Position of: rot 0.000 deg\n"
+
+
 def test_pos():
     runner = CliRunner()
     result = runner.invoke(terminal_ui.motor, ["pos", "x_axis"])
@@ -46,6 +60,30 @@ def test_pos():
     assert result.output == "Position of: rot 0.000 deg\n"
 
 
+def test_pos_startup_time():
+    # cold start of 'motor pos' in a fresh interpreter, unit conversion must not need pint
+    script = (
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "import motor_stage_ui.motor_stage_terminal as terminal_ui\n"
+        "result = CliRunner().invoke(terminal_ui.motor, ['pos', 'x_axis'])\n"
+        "assert result.exit_code == 0, result.output\n"
+        "print('pint' in sys.modules)\n"
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        env=dict(os.environ, TEST="True"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # about 0.2 s on a desktop, the bound only catches gross regressions on slow machines,
+    # see the cli_cold_start benchmark for the measurement
+    assert time.perf_counter() - start < 2.0
+    assert result.stdout.strip() == "False"
+
+
 def test_stop():
     runner = CliRunner()
     result = runner.invoke(terminal_ui.motor, ["stop", "x_axis"])
@@ -78,3 +116,65 @@ def test_status():
     result = runner.invoke(terminal_ui.motor, ["status", "rot"])
     assert result.exit_code == 0
     assert result.output == "Status of: rot \x012TS\n"
+
+
+def test_run():
+    runner = CliRunner()
+    script = "- moveto: {motor_name: x_axis, a: 1mm, wait: true}\n- stop: rot\n- pos: rot\n- status: rot\n"
+    result = runner.invoke(terminal_ui.motor, ["run"], input=script)
+    assert result.exit_code == 0
+    assert result.output == (
+        "Position of: x_axis 0.000 mm\n"
+        "Position of: rot 0.000 deg\n"
+        "Status of: rot \x012TS\n"
+    )
+    result = runner.invoke(terminal_ui.motor, ["run"], input="- jump: rot\n")
+    assert result.exit_code != 0
+
+
+def test_stats():
+    runner = CliRunner()
+    result = runner.invoke(terminal_ui.motor, ["stats"])
+    assert result.exit_code == 0
+    assert result.output.startswith("No serial statistics")
+    result = runner.invoke(
+        terminal_ui.motor, ["run", "--stats"], input="- pos: rot\n- status: rot\n"
+    )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[2].split()[:5] == ["port", "addr", "cmd", "count", "timeout"]
+    assert [line.split()[1:4] for line in lines[3:]] == [
+        ["3", "TP", "1"],
+        ["3", "TS", "1"],
+    ]
+    # tracing ends with the script
+    result = runner.invoke(terminal_ui.motor, ["stats", "--json"])
+    assert result.output == "{}\n"
+
+
+def test_scan_bus(tmp_path):
+    runner = CliRunner()
+    path = tmp_path / "configuration.yaml"
+    result = runner.invoke(
+        terminal_ui.motor, ["scan-bus", "/dev/ttyUSB0", "-b", "9600", "-o", str(path)]
+    )
+    assert result.exit_code == 0
+    # the mock answers on all addresses
+    assert result.output.startswith("/dev/ttyUSB0: 16 controllers at 9600 baud\n")
+    conf = yaml.safe_load(path.read_text())
+    assert len(conf) == 16
+    assert conf["ttyUSB0_16"]["address"] == 16
+
+
+def test_record(tmp_path):
+    runner = CliRunner()
+    path = str(tmp_path / "telemetry.npy")
+    result = runner.invoke(
+        terminal_ui.motor, ["record", path, "-r", "100", "-d", "0.05", "rot"]
+    )
+    assert result.exit_code == 0
+    assert result.output.startswith(
+        "Stage 0: rot\nRecording at 100.0 samples/s\nRecorded "
+    )
+    result = runner.invoke(terminal_ui.motor, ["record", path, "-d", "0", "z_axis"])
+    assert result.exit_code != 0
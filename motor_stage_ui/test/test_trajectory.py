@@ -0,0 +1,112 @@
+from pathlib import Path
+import numpy as np
+import pytest
+import yaml
+from motor_stage_ui.pi_stages_interface import PIStagesInterface
+from motor_stage_ui.trajectory import TrajectoryPlanner
+from motor_stage_ui.test.utils import SerialInterfaceMock
+
+
+FILEPATH = Path(__file__).parent
+CONFIG_FILE = FILEPATH / "test_configuration.yaml"
+
+with open(CONFIG_FILE) as yaml_file:
+    TESTCONFIG = yaml.safe_load(yaml_file)
+
+
+INTERFACE = SerialInterfaceMock
+
+PISTAGES = PIStagesInterface(
+    port=TESTCONFIG["x_axis"]["port"],
+    baud_rate=TESTCONFIG["x_axis"]["baud_rate"],
+    interface=INTERFACE,
+)
+
+
+def test_to_steps():
+    planner = TrajectoryPlanner(TESTCONFIG, ["x_axis", "rot"])
+    positions = np.column_stack([np.linspace(-3, 3, 101), np.linspace(-90, 90, 101)])
+    steps = planner.to_steps(positions)
+    assert steps.dtype == np.int64
+    assert steps.shape == (101, 2)
+    # same steps as the single moves
+    for (x, rot), (x_steps, rot_steps) in zip(positions, steps):
+        assert x_steps == int(
+            PISTAGES._calculate_value(
+                repr(float(x)), "mm", "translation", TESTCONFIG["x_axis"]["step_size"]
+            )
+        )
+        assert rot_steps == int(
+            PISTAGES._calculate_value(
+                repr(float(rot)), "deg", "rotation", TESTCONFIG["rot"]["step_size"]
+            )
+        )
+    assert np.array_equal(
+        planner.to_steps(positions * [1000, 1], units=["um", "deg"]), steps
+    )
+    with pytest.raises(ValueError):
+        planner.to_steps(np.zeros((3, 3)))
+    with pytest.raises(ValueError):
+        planner.to_steps(positions, units=["mm", "parsec"])
+
+
+def test_limits():
+    planner = TrajectoryPlanner(
+        TESTCONFIG, ["x_axis", "rot"], limits={"x_axis": (-1, 1)}
+    )
+    planner.check_limits(planner.to_steps([[1, 1000], [-1, -1000]]))
+    with pytest.raises(ValueError):
+        planner.check_limits(planner.to_steps([[0, 0], [1.01, 0]]))
+    with pytest.raises(ValueError):
+        planner.plan([[-2, 0]])
+    conf = dict(TESTCONFIG, rot=dict(TESTCONFIG["rot"], soft_limits=[0, 180]))
+    with pytest.raises(ValueError):
+        TrajectoryPlanner(conf, ["rot"]).plan([10, -10])
+
+
+def test_serpentine():
+    planner = TrajectoryPlanner(TESTCONFIG, ["x_axis", "rot"])
+    x, y = np.meshgrid(np.arange(3), np.arange(2))
+    grid = np.column_stack([x.ravel(), y.ravel()])
+    rng = np.random.default_rng(1)
+    steps = planner.plan(rng.permutation(grid), method="serpentine")
+    assert np.array_equal(
+        steps, planner.to_steps([[0, 0], [1, 0], [2, 0], [2, 1], [1, 1], [0, 1]])
+    )
+
+
+def test_nearest():
+    planner = TrajectoryPlanner(TESTCONFIG, ["x_axis", "rot"])
+    rng = np.random.default_rng(2)
+    steps = planner.to_steps(rng.uniform(-10, 10, (500, 2)))
+    order = planner.order(steps, method="nearest", start=[0, 0])
+    assert sorted(order) == list(range(500))
+    assert planner.travel(steps[order], start=[0, 0]) < 0.2 * planner.travel(
+        steps, start=[0, 0]
+    )
+    with pytest.raises(ValueError):
+        planner.order(steps, method="random")
+
+
+def test_large_scan():
+    planner = TrajectoryPlanner(
+        TESTCONFIG, ["x_axis", "rot"], limits={"x_axis": (-10, 10)}
+    )
+    x, y = np.meshgrid(np.linspace(-5, 5, 400), np.linspace(0, 90, 250))
+    steps = planner.plan(np.column_stack([x.ravel(), y.ravel()]))
+    assert steps.shape == (100000, 2)
+    assert planner.travel(steps) < 2 * 250 * planner.to_steps([[10, 0]])[0, 0]
+    assert planner.targets(steps[0]) == {
+        TESTCONFIG["x_axis"]["address"]: int(steps[0, 0]),
+        TESTCONFIG["rot"]["address"]: int(steps[0, 1]),
+    }
+
+
+def test_move_to_steps():
+    ADDRESS = TESTCONFIG["x_axis"]["address"]
+    assert PISTAGES.move_to_steps({ADDRESS: 0}, poll_interval=0.001) == {ADDRESS: 0}
+    assert b"\x010MA0\r" in PISTAGES.serial_interface._serial_commands
+
+
+if __name__ == "__main__":
+    pytest.main()
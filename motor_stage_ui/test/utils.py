@@ -1,8 +1,22 @@
+import asyncio
 import logging
+import math
+import os
+import re
+import select
+import time
+from collections import deque
+from threading import Event, Thread
+from threading import RLock
 from motor_stage_ui import logger
+from motor_stage_ui.circuit_breaker import CircuitBreaker
+from motor_stage_ui.pi_stages_interface import SerialInterface
 
 
 class SerialInterfaceMock:
+    # SerialTrace of the port, None if tracing is disabled
+    trace = None
+
     def __init__(
         self,
         port: str,
@@ -16,7 +30,15 @@ class SerialInterfaceMock:
         self._serial_commands = []
 
         self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self.port = port
+        self.baud_rate = baud_rate
         self._terminator = terminator
+        self._lock = RLock()
+        self.breaker = CircuitBreaker()
+
+    def close(self):
+        """Close the serial port."""
+        pass
 
     def _write(self, command: str):
         """
@@ -26,20 +48,426 @@ class SerialInterfaceMock:
             command (str): Address of the motorstage
 
         """
-        msg = (command + self._terminator).encode()
-        self.log.debug(msg)
-        self._serial_commands.append(msg)
+        with self._lock:
+            msg = (command + self._terminator).encode()
+            self.log.debug(msg)
+            start = time.perf_counter()
+            self._serial_commands.append(msg)
+            if self.trace is not None:
+                self.trace.written(
+                    [command], self._terminator, start, time.perf_counter()
+                )
+
+    def _write_many(self, commands: list[str]):
+        """Write several commands to serial port with one bulk write.
+
+        Args:
+            commands (list[str]): Commands for the port
+        """
+        with self._lock:
+            for command in commands:
+                self._write(command)
 
-    def _read(self):
+    def _read(self, timeout: float = None):
         """Read message from serial port.
 
+        Args:
+            timeout (float, optional): Read timeout in seconds. Unused by the mock.
+
+        Returns:
+            str: message
+        """
+        with self._lock:
+            msg = self._answer(self._serial_commands[-1])
+            if self.trace is not None:
+                self.trace.read(len(msg) + 1, time.perf_counter())
+            return msg
+
+    def _answer(self, command: bytes) -> str:
+        """Answer of the mock to a command: position queries return zero, all other commands are echoed.
+
+        Args:
+            command (bytes): Encoded command
+
         Returns:
             str: message
         """
-        msg = self._serial_commands[-1].decode().strip().replace(self._terminator, "")
+        msg = command.decode().strip().replace(self._terminator, "")
         if msg[-2:] == "TP":
             msg = "0.000"
         if msg == "":
             self.log.error("No responds from serial interface.")
             raise ValueError
         return msg
+
+    def transaction(self, command: str, timeout: float = None) -> str:
+        """Write command to serial port and read back the answer while holding the bus.
+
+        Args:
+            command (str): Command for the port
+            timeout (float, optional): Read timeout in seconds. Unused by the mock.
+
+        Returns:
+            str: Answer message
+        """
+        with self._lock:
+            self._write(command)
+            return self._read(timeout)
+
+    def transactions(self, commands: list[str], timeout: float = None) -> list[str]:
+        """Pipelined transactions: all commands are written, then all answers are read back in order.
+
+        Args:
+            commands (list[str]): Commands for the port
+            timeout (float, optional): Read timeout in seconds per answer. Unused by the mock.
+
+        Returns:
+            list[str]: Answer messages in the order of the commands
+        """
+        with self._lock:
+            first = len(self._serial_commands)
+            self._write_many(commands)
+            return [self._answer(msg) for msg in self._serial_commands[first:]]
+
+
+class AsyncSerialInterfaceMock(SerialInterfaceMock):
+    """Coroutine version of the mock for the AsyncPIStagesInterface."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = asyncio.Lock()
+
+    async def _write(self, command: str):
+        await self._write_many([command])
+
+    async def _write_many(self, commands: list[str]):
+        for command in commands:
+            msg = (command + self._terminator).encode()
+            self.log.debug(msg)
+            self._serial_commands.append(msg)
+
+    async def _read(self, timeout: float = None):
+        return self._answer(self._serial_commands[-1])
+
+    async def transaction(self, command: str, timeout: float = None) -> str:
+        async with self._lock:
+            await self._write(command)
+            return await self._read(timeout)
+
+    async def transactions(
+        self, commands: list[str], timeout: float = None
+    ) -> list[str]:
+        async with self._lock:
+            first = len(self._serial_commands)
+            await self._write_many(commands)
+            return [self._answer(msg) for msg in self._serial_commands[first:]]
+
+
+class StageSimulator:
+    """Simulated C-863 controller with stage at one address of the daisy chain.
+    Moves follow a trapezoidal velocity profile given by the velocity ('SV') and acceleration ('SA') in steps/s and steps/s^2.
+    """
+
+    def __init__(self, velocity: float = 200000, acceleration: float = 800000):
+        self.velocity = velocity
+        self.acceleration = acceleration
+        self.motor_on = True
+        self.command_error = False
+        self.start = 0.0
+        self.target = 0.0
+        self.start_time = 0.0
+        self.duration = 0.0
+
+    def _profile(self, distance: float) -> tuple[float, float]:
+        """Acceleration time and total time of a move over the distance in steps."""
+        t_acc = self.velocity / self.acceleration
+        if self.acceleration * t_acc**2 > distance:
+            # triangular profile, maximum velocity is not reached
+            t_acc = math.sqrt(distance / self.acceleration)
+            return t_acc, 2 * t_acc
+        return (
+            t_acc,
+            2 * t_acc + (distance - self.acceleration * t_acc**2) / self.velocity,
+        )
+
+    def position(self, now: float) -> float:
+        """Position in steps at the given time."""
+        elapsed = now - self.start_time
+        if elapsed >= self.duration:
+            return self.target
+        distance = abs(self.target - self.start)
+        t_acc, duration = self._profile(distance)
+        if elapsed < t_acc:
+            travelled = self.acceleration * elapsed**2 / 2
+        elif elapsed > duration - t_acc:
+            travelled = distance - self.acceleration * (duration - elapsed) ** 2 / 2
+        else:
+            travelled = self.acceleration * t_acc**2 / 2 + self.velocity * (
+                elapsed - t_acc
+            )
+        return self.start + math.copysign(travelled, self.target - self.start)
+
+    def moving(self, now: float) -> bool:
+        return now - self.start_time < self.duration
+
+    def move_to(self, target: float, now: float) -> None:
+        if not self.motor_on:
+            self.command_error = True
+            return
+        self.start = self.position(now)
+        self.target = target
+        self.start_time = now
+        self.duration = self._profile(abs(target - self.start))[1]
+
+    def stop(self, now: float) -> None:
+        self.start = self.target = self.position(now)
+        self.duration = 0.0
+
+    def status(self, now: float) -> int:
+        """Status byte with the bits of STATUS_FLAGS. Reading the status resets the command error."""
+        status = 0 if self.moving(now) else 0x04
+        if self.command_error:
+            status |= 0x02
+        if not self.motor_on:
+            status |= 0x80
+        self.command_error = False
+        return status
+
+
+class SimulatedSerial:
+    """Simulated daisy chain of C-863 controllers behind a pyserial port, the serial device underneath SerialInterface.
+    Models the position, velocity, acceleration and status register of every address, the motion time of moves,
+    the transfer time of every character at the baud rate and the response time of the controller.
+    Position answers have the format of the controller, e.g. 'P:+0000012345'.
+    Implements the part of the serial.Serial API used by SerialInterface: write, read_until, reset_input_buffer and timeout.
+    """
+
+    _COMMAND = re.compile(r"\x01([0-9A-Fa-f])([A-Z]{2})(-?\d*)$")
+
+    def __init__(
+        self,
+        addresses=range(1, 17),
+        baud_rate: int = 9600,
+        parity: str = "N",
+        terminator: str = "\r",
+        timeout: float = 2,
+        stopbits: float = 2,
+        latency: float = 0.001,
+    ):
+        """
+        Args:
+            addresses (iterable, optional): Addresses of the simulated controllers. Defaults to 1 to 16.
+            baud_rate (int, optional): Baud rate of the port. Defaults to 9600.
+            parity (str, optional): Parity of the port. Defaults to "N".
+            terminator (str, optional): Message terminator. Defaults to carriage return.
+            timeout (float, optional): Read timeout in seconds. Defaults to 2.
+            stopbits (float, optional): Number of stop bits. Defaults to 2.
+            latency (float, optional): Response time of a controller to a query in seconds. Defaults to 0.001.
+        """
+        self.timeout = timeout
+        self.latency = latency
+        self._terminator = terminator
+        # start bit, 8 data bits, parity and stop bits per character
+        self.char_time = (1 + 8 + (parity != "N") + stopbits) / baud_rate
+        self.stages = {address: StageSimulator() for address in addresses}
+        # answers and the time their last character is received
+        self._replies = deque()
+        self._written = b""
+        # times at which the transmit and the receive line of the port are free again
+        self._tx_free = 0.0
+        self._rx_free = 0.0
+
+    def close(self) -> None:
+        pass
+
+    def write(self, data: bytes) -> int:
+        """Sends the commands to the controllers. The write returns once the data is buffered,
+        every command is executed when it is transferred.
+        """
+        terminator = self._terminator.encode()
+        *commands, self._written = (self._written + data).split(terminator)
+        for command in commands:
+            self._tx_free = (
+                max(self._tx_free, time.monotonic())
+                + (len(command) + len(terminator)) * self.char_time
+            )
+            self._execute(command.decode(), self._tx_free)
+        return len(data)
+
+    def read_until(self, expected: bytes = b"\n") -> bytes:
+        """Reads the next answer. Returns what arrived until the timeout, like pyserial,
+        the rest of an incomplete answer is returned by the next read.
+        """
+        deadline = time.monotonic() + (
+            math.inf if self.timeout is None else self.timeout
+        )
+        if not self._replies:
+            _sleep_until(deadline)
+            return b""
+        msg, ready = self._replies[0]
+        if ready <= deadline:
+            _sleep_until(ready)
+            self._replies.popleft()
+            return msg.encode()
+        _sleep_until(deadline)
+        received = self._received(msg, ready, deadline)
+        self._replies[0] = (msg[received:], ready)
+        return msg[:received].encode()
+
+    def reset_input_buffer(self) -> None:
+        """Discards the answers and the parts of answers received until now."""
+        now = time.monotonic()
+        while self._replies:
+            msg, ready = self._replies[0]
+            if ready <= now:
+                self._replies.popleft()
+                continue
+            self._replies[0] = (msg[self._received(msg, ready, now) :], ready)
+            break
+
+    def _received(self, msg: str, ready: float, now: float) -> int:
+        """Number of characters of an answer received until now."""
+        if not self.char_time:
+            return 0
+        return max(0, len(msg) - math.ceil((ready - now) / self.char_time))
+
+    def _execute(self, command: str, now: float) -> None:
+        """Executes a command at the time it is received by the controllers."""
+        match = self._COMMAND.match(command)
+        if match is None:
+            return
+        address, name, argument = match.groups()
+        stage = self.stages.get(int(address, 16) + 1)
+        if stage is None:
+            # no controller with this address on the chain
+            return
+        value = int(argument) if argument not in ("", "-") else None
+        if name == "TP":
+            self._reply("P:%+011d" % round(stage.position(now)), now)
+        elif name == "TS":
+            self._reply("S:%02X 00 00 00 00 00" % stage.status(now), now)
+        elif name == "MA" and value is not None:
+            stage.move_to(value, now)
+        elif name == "MR" and value is not None:
+            stage.move_to(stage.target + value, now)
+        elif name == "GH":
+            stage.move_to(0, now)
+        elif name == "DH":
+            offset = stage.position(now)
+            stage.start -= offset
+            stage.target -= offset
+        elif name == "AB":
+            stage.stop(now)
+        elif name == "SV" and value:
+            stage.velocity = value
+        elif name == "SA" and value:
+            stage.acceleration = value
+        elif name == "MN":
+            stage.motor_on = True
+        elif name == "MF":
+            stage.stop(now)
+            stage.motor_on = False
+        elif name == "RT":
+            stage.stop(now)
+            stage.command_error = False
+        elif name in ("LL", "HL", "FE"):
+            pass
+        else:
+            stage.command_error = True
+
+    def _reply(self, msg: str, now: float) -> None:
+        """Queues the answer of a query, it is sent after the response time of the controller."""
+        msg += self._terminator
+        self._rx_free = (
+            max(self._rx_free, now + self.latency) + len(msg) * self.char_time
+        )
+        self._replies.append((msg, self._rx_free))
+
+
+class SerialInterfaceSimulator(SerialInterface):
+    """The real SerialInterface on a simulated daisy chain of C-863 controllers, see SimulatedSerial.
+    Deadlines, resynchronisation, circuit breaker and tracing are the ones of the driver.
+    """
+
+    # Response time of a controller to a query in seconds
+    latency = 0.001
+
+    # Addresses of the simulated controllers
+    addresses = range(1, 17)
+
+    def __init__(
+        self,
+        port: str,
+        baud_rate: int = 9600,
+        parity: str = "N",
+        terminator: str = "\r",
+        timeout: float = 2,
+        stopbits: float = 2,
+    ):
+        # the simulated controllers split the commands at the terminator
+        self._terminator = terminator
+        super().__init__(port, baud_rate, parity, terminator, timeout, stopbits)
+
+    def _open_port(
+        self, port: str, baud_rate: int, parity: str, timeout: float, stopbits: float
+    ) -> SimulatedSerial:
+        return SimulatedSerial(
+            addresses=self.addresses,
+            baud_rate=baud_rate,
+            parity=parity,
+            terminator=self._terminator,
+            timeout=timeout,
+            stopbits=stopbits,
+            latency=self.latency,
+        )
+
+    @property
+    def stages(self) -> dict:
+        """Simulated stages by address."""
+        return self._serial.stages
+
+
+class PtySerialDevice:
+    """Fake serial device on a pseudo terminal, answering like a simulated C-863 daisy chain without delays.
+    The real SerialInterface can be opened on its port, so the whole serial path including pyserial is exercised.
+    """
+
+    def __init__(self):
+        self._controller, self._device = os.openpty()
+        self.port = os.ttyname(self._device)
+        self.simulator = SimulatedSerial(latency=0)
+        self.simulator.char_time = 0
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        terminator = self.simulator._terminator.encode()
+        buffer = b""
+        while not self._stop.is_set():
+            if not select.select([self._controller], [], [], 0.05)[0]:
+                continue
+            try:
+                buffer += os.read(self._controller, 4096)
+            except OSError:
+                break
+            *commands, buffer = buffer.split(terminator)
+            for command in commands:
+                self.simulator._execute(command.decode(), time.monotonic())
+            answers = b"".join(msg.encode() for msg, _ in self.simulator._replies)
+            self.simulator._replies.clear()
+            if answers:
+                os.write(self._controller, answers)
+
+    def close(self) -> None:
+        """Stops answering and closes the pseudo terminal."""
+        self._stop.set()
+        self._thread.join()
+        os.close(self._controller)
+        os.close(self._device)
+
+
+def _sleep_until(deadline: float) -> None:
+    delay = deadline - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
@@ -0,0 +1,202 @@
+from motor_stage_ui.pi_stages_interface import StageConversion
+from motor_stage_ui import logger
+
+import logging
+import numpy as np
+
+"""
+
+Planning of scan paths: conversion of many target positions into motor steps, soft limit checks and ordering.
+
+"""
+
+
+class TrajectoryPlanner(StageConversion):
+    """Plans scan paths over several motorstages with numpy arrays.
+    Positions are given as arrays of shape (points, axes) in user units, every column belongs to one motorstage.
+    """
+
+    def __init__(self, stages: dict, axes: list[str], limits: dict = None):
+        """
+        Args:
+            stages (dict): Stage configurations by motorstage name, as in the configuration yaml.
+                Optional 'soft_limits' [min, max] of a stage are given in its unit.
+            axes (list[str]): Names of the motorstages of the columns of the position arrays
+            limits (dict, optional): Soft limits (min, max) in the unit of the stage by motorstage name,
+                overriding the 'soft_limits' of the configuration. Defaults to None.
+        """
+        self.log = logger.setup_main_logger(__class__.__name__, logging.WARNING)
+        self._unit_factors = {}
+        self.stages = stages
+        self.axes = list(axes)
+        for name in self.axes:
+            if stages[name]["stage_type"] not in ["translation", "rotation"]:
+                self.log.warning("Invalid stage type of motorstage %s" % name)
+                raise ValueError
+        limits = limits or {}
+        self.limits = np.empty((len(self.axes), 2), dtype=np.int64)
+        for i, name in enumerate(self.axes):
+            bounds = limits.get(name, stages[name].get("soft_limits"))
+            if bounds is None:
+                self.limits[i] = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+            else:
+                self.limits[i] = self.to_steps(np.reshape(bounds, (2, 1)), axes=[name])[
+                    :, 0
+                ]
+
+    def to_steps(
+        self, positions, units: list[str] = None, axes: list[str] = None
+    ) -> np.ndarray:
+        """Converts positions in user units into integer motor steps, all points in one pass.
+        Steps are truncated towards zero like the single moves of the PIStagesInterface.
+
+        Args:
+            positions (array_like): Positions of shape (points, axes)
+            units (list[str], optional): Unit of every column. Defaults to the units of the stages.
+            axes (list[str], optional): Names of the motorstages of the columns. Defaults to the axes of the planner.
+
+        Returns:
+            np.ndarray: Positions in integer motor steps of shape (points, axes)
+        """
+        axes = axes or self.axes
+        positions = np.asarray(positions, dtype=np.float64)
+        if positions.ndim == 1:
+            positions = positions[:, np.newaxis]
+        if positions.shape[1] != len(axes):
+            self.log.error(
+                "Positions have %i columns for %i axes"
+                % (positions.shape[1], len(axes))
+            )
+            raise ValueError
+        units = units or [self.stages[name]["unit"] for name in axes]
+        factors = np.array(
+            [
+                self._unit_factor(unit, self.stages[name]["stage_type"])
+                for name, unit in zip(axes, units)
+            ]
+        )
+        step_sizes = np.array([float(self.stages[name]["step_size"]) for name in axes])
+        # same order of operations as _calculate_value, so single moves give identical steps
+        return np.trunc(positions * factors / step_sizes).astype(np.int64)
+
+    def check_limits(self, steps: np.ndarray) -> None:
+        """Checks all points against the soft limits of the stages.
+
+        Args:
+            steps (np.ndarray): Positions in integer motor steps of shape (points, axes)
+
+        Raises:
+            ValueError: if any point is outside of the soft limits
+        """
+        outside = (steps < self.limits[:, 0]) | (steps > self.limits[:, 1])
+        if outside.any():
+            for name, count in zip(self.axes, outside.sum(axis=0)):
+                if count:
+                    self.log.error(
+                        "%i points outside of the soft limits of %s" % (count, name)
+                    )
+            raise ValueError(
+                "%i points outside of the soft limits" % outside.any(axis=1).sum()
+            )
+
+    def order(
+        self, steps: np.ndarray, method: str = "serpentine", start=None
+    ) -> np.ndarray:
+        """Order of the points which reduces the total travel.
+
+        'serpentine' sorts the points into rows of equal positions of all but the first axis
+        and scans every second row backwards, suited for grids of any size.
+        'nearest' always goes to the closest remaining point, suited for scattered points.
+        It needs quadratic time, so it is only feasible for some 10^4 points.
+
+        Args:
+            steps (np.ndarray): Positions in integer motor steps of shape (points, axes)
+            method (str, optional): 'serpentine', 'nearest' or 'none'. Defaults to 'serpentine'.
+            start (array_like, optional): Start position in steps for 'nearest'. Defaults to the first point.
+
+        Returns:
+            np.ndarray: Indices of the points in scan order
+        """
+        if method == "none" or len(steps) == 0:
+            return np.arange(len(steps))
+        if method == "serpentine":
+            fast = steps[:, 0]
+            if steps.shape[1] == 1:
+                return np.argsort(fast, kind="stable")
+            _, row = np.unique(steps[:, 1:], axis=0, return_inverse=True)
+            row = row.reshape(-1)
+            return np.lexsort((np.where(row % 2, -fast, fast), row))
+        if method == "nearest":
+            return self._nearest_neighbour(steps, start)
+        self.log.error("Unknown ordering %s" % method)
+        raise ValueError
+
+    @staticmethod
+    def _nearest_neighbour(steps: np.ndarray, start=None) -> np.ndarray:
+        """Greedy nearest neighbour tour, see travel for the distance measure."""
+        remaining = np.arange(len(steps))
+        points = steps
+        if start is None:
+            current = steps[0]
+        else:
+            current = np.asarray(start, dtype=np.int64)
+        order = np.empty(len(steps), dtype=np.intp)
+        for i in range(len(steps)):
+            nearest = np.abs(points - current).max(axis=1).argmin()
+            order[i] = remaining[nearest]
+            current = points[nearest]
+            remaining = np.delete(remaining, nearest)
+            points = np.delete(points, nearest, axis=0)
+        return order
+
+    @staticmethod
+    def travel(steps: np.ndarray, start=None) -> int:
+        """Total travel of a path in motor steps. The stages move at the same time with equal velocity,
+        so the travel between two points is the largest distance of a single axis.
+
+        Args:
+            steps (np.ndarray): Positions in integer motor steps of shape (points, axes) in scan order
+            start (array_like, optional): Start position in steps. Defaults to the first point.
+
+        Returns:
+            int: Total travel in motor steps
+        """
+        if start is not None:
+            steps = np.vstack([np.asarray(start, dtype=np.int64), steps])
+        return int(np.abs(np.diff(steps, axis=0)).max(axis=1, initial=0).sum())
+
+    def plan(
+        self,
+        positions,
+        units: list[str] = None,
+        method: str = "serpentine",
+        start=None,
+    ) -> np.ndarray:
+        """Converts, checks and orders a scan path.
+
+        Args:
+            positions (array_like): Positions of shape (points, axes) in user units
+            units (list[str], optional): Unit of every column. Defaults to the units of the stages.
+            method (str, optional): Ordering, see order. Defaults to 'serpentine'.
+            start (array_like, optional): Start position in steps for 'nearest'. Defaults to the first point.
+
+        Returns:
+            np.ndarray: Positions in integer motor steps of shape (points, axes) in scan order
+        """
+        steps = self.to_steps(positions, units=units)
+        self.check_limits(steps)
+        return steps[self.order(steps, method=method, start=start)]
+
+    def targets(self, point: np.ndarray) -> dict:
+        """Target positions of one planned point for PIStagesInterface.move_to_steps.
+
+        Args:
+            point (np.ndarray): Position in integer motor steps of every axis
+
+        Returns:
+            dict: Target positions in integer step sizes by address
+        """
+        return {
+            self.stages[name]["address"]: int(value)
+            for name, value in zip(self.axes, point)
+        }